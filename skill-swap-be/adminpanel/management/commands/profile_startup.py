@@ -0,0 +1,129 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: import the app, serve one request through the
+# real handler and report timings relative to interpreter start.
+CHILD = '''
+import asyncio, io, json, os, sys, time
+started = time.perf_counter()
+interface, path = sys.argv[1], sys.argv[2]
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skill_swap_api.settings')
+if interface == 'asgi':
+    from skill_swap_api.asgi import application
+else:
+    from skill_swap_api.wsgi import application
+imported = time.perf_counter()
+status = None
+if interface == 'asgi':
+    async def request():
+        global status
+        finished = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        async def receive():
+            if messages:
+                return messages.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+        async def send(message):
+            global status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif not message.get('more_body'):
+                finished.set()
+        await application({
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+        }, receive, send)
+    asyncio.run(request())
+else:
+    def start_response(value, headers):
+        global status
+        status = int(value.split()[0])
+    response = application({
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+    }, start_response)
+    for _ in response:
+        pass
+    response.close()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'request_ms': (time.perf_counter() - imported) * 1000, 'status': status}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report import-time breakdown and time-to-first-request for the WSGI and ASGI apps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interface', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--path', default='/api/user/skills/', help='Path of the first request.')
+        parser.add_argument('--runs', type=int, default=3, help='Cold starts per interface; the median is reported.')
+        parser.add_argument('--top', type=int, default=15, help='Packages to list in the import breakdown.')
+        parser.add_argument('--budget-ms', type=float, help='Fail if the median time to first response exceeds this.')
+
+    def handle(self, *args, **options):
+        interfaces = ['wsgi', 'asgi'] if options['interface'] == 'both' else [options['interface']]
+
+        self.stdout.write(f'Import time by top-level package ({interfaces[0].upper()}, self time, -X importtime):')
+        stderr = self.spawn(interfaces[0], options['path'], importtime=True)[1]
+        packages = self.import_breakdown(stderr)
+        total = sum(packages.values())
+        for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {package:<30} {micros / 1000:8.1f} ms  {micros * 100 / total:5.1f}%')
+        self.stdout.write(f'  {"total":<30} {total / 1000:8.1f} ms')
+
+        over_budget = []
+        for interface in interfaces:
+            runs = sorted((self.measure(interface, options['path']) for _ in range(options['runs'])), key=lambda run: run['total_ms'])
+            run = runs[len(runs) // 2]
+            self.stdout.write(
+                f'{interface.upper()}: first response {run["total_ms"]:.0f} ms after process start '
+                f'(interpreter {run["interpreter_ms"]:.0f} ms, app import {run["import_ms"]:.0f} ms, '
+                f'first request {run["request_ms"]:.0f} ms, status {run["status"]})'
+            )
+            if options['budget_ms'] is not None and run['total_ms'] > options['budget_ms']:
+                over_budget.append(f'{interface.upper()} {run["total_ms"]:.0f} ms')
+
+        if over_budget:
+            raise CommandError(f'Startup budget of {options["budget_ms"]:.0f} ms exceeded: {", ".join(over_budget)}')
+        if options['budget_ms'] is not None:
+            self.stdout.write(self.style.SUCCESS(f'Within startup budget of {options["budget_ms"]:.0f} ms.'))
+
+    def spawn(self, interface, path, importtime=False):
+        cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD, interface, path]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'skill_swap_api.settings'))
+        env.pop('DJANGO_SERVER_INTERFACE', None)
+        result = subprocess.run(cmd, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f'{interface.upper()} startup failed:\n{result.stderr.strip()[-2000:]}')
+        return result.stdout, result.stderr
+
+    def measure(self, interface, path):
+        started = time.perf_counter()
+        stdout, _ = self.spawn(interface, path)
+        total_ms = (time.perf_counter() - started) * 1000
+        run = json.loads(stdout.strip().splitlines()[-1])
+        run['total_ms'] = total_ms
+        run['interpreter_ms'] = max(total_ms - run['import_ms'] - run['request_ms'], 0)
+        return run
+
+    @staticmethod
+    def import_breakdown(stderr):
+        # Lines look like "import time:   self [us] | cumulative | [indent]module".
+        packages = defaultdict(int)
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue
+            packages[fields[2].strip().split('.')[0]] += int(fields[0])
+        return packages
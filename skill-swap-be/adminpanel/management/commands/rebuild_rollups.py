@@ -0,0 +1,28 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from adminpanel import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild admin analytics rollups by replaying the event log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD). Defaults to the event log compaction horizon.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            day = parse_date(options['since'])
+            if day is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD).')
+            since = timezone.make_aware(datetime.combine(day, time.min))
+        try:
+            replayed = rollups.rebuild(since, options['chunk_size'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} events into rollups.'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminpanel', '0002_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupRebuild',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('since', models.DateTimeField()),
+                ('cutover', models.BigIntegerField()),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
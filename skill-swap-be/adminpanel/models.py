@@ -1 +1,66 @@
+import uuid
+
 from django.db import models
+from django.conf import settings
+
+
+class StatRollup(models.Model):
+    # Pre-aggregated counters for admin analytics, one row per
+    # (granularity, metric, bucket, dimension). Maintained by adminpanel.rollups.
+    HOUR = 'hour'
+    DAY = 'day'
+
+    granularity = models.CharField(max_length=4)
+    metric = models.CharField(max_length=50)
+    bucket = models.DateTimeField()
+    dimension = models.CharField(max_length=100, default='', blank=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'metric', 'bucket', 'dimension'], name='unique_stat_rollup'),
+        ]
+
+
+class ActiveUserBucket(models.Model):
+    # Users seen in a bucket, so active_users can be counted once per user.
+    granularity = models.CharField(max_length=4)
+    bucket = models.DateTimeField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket', 'user'], name='unique_active_user_bucket'),
+        ]
+
+
+class RollupRebuild(models.Model):
+    # Present while adminpanel.rollups.rebuild() runs: events up to cutover are
+    # counted by the replay, later ones by rollups.apply(). At most one row.
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    since = models.DateTimeField()
+    cutover = models.BigIntegerField()
+    started_at = models.DateTimeField(auto_now_add=True)
+
+
+class RequestProfile(models.Model):
+    # One profiled request, captured by adminpanel.profiling.ProfilingMiddleware.
+    # stats holds the marshalled cProfile data (the .prof format pstats reads).
+    HEADER = 'header'
+    SAMPLE = 'sample'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    trigger = models.CharField(max_length=10)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    url_name = models.CharField(max_length=200, blank=True, default='')
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    duration_ms = models.FloatField()
+    cpu_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    # {"statements": [{"sql", "count", "total_ms", "max_ms"}], "duplicates": n}, slowest first
+    sql_summary = models.JSONField(default=dict)
+    stats = models.BinaryField()
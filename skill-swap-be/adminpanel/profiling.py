@@ -0,0 +1,168 @@
+# On-demand request profiling.
+#
+# ProfilingMiddleware profiles a request when a staff user sends the
+# PROFILING_HEADER header (X-Profile: 1) or when it falls in the random
+# PROFILING_SAMPLE_RATE share. Everything else passes straight through: the
+# check is one header lookup and, with a non-zero rate, one random() call.
+#
+# A profiled request runs under cProfile with an execute_wrapper on every
+# database connection that records each statement's time. The result is
+# stored as a RequestProfile (URL name, status, wall/CPU/SQL timings, SQL
+# grouped by statement shape, marshalled pstats data) and its id is returned in
+# the X-Profile-Id response header. Browse them under /api/admin/profiles/;
+# they are kept for PROFILING_RETENTION_DAYS.
+#
+# The middleware is async-capable, so under ASGI async views (the message
+# long-poll) stay on the event loop. A profiled request is the exception: it
+# runs in a thread via async_to_sync, where cProfile and the execute_wrappers
+# can see the view and its queries.
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import re
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from user.authentication import RevocationAwareJWTAuthentication
+from .models import RequestProfile
+
+# IN (%s, %s, ...) lists of any length are the same statement.
+_PARAM_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+class SQLRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    def summary(self, top):
+        groups = {}
+        for sql, ms in self.queries:
+            group = groups.setdefault(_PARAM_LIST.sub('(...)', sql), {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            group['count'] += 1
+            group['total_ms'] += ms
+            group['max_ms'] = max(group['max_ms'], ms)
+        statements = sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+        return {
+            'statements': [{'sql': sql, 'count': group['count'], 'total_ms': round(group['total_ms'], 3),
+                            'max_ms': round(group['max_ms'], 3)} for sql, group in statements],
+            # Statements run more than once with the same shape, usually an N+1.
+            'duplicates': sum(group['count'] - 1 for group in groups.values()),
+        }
+
+
+def is_staff_request(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # API clients authenticate per view with JWT; check the token here, which
+    # only happens for requests carrying the header.
+    try:
+        result = RevocationAwareJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+def top_functions(profile, limit=30, sort='cumulative'):
+    """pstats text report of a stored profile."""
+    out = io.StringIO()
+    stats = pstats.Stats(_StatsSource(profile.stats), stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class _StatsSource:
+    # pstats.Stats accepts any object with create_stats() and a stats dict.
+    def __init__(self, data):
+        self.stats = marshal.loads(bytes(data))
+
+    def create_stats(self):
+        pass
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        return self.profile(request, trigger, self.get_response)
+
+    async def __acall__(self, request):
+        if self.header in request.META:
+            trigger = RequestProfile.HEADER if await sync_to_async(is_staff_request)(request) else None
+        else:
+            trigger = self.sampled()
+        if trigger is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(request, trigger, async_to_sync(self.get_response))
+
+    def trigger(self, request):
+        if self.header in request.META:
+            return RequestProfile.HEADER if is_staff_request(request) else None
+        return self.sampled()
+
+    def sampled(self):
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return RequestProfile.SAMPLE
+        return None
+
+    def profile(self, request, trigger, get_response):
+        recorder = SQLRecorder()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            started, cpu_started = time.perf_counter(), time.process_time()
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - started) * 1000
+            cpu_ms = (time.process_time() - cpu_started) * 1000
+        profiler.create_stats()
+
+        user = getattr(request, 'user', None)
+        match = request.resolver_match
+        record = RequestProfile.objects.create(
+            trigger=trigger, method=request.method, path=request.path[:500],
+            url_name=(match.view_name if match else '')[:200], status_code=response.status_code,
+            user=user if user is not None and user.is_authenticated else None,
+            duration_ms=duration_ms, cpu_ms=cpu_ms,
+            sql_count=len(recorder.queries), sql_ms=sum(ms for _, ms in recorder.queries),
+            sql_summary=recorder.summary(settings.PROFILING_TOP_QUERIES),
+            stats=marshal.dumps(profiler.stats),
+        )
+        # Pruned here rather than by a job: only profiled requests pay for it.
+        RequestProfile.objects.filter(created_at__lt=timezone.now() - timedelta(days=settings.PROFILING_RETENTION_DAYS)).delete()
+        response['X-Profile-Id'] = str(record.id)
+        return response
@@ -0,0 +1,167 @@
+# Hourly and daily rollups of platform activity, derived from the event log.
+#
+# apply() folds a single event into the counters once the transaction that
+# wrote the event commits, so the stats endpoint only ever reads a bounded range
+# of StatRollup rows. Running after commit keeps swap and rating writes from
+# holding locks on the few shared counter rows until they finish; an event whose
+# apply() is lost (e.g. the worker dies right after commit) is recovered by a
+# rebuild. rebuild() replays the retained event log in chunks.
+#
+# A rebuild runs alongside live traffic. It records a cut-over seq in
+# RollupRebuild before clearing its buckets; apply() leaves events up to the
+# cut-over to the replay and counts later ones itself, so nothing is counted
+# twice. As with event consumers (swap.events), an event transaction that stays
+# open longer than EVENT_LOG_SETTLE_SECONDS across the cut-over may be missed.
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from swap import events
+from swap.models import Event
+from .models import ActiveUserBucket, RollupRebuild, StatRollup
+
+GRANULARITIES = (StatRollup.HOUR, StatRollup.DAY)
+
+SWAPS_CREATED = 'swaps_created'
+SWAPS_ACCEPTED = 'swaps_accepted'
+SWAPS_REJECTED = 'swaps_rejected'
+SWAPS_COMPLETED = 'swaps_completed'
+# Per receiver skill category; acceptance rate = accepted / decided.
+CATEGORY_ACCEPTED = 'category_accepted'
+CATEGORY_DECIDED = 'category_decided'
+RATINGS = 'ratings'
+ACTIVE_USERS = 'active_users'
+
+STATUS_METRICS = {
+    'accepted': SWAPS_ACCEPTED,
+    'rejected': SWAPS_REJECTED,
+    'completed': SWAPS_COMPLETED,
+}
+
+
+def bucket_start(value, granularity):
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == StatRollup.DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def event_counts(event):
+    """[(metric, dimension)] counters an event increments."""
+    payload = event.payload
+    if event.topic == events.SWAP_CREATED:
+        return [(SWAPS_CREATED, '')]
+    if event.topic == events.SWAP_STATUS_CHANGED:
+        status = payload.get('status')
+        counts = [(STATUS_METRICS[status], '')] if status in STATUS_METRICS else []
+        if status in ('accepted', 'rejected') and payload.get('previous') == 'pending':
+            category = payload.get('category') or ''
+            counts.append((CATEGORY_DECIDED, category))
+            if status == 'accepted':
+                counts.append((CATEGORY_ACCEPTED, category))
+        return counts
+    if event.topic == events.RATING_CREATED:
+        return [(RATINGS, str(payload.get('rating')))]
+    return []
+
+
+def increment(granularity, bucket, metric, dimension='', amount=1):
+    key = {'granularity': granularity, 'bucket': bucket, 'metric': metric, 'dimension': dimension}
+    if StatRollup.objects.filter(**key).update(value=F('value') + amount):
+        return
+    try:
+        with transaction.atomic():
+            StatRollup.objects.create(value=amount, **key)
+    except IntegrityError:
+        StatRollup.objects.filter(**key).update(value=F('value') + amount)
+
+
+def mark_active(granularity, bucket, user_id):
+    # The unique ActiveUserBucket row decides who counts a user, live or replayed.
+    _, created = ActiveUserBucket.objects.get_or_create(granularity=granularity, bucket=bucket, user_id=user_id)
+    if created:
+        increment(granularity, bucket, ACTIVE_USERS)
+
+
+def apply(event):
+    with transaction.atomic():
+        if RollupRebuild.objects.filter(cutover__gte=event.seq, since__lte=event.created_at).exists():
+            return
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(event.created_at, granularity)
+            for metric, dimension in event_counts(event):
+                increment(granularity, bucket, metric, dimension)
+            if event.actor_id:
+                mark_active(granularity, bucket, event.actor_id)
+
+
+def prune_active_users(before, batch_size=10000):
+    """Delete ActiveUserBucket rows for buckets before `before`. Returns the number removed.
+
+    They only de-duplicate active_users while a bucket can still be written or
+    rebuilt; rebuild() never goes back past the event log compaction horizon.
+    """
+    before = bucket_start(before, StatRollup.DAY)
+    removed = 0
+    while True:
+        ids = list(ActiveUserBucket.objects.filter(bucket__lt=before).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        removed += ActiveUserBucket.objects.filter(id__in=ids).delete()[0]
+
+
+def rebuild(since=None, chunk_size=5000):
+    """Recompute rollups for buckets from `since` onwards by replaying the event log.
+
+    Defaults to the compaction horizon: older events may have been compacted or
+    pruned, so replaying them would undercount. Earlier buckets are left alone.
+    """
+    if since is None:
+        since = timezone.now() - timedelta(days=settings.EVENT_LOG_COMPACT_AFTER_DAYS)
+    since = bucket_start(since, StatRollup.DAY)
+    with transaction.atomic():
+        cutover = Event.objects.aggregate(seq=Max('seq'))['seq'] or 0
+        try:
+            with transaction.atomic():
+                RollupRebuild.objects.create(since=since, cutover=cutover)
+        except IntegrityError:
+            raise RuntimeError('A rollup rebuild is already running.') from None
+        StatRollup.objects.filter(bucket__gte=since).delete()
+        ActiveUserBucket.objects.filter(bucket__gte=since).delete()
+    try:
+        # Lets events that took a seq below the cut-over finish committing.
+        time.sleep(settings.EVENT_LOG_SETTLE_SECONDS)
+        return _replay(Event.objects.filter(created_at__gte=since, seq__lte=cutover).order_by('seq'), chunk_size)
+    finally:
+        RollupRebuild.objects.all().delete()
+
+
+def _replay(queryset, chunk_size):
+    replayed = 0
+    last_seq = 0
+    while True:
+        chunk = list(queryset.filter(seq__gt=last_seq)[:chunk_size])
+        if not chunk:
+            break
+        counters = Counter()
+        seen = set()
+        for event in chunk:
+            for granularity in GRANULARITIES:
+                bucket = bucket_start(event.created_at, granularity)
+                for metric, dimension in event_counts(event):
+                    counters[(granularity, bucket, metric, dimension)] += 1
+                if event.actor_id:
+                    seen.add((granularity, bucket, event.actor_id))
+        with transaction.atomic():
+            for (granularity, bucket, metric, dimension), amount in counters.items():
+                increment(granularity, bucket, metric, dimension, amount)
+            for granularity, bucket, user_id in seen:
+                mark_active(granularity, bucket, user_id)
+        replayed += len(chunk)
+        last_seq = chunk[-1].seq
+    return replayed
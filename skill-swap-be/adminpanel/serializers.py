@@ -0,0 +1,19 @@
+from rest_framework import serializers
+from user.models import UserImport
+from .models import RequestProfile
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        fields = ['id', 'created_at', 'trigger', 'method', 'path', 'url_name', 'status_code', 'user',
+                  'duration_ms', 'cpu_ms', 'sql_count', 'sql_ms']
+
+class RequestProfileDetailSerializer(RequestProfileSerializer):
+    class Meta(RequestProfileSerializer.Meta):
+        fields = RequestProfileSerializer.Meta.fields + ['sql_summary']
+
+class UserImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserImport
+        fields = ['id', 'status', 'send_emails', 'result', 'error', 'created_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from swap.models import Event
+from . import rollups
+
+
+@receiver(post_save, sender=Event)
+def update_rollups(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: rollups.apply(instance))
@@ -1,3 +1,292 @@
-from django.test import TestCase
+import base64
+from io import StringIO
+import uuid
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import override_settings
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APITestCase
+from rest_framework import status
+from user.models import User, UserImport
+from user.revocation import BloomFilter
+from rest_framework_simplejwt.tokens import RefreshToken
+from swap.models import Skill, AdminAction
+from .models import ActiveUserBucket, RollupRebuild, StatRollup, RequestProfile
+from . import rollups
+from .profiling import ProfilingMiddleware
+
+
+@override_settings(EVENT_LOG_SETTLE_SECONDS=0)
+class SkillModerationTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        self.skill = Skill.objects.create(user=self.admin, name='Python', description='desc', category='Programming', level='Expert', type='offer')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_moderation_is_recorded_and_exposed_as_events(self):
+        response = self.client.put(reverse('admin-reject-skill', args=[self.skill.id]), {'reason': 'Spam'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.status, 'rejected')
+        self.assertTrue(AdminAction.objects.filter(target_id=self.skill.id, action_type='skill_rejected').exists())
+
+        response = self.client.get(reverse('admin-events'), {'topic': 'skill.moderated'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['events'][0]['payload']['reason'], 'Spam')
+        response = self.client.get(reverse('admin-events'), {'after': response.data['cursor']})
+        self.assertEqual(response.data['events'], [])
+
+
+class StatsRollupTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        self.alice = User.objects.create_user(email='alice@example.com', password='Password123', name='alice')
+        self.bob = User.objects.create_user(email='bob@example.com', password='Password123', name='bob')
+        self.skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+    def swap_through(self, *steps):
+        # Rollups are applied on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(user=self.alice)
+            swap_id = self.client.post(reverse('swap-list'), {
+                'receiver': self.bob.id, 'requester_skill': self.skill.id, 'receiver_skill': self.skill.id,
+            }, format='json').data['id']
+            self.client.force_authenticate(user=self.bob)
+            for step in steps:
+                self.client.put(reverse(f'swap-{step}', args=[swap_id]))
+        return swap_id
+
+    def stats(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('admin-stats'), {'granularity': 'day'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_rollups_are_incremental_and_rebuildable(self):
+        completed = self.swap_through('accept', 'complete')
+        self.swap_through('reject')
+        self.client.force_authenticate(user=self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('rating-list'), {
+                'swap': completed, 'rater': self.alice.id, 'rated': self.bob.id, 'rating': 4, 'comment': 'Good',
+            }, format='json')
+
+        data = self.stats()
+        totals = {metric: sum(point['value'] for point in points) for metric, points in data['series'].items()}
+        self.assertEqual(totals, {'swaps_created': 2, 'swaps_accepted': 1, 'swaps_rejected': 1,
+                                  'swaps_completed': 1, 'active_users': 2})
+        self.assertEqual(data['acceptance_by_category'],
+                         [{'category': 'Programming', 'accepted': 1, 'decided': 2, 'rate': 0.5}])
+        self.assertEqual(data['rating_distribution'], {'4': 1})
+
+        StatRollup.objects.all().delete()
+        rollups.rebuild(chunk_size=2)
+        rebuilt = self.stats()
+        for key in ('series', 'acceptance_by_category', 'rating_distribution'):
+            self.assertEqual(rebuilt[key], data[key])
+
+    @override_settings(EVENT_LOG_SETTLE_SECONDS=0)
+    def test_events_written_during_a_rebuild_count_once(self):
+        self.swap_through('accept')
+        before = self.stats()['series']
+        replay = rollups._replay
+
+        def replay_with_traffic(*args):
+            # Live events land after the cut-over, while buckets are being refilled.
+            self.swap_through('reject')
+            return replay(*args)
+
+        with mock.patch.object(rollups, '_replay', replay_with_traffic):
+            rollups.rebuild(chunk_size=1)
+        self.assertFalse(RollupRebuild.objects.exists())
+        totals = {metric: sum(point['value'] for point in points) for metric, points in self.stats()['series'].items()}
+        self.assertEqual(totals['swaps_created'], sum(point['value'] for point in before['swaps_created']) + 1)
+        self.assertEqual(totals['swaps_rejected'], 1)
+        self.assertEqual(totals['active_users'], 2)
+
+        # Events at or below a running rebuild's cut-over are left to its replay.
+        RollupRebuild.objects.create(since=timezone.now() - timedelta(days=1), cutover=10 ** 12)
+        self.swap_through()
+        self.assertEqual(StatRollup.objects.get(granularity='day', metric='swaps_created').value, totals['swaps_created'])
+
+    def test_counters_wait_for_commit_and_active_buckets_are_pruned(self):
+        self.client.force_authenticate(user=self.alice)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('swap-list'), {
+                'receiver': self.bob.id, 'requester_skill': self.skill.id, 'receiver_skill': self.skill.id,
+            }, format='json')
+        self.assertFalse(StatRollup.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(StatRollup.objects.get(granularity='day', metric='swaps_created').value, 1)
+
+        ActiveUserBucket.objects.create(granularity='day', bucket=timezone.now() - timedelta(days=400), user=self.bob)
+        out = StringIO()
+        call_command('prune_events', stdout=out)
+        self.assertIn('and 1 active-user buckets', out.getvalue())
+        self.assertEqual(set(ActiveUserBucket.objects.values_list('user_id', flat=True)), {self.alice.id})
+
+    def test_rejects_oversized_range(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('admin-stats'), {'granularity': 'hour', 'start': '2025-01-01', 'end': '2025-06-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(USER_IMPORT_WORKERS=1)
+class UserImportTests(APITestCase):
+    def test_csv_import_skips_duplicates_and_batches_otps(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        upload = SimpleUploadedFile('learners.csv', (
+            'email,name,password,location\n'
+            'ana@uni.edu,Ana,Secret123,Pune\n'
+            'ADMIN@example.com,Again,x,\n'
+            'ana@UNI.edu,Ana twice,y,\n'
+            'not-an-email,Broken,z,\n'
+            'raj@uni.edu,Raj,,\n'
+        ).encode(), content_type='text/csv')
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(reverse('admin-import-users'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], UserImport.PENDING)
+        self.assertFalse(User.objects.filter(email='ana@uni.edu').exists())
+
+        # The first run imports but cannot send; the OTPs stay queued.
+        with mock.patch('user.imports.send_otp_emails', side_effect=OSError('SMTP down')):
+            call_command('process_imports', workers=1, stdout=StringIO(), stderr=StringIO())
+        job = self.client.get(reverse('admin-import-detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], UserImport.DONE)
+        self.assertEqual({key: job['result'][key] for key in ('created', 'existing', 'duplicate', 'invalid', 'queued')},
+                         {'created': 2, 'existing': 1, 'duplicate': 1, 'invalid': 1, 'queued': 2})
+        self.assertEqual(job['result']['errors'], [{'line': 5, 'error': "Invalid email 'not-an-email'."}])
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = StringIO()
+        call_command('process_imports', workers=1, stdout=out)
+        self.assertIn('Ran 0 imports, sent 2 verification emails.', out.getvalue())
+        ana = User.objects.get(email='ana@uni.edu')
+        self.assertTrue(ana.check_password('Secret123'))
+        self.assertIsNotNone(ana.geohash)
+        self.assertFalse(User.objects.get(email='raj@uni.edu').has_usable_password())
+        self.assertIn(ana.verification_token, next(message.body for message in mail.outbox if message.to == ['ana@uni.edu']))
+
+    def test_rejects_non_utf8_upload(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        self.client.force_authenticate(user=admin)
+        upload = SimpleUploadedFile('learners.csv', 'email,name\nzoë@uni.edu,Zoë\n'.encode('latin-1'), content_type='text/csv')
+        response = self.client.post(reverse('admin-import-users'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UserImport.objects.exists())
+
+
+class UserBanTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        self.bob = User.objects.create_user(email='bob@example.com', password='Password123', name='Bob', email_verified=True)
+        self.skill = Skill.objects.create(user=self.bob, name='Guitar', description='', category='Music', level='Expert', type='offer')
+
+    def test_ban_revokes_tokens_and_hides_skills(self):
+        access = str(RefreshToken.for_user(self.bob).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.put(reverse('admin-ban-user', args=[self.bob.id]), {'is_banned': True, 'reason': 'Spam'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('skill-list')).data, [])
+        login = self.client.post(reverse('login'), {'email': 'bob@example.com', 'password': 'Password123'}, format='json')
+        self.assertEqual(login.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        self.client.put(reverse('admin-ban-user', args=[self.bob.id]), {'is_banned': False}, format='json')
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.client.get(reverse('skill-list')).data), 1)
+
+    def test_banned_user_cannot_use_basic_auth(self):
+        credentials = base64.b64encode(b'bob@example.com:Password123').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_200_OK)
+        User.objects.filter(id=self.bob.id).update(is_banned=True)
+        response = self.client.post(reverse('skill-list'), {
+            'name': 'Drums', 'description': '', 'category': 'Music', 'level': 'Expert', 'type': 'offer',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_only_that_token(self):
+        first = str(RefreshToken.for_user(self.bob).access_token)
+        second = str(RefreshToken.for_user(self.bob).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {first}')
+        self.assertEqual(self.client.post(reverse('logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {second}')
+        self.assertEqual(self.client.get(reverse('swap-list')).status_code, status.HTTP_200_OK)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = [f'user:{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLess(sum(f'token:{i}' in bloom for i in range(10000)), 100)
+
+
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='AdminPass123', name='Admin')
+        self.bob = User.objects.create_user(email='bob@example.com', password='Password123', name='Bob', email_verified=True)
+        Skill.objects.create(user=self.bob, name='Guitar', description='', category='Music', level='Expert', type='offer')
+
+    def get_profile(self, user, **headers):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}', **headers)
+        return self.client.get(reverse('user-public-profile', args=[self.bob.id]))
+
+    def test_only_staff_header_requests_are_profiled(self):
+        self.assertNotIn('X-Profile-Id', self.get_profile(self.admin))
+        self.assertNotIn('X-Profile-Id', self.get_profile(self.bob, HTTP_X_PROFILE='1'))
+        response = self.get_profile(self.admin, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(profile.id))
+        self.assertEqual((profile.url_name, profile.trigger, profile.user), ('user-public-profile', RequestProfile.HEADER, self.admin))
+        self.assertGreater(profile.sql_count, 0)
+
+        self.client.credentials()
+        self.client.force_authenticate(user=self.admin)
+        listed = self.client.get(reverse('admin-profiles'), {'url_name': 'user-public-profile'})
+        self.assertEqual([row['id'] for row in listed.data], [str(profile.id)])
+        detail = self.client.get(reverse('admin-profile-detail', args=[profile.id]), {'sort': 'tottime'})
+        self.assertIn('function calls', detail.data['report'])
+        self.assertTrue(detail.data['sql_summary']['statements'])
+        download = self.client.get(reverse('admin-profile-download', args=[profile.id]))
+        self.assertEqual(download['Content-Type'], 'application/octet-stream')
+
+    async def test_async_views_are_profiled_without_leaving_the_loop(self):
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(view)))
+
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        url = reverse('swap-messages-wait', args=[uuid.uuid4()])
+        response = await self.async_client.get(url, {'timeout': 0},
+                                               headers={'Authorization': f'Bearer {token}', 'X-Profile': '1'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        profile = await RequestProfile.objects.aget()
+        self.assertEqual((str(profile.id), profile.url_name), (response['X-Profile-Id'], 'swap-messages-wait'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        self.client.get(reverse('skill-list'))
+        self.assertEqual(RequestProfile.objects.get().trigger, RequestProfile.SAMPLE)
 
-# Create your tests here.
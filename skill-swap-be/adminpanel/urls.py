@@ -3,9 +3,16 @@ from . import views
 
 urlpatterns = [
     path('users/', views.UserListView.as_view(), name='admin-users'),
+    path('users/import/', views.UserImportView.as_view(), name='admin-import-users'),
+    path('users/import/<uuid:id>/', views.UserImportDetailView.as_view(), name='admin-import-detail'),
     path('users/<uuid:id>/ban/', views.UserBanView.as_view(), name='admin-ban-user'),
     path('skills/pending/', views.PendingSkillsView.as_view(), name='admin-pending-skills'),
     path('skills/<uuid:id>/approve/', views.ApproveSkillView.as_view(), name='admin-approve-skill'),
     path('skills/<uuid:id>/reject/', views.RejectSkillView.as_view(), name='admin-reject-skill'),
     path('messages/broadcast/', views.BroadcastMessageView.as_view(), name='admin-broadcast-message'),
+    path('events/', views.EventListView.as_view(), name='admin-events'),
+    path('stats/', views.StatsView.as_view(), name='admin-stats'),
+    path('profiles/', views.RequestProfileListView.as_view(), name='admin-profiles'),
+    path('profiles/<uuid:id>/', views.RequestProfileDetailView.as_view(), name='admin-profile-detail'),
+    path('profiles/<uuid:id>/download/', views.RequestProfileDownloadView.as_view(), name='admin-profile-download'),
 ]
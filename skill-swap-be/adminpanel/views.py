@@ -1,37 +1,246 @@
 # Admin API views stubs
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
-from user.models import User
-from swap.models import Skill
+from rest_framework.parsers import MultiPartParser
+from user.models import User, UserImport
+from user import revocation
+from skill_swap_api import cache
+from swap.models import Skill, AdminAction
+from swap import events
+from swap.serializers import EventSerializer
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+from django.conf import settings
+from django.http import HttpResponse
+from .models import StatRollup, RequestProfile
+from .serializers import RequestProfileSerializer, RequestProfileDetailSerializer, UserImportSerializer
+from . import profiling, rollups
 
 class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     permission_classes = [permissions.IsAdminUser]
     # Add pagination and serializer
 
+class UserImportView(generics.GenericAPIView):
+    # CSV upload (form field `file`), queued as a UserImport for process_imports;
+    # see user.imports for columns and behaviour. Poll the detail view for the result.
+    serializer_class = UserImportSerializer
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'No file provided.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            source = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return Response({'error': 'The file must be UTF-8 encoded CSV.'}, status=status.HTTP_400_BAD_REQUEST)
+        send_emails = str(request.data.get('send_emails', 'true')).lower() != 'false'
+        job = UserImport.objects.create(requested_by=request.user, source=source, send_emails=send_emails)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class UserImportDetailView(generics.RetrieveAPIView):
+    queryset = UserImport.objects.all()
+    serializer_class = UserImportSerializer
+    permission_classes = [permissions.IsAdminUser]
+    lookup_field = 'id'
+
+def set_user_banned(user, banned, admin, reason=''):
+    # Revokes (or restores) every outstanding token of the user and hides their
+    # skills with one UPDATE, so catalog queries need no join against User.
+    with transaction.atomic():
+        user.is_banned = banned
+        user.save(update_fields=['is_banned'])
+        Skill.objects.filter(user=user).update(is_visible=not banned)
+        if banned:
+            revocation.ban(user.id)
+        else:
+            revocation.unban(user.id)
+        AdminAction.objects.create(admin=admin, action_type='user_banned' if banned else 'user_unbanned', target_id=user.id, reason=reason)
+        # The queryset update bypasses the Skill signals that normally bump this.
+        cache.invalidate(cache.SKILLS)
+
 class UserBanView(generics.UpdateAPIView):
     queryset = User.objects.all()
     permission_classes = [permissions.IsAdminUser]
-    # Implement ban/unban logic
+
+    def put(self, request, id):
+        user = get_object_or_404(User, id=id)
+        banned = request.data.get('is_banned', True)
+        if not isinstance(banned, bool):
+            return Response({'error': 'is_banned must be true or false.'}, status=status.HTTP_400_BAD_REQUEST)
+        set_user_banned(user, banned, request.user, request.data.get('reason', ''))
+        return Response({'message': 'User banned.' if banned else 'User unbanned.'})
 
 class PendingSkillsView(generics.ListAPIView):
     queryset = Skill.objects.filter(status='pending')
     permission_classes = [permissions.IsAdminUser]
     # Add serializer
 
+def moderate_skill(skill, new_status, admin, reason=''):
+    with transaction.atomic():
+        previous = skill.status
+        skill.status = new_status
+        skill.save(update_fields=['status'])
+        AdminAction.objects.create(admin=admin, action_type=f'skill_{new_status}', target_id=skill.id, reason=reason)
+        events.record(events.SKILL_MODERATED, skill.id, {
+            'user': str(skill.user_id),
+            'status': new_status,
+            'previous': previous,
+            'reason': reason,
+        }, actor=admin)
+
 class ApproveSkillView(generics.UpdateAPIView):
-    queryset = Skill.objects.filter(status='pending')
+    queryset = Skill.objects.all()
     permission_classes = [permissions.IsAdminUser]
-    # Implement approve logic
+
+    def put(self, request, id):
+        skill = get_object_or_404(Skill, id=id)
+        moderate_skill(skill, 'approved', request.user, request.data.get('reason', ''))
+        return Response({'message': 'Skill approved.'})
 
 class RejectSkillView(generics.UpdateAPIView):
-    queryset = Skill.objects.filter(status='pending')
+    queryset = Skill.objects.all()
     permission_classes = [permissions.IsAdminUser]
-    # Implement reject logic
+
+    def put(self, request, id):
+        skill = get_object_or_404(Skill, id=id)
+        moderate_skill(skill, 'rejected', request.user, request.data.get('reason', ''))
+        return Response({'message': 'Skill rejected.'})
 
 class BroadcastMessageView(generics.CreateAPIView):
     permission_classes = [permissions.IsAdminUser]
     # Implement broadcast logic
+
+class EventListView(generics.GenericAPIView):
+    # Tail the event log: pass the returned cursor back as ?after= for the next batch.
+    permission_classes = [permissions.IsAdminUser]
+    max_limit = 10000
+
+    def get(self, request):
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(int(request.query_params.get('limit', 1000)), self.max_limit)
+        except ValueError:
+            return Response({'error': 'Invalid after or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        batch = events.read(after, limit, request.query_params.getlist('topic'))
+        return Response({
+            'events': EventSerializer(batch, many=True).data,
+            'cursor': batch[-1].seq if batch else after,
+        })
 from django.shortcuts import render
 
 # Create your views here.
+
+class StatsView(generics.GenericAPIView):
+    # Reads only pre-aggregated rollup rows, so cost depends on the range, not on table sizes.
+    permission_classes = [permissions.IsAdminUser]
+    series_metrics = [rollups.SWAPS_CREATED, rollups.SWAPS_ACCEPTED, rollups.SWAPS_REJECTED,
+                      rollups.SWAPS_COMPLETED, rollups.ACTIVE_USERS]
+    max_range = {StatRollup.HOUR: timedelta(days=14), StatRollup.DAY: timedelta(days=366)}
+    default_range = {StatRollup.HOUR: timedelta(days=2), StatRollup.DAY: timedelta(days=30)}
+
+    def get(self, request):
+        granularity = request.query_params.get('granularity', StatRollup.DAY)
+        if granularity not in rollups.GRANULARITIES:
+            return Response({'error': 'granularity must be hour or day.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end = self.parse_time(request.query_params.get('end')) or timezone.now()
+            start = self.parse_time(request.query_params.get('start')) or end - self.default_range[granularity]
+        except ValueError:
+            return Response({'error': 'start and end must be ISO dates or datetimes.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end or end - start > self.max_range[granularity]:
+            return Response({'error': 'Invalid or too large start/end range.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = StatRollup.objects.filter(
+            granularity=granularity, bucket__gte=rollups.bucket_start(start, granularity), bucket__lte=end,
+        ).order_by('bucket').values_list('metric', 'dimension', 'bucket', 'value')
+        series = {metric: [] for metric in self.series_metrics}
+        categories = {}
+        ratings = {}
+        for metric, dimension, bucket, value in rows:
+            if metric in series:
+                series[metric].append({'bucket': bucket, 'value': value})
+            elif metric in (rollups.CATEGORY_ACCEPTED, rollups.CATEGORY_DECIDED):
+                counts = categories.setdefault(dimension, {rollups.CATEGORY_ACCEPTED: 0, rollups.CATEGORY_DECIDED: 0})
+                counts[metric] += value
+            elif metric == rollups.RATINGS:
+                ratings[dimension] = ratings.get(dimension, 0) + value
+
+        acceptance = [{
+            'category': category,
+            'accepted': counts[rollups.CATEGORY_ACCEPTED],
+            'decided': counts[rollups.CATEGORY_DECIDED],
+            'rate': round(counts[rollups.CATEGORY_ACCEPTED] / counts[rollups.CATEGORY_DECIDED], 4) if counts[rollups.CATEGORY_DECIDED] else None,
+        } for category, counts in sorted(categories.items())]
+        return Response({
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'series': series,
+            'acceptance_by_category': acceptance,
+            'rating_distribution': dict(sorted(ratings.items())),
+        })
+
+    @staticmethod
+    def parse_time(value):
+        if not value:
+            return None
+        parsed = parse_datetime(value) or parse_datetime(value + 'T00:00:00')
+        if parsed is None:
+            raise ValueError(value)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+class RequestProfileListView(generics.ListAPIView):
+    # Newest first; ?url_name= and ?min_ms= narrow it down.
+    serializer_class = RequestProfileSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = RequestProfile.objects.defer('stats', 'sql_summary').order_by('-created_at')
+        if self.request.query_params.get('url_name'):
+            queryset = queryset.filter(url_name=self.request.query_params['url_name'])
+        try:
+            min_ms = float(self.request.query_params.get('min_ms', 0))
+        except ValueError:
+            min_ms = 0
+        if min_ms:
+            queryset = queryset.filter(duration_ms__gte=min_ms)
+        return queryset[:100]
+
+class RequestProfileDetailView(generics.RetrieveDestroyAPIView):
+    # Adds the top functions as a pstats report (?sort=cumulative|tottime|calls, ?limit=).
+    serializer_class = RequestProfileDetailSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = RequestProfile.objects.all()
+    lookup_url_kwarg = 'id'
+    sort_keys = ('cumulative', 'tottime', 'calls')
+
+    def retrieve(self, request, *args, **kwargs):
+        profile = self.get_object()
+        sort = request.query_params.get('sort', 'cumulative')
+        if sort not in self.sort_keys:
+            return Response({'error': f'sort must be one of {", ".join(self.sort_keys)}.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 30)), 500)
+        except ValueError:
+            return Response({'error': 'Invalid limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        data = self.get_serializer(profile).data
+        data['report'] = profiling.top_functions(profile, limit=limit, sort=sort)
+        return Response(data)
+
+class RequestProfileDownloadView(generics.GenericAPIView):
+    # Raw cProfile data; open with pstats, snakeviz or gprof2dot.
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, id):
+        profile = get_object_or_404(RequestProfile, id=id)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.id}.prof"'
+        return response
@@ -0,0 +1,149 @@
+# Request throughput with and without database connection reuse.
+#
+# Each mode runs in its own process so settings are read fresh:
+#   off         - a new connection per request (CONN_MAX_AGE=0)
+#   persistent  - persistent connections with health checks
+#   pool        - psycopg3 connection pool (Postgres only)
+#
+# Requests go through the real WSGI/ASGI handlers so request_started /
+# request_finished close or recycle connections exactly as in production.
+#
+#   python bench_db_pool.py --requests 2000 --concurrency 8 --path /api/user/skills/
+#   python bench_db_pool.py --interface asgi
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+MODES = {
+    'off': {'DATABASE_POOL': 'false', 'DATABASE_CONN_MAX_AGE': '0'},
+    'persistent': {'DATABASE_POOL': 'false', 'DATABASE_CONN_MAX_AGE': '60', 'DATABASE_CONN_HEALTH_CHECKS': 'true'},
+    'pool': {'DATABASE_POOL': 'true'},
+}
+
+
+def run_wsgi(path, requests, concurrency):
+    from skill_swap_api.wsgi import application
+
+    def start_response(status, headers):
+        if not status.startswith('2'):
+            raise RuntimeError(f'{path} returned {status}')
+
+    def worker(count):
+        for _ in range(count):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'HTTP_HOST': 'localhost',
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': sys.stdin.buffer,
+                'wsgi.errors': sys.stderr,
+            }
+            response = application(environ, start_response)
+            for _ in response:
+                pass
+            response.close()
+
+    per_worker = requests // concurrency
+    threads = [threading.Thread(target=worker, args=(per_worker,)) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_worker * concurrency, time.perf_counter() - started
+
+
+def run_asgi(path, requests, concurrency):
+    from skill_swap_api.asgi import application
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+    async def one():
+        finished = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start' and not 200 <= message['status'] < 300:
+                raise RuntimeError(f"{path} returned {message['status']}")
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        await application(dict(scope), receive, send)
+
+    async def worker(count):
+        for _ in range(count):
+            await one()
+
+    async def main():
+        per_worker = requests // concurrency
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+        return per_worker * concurrency, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def child(args):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skill_swap_api.settings')
+    runner = run_asgi if args.interface == 'asgi' else run_wsgi
+    # Warm up imports, URL resolver and (if enabled) the pool.
+    runner(args.path, args.concurrency, args.concurrency)
+    done, elapsed = runner(args.path, args.requests, args.concurrency)
+    print(f'{done} {elapsed:.4f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default='/api/user/skills/')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--interface', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--modes', default='off,persistent,pool')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f'{args.interface.upper()} GET {args.path}: {args.requests} requests, concurrency {args.concurrency}')
+    for mode in args.modes.split(','):
+        env = dict(os.environ, **MODES[mode])
+        cmd = [sys.executable, __file__, '--child', '--path', args.path, '--requests', str(args.requests),
+               '--concurrency', str(args.concurrency), '--interface', args.interface]
+        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f'{mode:>10}: failed\n{result.stderr.strip()}')
+            continue
+        done, elapsed = result.stdout.strip().splitlines()[-1].split()
+        done, elapsed = int(done), float(elapsed)
+        print(f'{mode:>10}: {done / elapsed:8.1f} req/s  ({elapsed * 1000 / done:.2f} ms/request)')
+
+
+if __name__ == '__main__':
+    main()
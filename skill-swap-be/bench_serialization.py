@@ -0,0 +1,76 @@
+# List serialization throughput: DRF serializers vs the values_list() fast path,
+# each rendered with the stdlib JSON renderer and with FastJSONRenderer
+# (orjson when installed).
+#
+# Reads existing rows, so populate the database first, e.g.
+#   python manage.py generate_synthetic_data --users 5000
+#   python bench_serialization.py --rows 10000 --repeat 5
+#
+# Timings include the query, since the fast path replaces model instantiation
+# as well as field serialization. The best of --repeat runs is reported.
+import argparse
+import os
+import time
+
+
+def measure(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--models', default='skill,swap,rating')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skill_swap_api.settings')
+    import django
+    django.setup()
+
+    from rest_framework.renderers import JSONRenderer
+    from skill_swap_api import renderers
+    from skill_swap_api.fastpath import build_rows, values_plan
+    from swap.models import Rating, Skill, Swap
+    from swap.serializers import RatingSerializer, SkillSerializer, SwapSerializer
+
+    targets = {
+        'skill': (Skill, SkillSerializer),
+        'swap': (Swap, SwapSerializer),
+        'rating': (Rating, RatingSerializer),
+    }
+    stdlib, fast = JSONRenderer(), renderers.FastJSONRenderer()
+    print(f'JSON backend for FastJSONRenderer: {"orjson" if renderers.orjson else "stdlib (orjson not installed)"}')
+
+    for name in args.models.split(','):
+        model, serializer_class = targets[name]
+        queryset = model.objects.order_by('pk')[:args.rows]
+        rows = queryset.count()
+        if rows < args.rows:
+            print(f'{name}: only {rows} rows available')
+        if not rows:
+            continue
+        plan = values_plan(serializer_class)
+        modes = {
+            'serializer + json': lambda: len(stdlib.render(serializer_class(queryset, many=True).data)),
+            'serializer + fast renderer': lambda: len(fast.render(serializer_class(queryset, many=True).data)),
+            'values + json': lambda: len(stdlib.render(build_rows(queryset, plan))),
+            'values + fast renderer': lambda: len(fast.render(build_rows(queryset, plan))),
+        }
+        print(f'\n{name}: {rows}-row page')
+        baseline = None
+        for mode, fn in modes.items():
+            elapsed, size = measure(fn, args.repeat)
+            baseline = baseline or elapsed
+            print(f'  {mode:<28} {rows / elapsed:10.0f} rows/s  {elapsed * 1000:8.1f} ms  '
+                  f'{baseline / elapsed:5.1f}x  ({size / 1024:.0f} KiB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# Versioned read-through cache for public, read-heavy endpoints.
+#
+# Entries live under a namespace whose version is bumped by model signals, so a
+# write makes every older entry unreachable instead of waiting for a TTL:
+#
+#     data = cache.fetch('skills', request.get_full_path(), compute)
+#     cache.bump('skills')   # from post_save / post_delete
+#
+# A cold or expiring key is recomputed by one caller at a time: threads in the
+# process queue on a striped lock and other processes see a cache.add() lock
+# and wait for (or keep serving) the current value. Entries also carry the cost
+# of computing them and are refreshed early with a probability that grows as
+# expiry approaches (XFetch), so hot keys rarely expire at all.
+#
+# Works with any Django cache backend (CACHE_URL): locmemcache:// (per process,
+# the default), filecache:///path (per host) or a shared one such as rediscache://.
+# Version bumps only reach processes sharing the backend, so outside DEBUG a
+# per-process or per-host backend is reported by a system check at startup.
+import math
+import random
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+
+_MISSING = object()
+_stripes = [threading.Lock() for _ in range(64)]
+
+# Namespaces used by the API.
+SKILLS = 'skills'
+
+
+def check_shared_backend(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or not backend.endswith(('LocMemCache', 'FileBasedCache')):
+        return []
+    return [checks.Warning(
+        f'CACHE_URL uses {backend.rsplit(".", 1)[-1]}, which other workers and hosts cannot see.',
+        hint='Cache invalidation and revocation only reach this process (or host); '
+             'set CACHE_URL to a shared backend such as rediscache://.',
+        id='skill_swap_api.W001',
+    )]
+
+
+def profile_namespace(user_id):
+    return f'profile:{user_id}'
+
+
+def thread_namespace(swap_id):
+    # Bumped on every message; long-polling readers watch it instead of the table.
+    return f'thread:{swap_id}'
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def version(namespace):
+    current = cache.get(_version_key(namespace))
+    if current is None:
+        # Start from the clock rather than 1, so a version evicted from the
+        # cache never comes back as a number that older entries were stored under.
+        current = time.time_ns()
+        if not cache.add(_version_key(namespace), current, None):
+            current = cache.get(_version_key(namespace), current)
+    return current
+
+
+def bump(*namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.add(_version_key(namespace), time.time_ns(), None)
+
+
+def invalidate(*namespaces):
+    """Bump namespaces now and again once the current transaction commits.
+
+    The second bump drops anything a concurrent reader cached from the
+    pre-commit state in between.
+    """
+    bump(*namespaces)
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def make_key(namespace, key):
+    return f'{namespace}:{version(namespace)}:{key}'
+
+
+def _fresh(entry, beta):
+    # entry = (value, seconds it took to compute, absolute expiry).
+    # -log(u) for u in (0, 1] is an exponential draw, so the refresh point moves
+    # earlier for expensive entries and is spread out across callers.
+    _, delta, expires = entry
+    return time.time() - delta * beta * math.log(1.0 - random.random()) < expires
+
+
+def fetch(namespace, key, compute, timeout=None, beta=None):
+    """Return the cached value for key in namespace, computing it at most once at a time."""
+    timeout = settings.CACHE_TIMEOUT if timeout is None else timeout
+    beta = settings.CACHE_EARLY_REFRESH_BETA if beta is None else beta
+    full_key = make_key(namespace, key)
+    entry = cache.get(full_key)
+    if entry is not None and _fresh(entry, beta):
+        return entry[0]
+
+    with _stripes[zlib.crc32(full_key.encode()) % len(_stripes)]:
+        latest = cache.get(full_key)
+        if latest is not None and _fresh(latest, beta):
+            return latest[0]
+        entry = latest
+        lock_key = f'{full_key}:lock'
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            if entry is not None:
+                return entry[0]
+            value = _wait(full_key)
+            if value is not _MISSING:
+                return value
+            # The other worker took too long or died; compute without the lock.
+            return _store(full_key, compute, timeout)
+        try:
+            return _store(full_key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+
+def _store(full_key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    cache.set(full_key, (value, time.monotonic() - started, time.time() + timeout), timeout)
+    return value
+
+
+def _wait(full_key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    delay = 0.005
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        entry = cache.get(full_key)
+        if entry is not None:
+            return entry[0]
+        delay = min(delay * 2, 0.1)
+    return _MISSING
@@ -0,0 +1,99 @@
+# Sparse fieldsets and nested expansion for API reads.
+#
+#     GET /api/swaps/?fields=id,status,requester&expand=requester,receiver_skill.user
+#
+# fields= keeps only the listed fields (dotted names reach into expanded
+# objects); expand= replaces a foreign key id with the related object, using
+# the serializer named in the serializer's `expandable` map. Both only apply to
+# GET/HEAD, so writes keep their usual shape.
+#
+# Views mixing in ExpandableQuerysetMixin turn the requested expansions into
+# select_related()/prefetch_related() paths, so a page costs the same number of
+# queries however many rows or related objects it carries.
+from rest_framework import permissions
+
+MAX_DEPTH = 3
+
+
+class Expand:
+    """An expandable relation: serializer for the related object and how to load it."""
+    def __init__(self, serializer, source=None, many=False):
+        self.serializer = serializer
+        self.source = source
+        self.many = many
+
+
+def parse_paths(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        parts = [part.strip() for part in path.split('.') if part.strip()][:MAX_DEPTH]
+        node = tree
+        for part in parts:
+            node = node.setdefault(part, {})
+    return tree
+
+
+def requested_shape(request):
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return {}, {}
+    return parse_paths(request.query_params.get('fields')), parse_paths(request.query_params.get('expand'))
+
+
+class ExpandableFieldsMixin:
+    # name -> Expand(...). Related serializers should use the mixin too.
+    expandable = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            # Top-level serializer: shape comes from the request. Nested ones
+            # are given theirs by the parent below.
+            fields, expand = requested_shape(self.context.get('request'))
+        for name, nested_expand in expand.items():
+            if name not in self.expandable:
+                continue
+            spec = self.expandable[name]
+            self.fields[name] = spec.serializer(
+                source=spec.source, many=spec.many, read_only=True,
+                fields=fields.get(name, {}), expand=nested_expand,
+            )
+        if fields:
+            for name in list(self.fields):
+                if name not in fields:
+                    self.fields.pop(name)
+
+    @classmethod
+    def related_paths(cls, expand, prefix=''):
+        """(select_related paths, prefetch_related paths) needed for an expand tree."""
+        select, prefetch = [], []
+        for name, nested in expand.items():
+            spec = cls.expandable.get(name)
+            if spec is None:
+                continue
+            path = prefix + (spec.source or name)
+            (prefetch if spec.many else select).append(path)
+            nested_select, nested_prefetch = spec.serializer.related_paths(nested, path + '__')
+            # Anything below a prefetch has to be prefetched too.
+            prefetch.extend(nested_prefetch + (nested_select if spec.many else []))
+            if not spec.many:
+                select.extend(nested_select)
+        return select, prefetch
+
+
+class ExpandableQuerysetMixin:
+    # For views whose serializer uses ExpandableFieldsMixin. Views that build
+    # their queryset without super().get_queryset() call optimize_queryset().
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def optimize_queryset(self, queryset):
+        _, expand = requested_shape(self.request)
+        if not expand:
+            return queryset
+        select, prefetch = self.get_serializer_class().related_paths(expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -0,0 +1,90 @@
+# Read-only fast path for large list endpoints.
+#
+# ModelSerializer builds a field object tree and calls to_representation() per
+# field per row; for plain columns that is most of a list request's CPU time.
+# ValuesListMixin derives a plan from the view's serializer once (column per
+# field, plus a converter for the few field types whose output differs from
+# the raw value, such as datetimes), then builds each row as
+# dict(zip(names, values_list_row)). The rendered JSON is identical to the
+# serializer's; in response.data UUIDs stay UUID objects instead of strings.
+#
+# Serializers with fields the plan cannot express (methods, nested or dotted
+# sources), requests with ?expand=, and paginated views use the regular path.
+# FAST_LIST_SERIALIZATION=false turns the fast path off.
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import fields as drf_fields, relations
+from rest_framework.response import Response
+
+from .expansion import requested_shape
+
+# Field types whose to_representation() returns the value unchanged, or a
+# value the JSON renderer encodes identically (UUID -> str).
+PASSTHROUGH = (
+    drf_fields.BooleanField, drf_fields.CharField, drf_fields.IntegerField, drf_fields.FloatField,
+    drf_fields.UUIDField, drf_fields.JSONField, drf_fields.ListField, drf_fields.DictField,
+    drf_fields.ChoiceField, relations.PrimaryKeyRelatedField,
+)
+# Field types whose output must go through to_representation().
+CONVERTED = (drf_fields.DateTimeField, drf_fields.DateField, drf_fields.TimeField, drf_fields.DecimalField)
+# Subclasses that override to_representation (e.g. a custom CharField) fall back.
+_PASSTHROUGH_METHODS = {cls.to_representation for cls in PASSTHROUGH}
+
+
+@lru_cache(maxsize=None)
+def values_plan(serializer_class):
+    """[(output name, column, converter or None)], or None if the serializer needs the full path."""
+    plan = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if '.' in field.source or field.source == '*':
+            return None
+        if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is not None:
+            return None
+        if isinstance(field, CONVERTED):
+            plan.append((name, field.source, field.to_representation))
+        elif isinstance(field, PASSTHROUGH) and type(field).to_representation in _PASSTHROUGH_METHODS:
+            plan.append((name, field.source, None))
+        else:
+            return None
+    return plan
+
+
+def build_rows(queryset, plan):
+    names = [name for name, _, _ in plan]
+    converters = [(index, convert) for index, (_, _, convert) in enumerate(plan) if convert is not None]
+    rows = queryset.values_list(*[column for _, column, _ in plan])
+    if not converters:
+        return [dict(zip(names, row)) for row in rows]
+    data = []
+    for row in rows:
+        row = list(row)
+        for index, convert in converters:
+            if row[index] is not None:
+                row[index] = convert(row[index])
+        data.append(dict(zip(names, row)))
+    return data
+
+
+class ValuesListMixin:
+    # For list views whose serializer's fields map onto model columns.
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan(request)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        return Response(build_rows(self.filter_queryset(self.get_queryset()), plan))
+
+    def get_values_plan(self, request):
+        if not settings.FAST_LIST_SERIALIZATION or self.paginator is not None:
+            return None
+        fields, expand = requested_shape(request)
+        if expand:
+            return None
+        plan = values_plan(self.get_serializer_class())
+        if plan is None or not fields:
+            return plan
+        if any(nested for nested in fields.values()):
+            return None
+        return [step for step in plan if step[0] in fields]
@@ -0,0 +1,21 @@
+# Helpers for management commands that fan work out to worker processes.
+from itertools import islice
+
+import django
+from django.db import connections
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer.
+
+    Works with both fork and spawn: spawned workers need Django configured, and
+    forked workers must not reuse database connections inherited from the parent.
+    """
+    django.setup()
+    connections.close_all()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
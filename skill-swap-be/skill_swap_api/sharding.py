@@ -0,0 +1,262 @@
+# Optional hash sharding of swaps and the rows that hang off them.
+#
+# SWAP_SHARDS lists extra databases. With none (the default) there is one
+# shard, 'default', and everything here reduces to plain single-database
+# calls. With some, every database in SHARD_DATABASES carries the full schema
+# and rows of sharded models are placed by a jump consistent hash of the
+# owning user's id. A model opts in with one of:
+#
+#     shard_key = 'requester_id'                  # Swap, ArchivedSwap: the owner's id
+#     shard_parent = ('swap', 'archived_swap')    # Rating: wherever its swap is
+#
+# and ShardedQuerySet.as_manager(), so objects.create() is placed too.
+# ShardRouter sends saves, deletes and related-object reads of those rows to
+# their shard and every other model to 'default'. Reads that are not tied to
+# one owner (swaps a user received, ratings of a user) go through fan_out(),
+# which runs the queryset on each shard and merges the results in its
+# ordering; get() and find() locate a single row. Adding a shard relocates
+# about 1/N of the owners, all onto the new shard; rebalance_shards moves them.
+#
+# Limitations:
+# - No cross-shard transactions. atomic() opens one per database and they
+#   commit in turn, the shard before 'default'.
+# - Foreign keys from sharded rows to users and skills are not enforced by
+#   the database, and deleting a user or skill does not cascade into other
+#   shards.
+# - Aggregates across shards are combined in Python by the caller.
+# - fan_out() does not support offsets; fan-out views are unpaginated.
+# - Code that queries a sharded model without fan_out()/get() only sees the
+#   'default' shard. That covers the views and jobs documented in API_SPEC.md.
+import uuid
+from contextlib import ExitStack, contextmanager
+from itertools import chain
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.http import Http404
+from rest_framework.response import Response
+
+from .fastpath import build_rows
+
+DEFAULT = 'default'
+_MASK = (1 << 64) - 1
+
+
+def aliases():
+    return settings.SHARD_DATABASES
+
+
+def enabled():
+    return len(settings.SHARD_DATABASES) > 1
+
+
+def is_sharded(model):
+    return bool(getattr(model, 'shard_key', None) or getattr(model, 'shard_parent', None))
+
+
+def jump_hash(key, buckets):
+    """Lamping & Veach's jump consistent hash: growing buckets by one moves 1/buckets of the keys."""
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & _MASK
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for_user(user_id):
+    names = aliases()
+    if len(names) == 1:
+        return names[0]
+    return names[jump_hash(uuid.UUID(str(user_id)).int & _MASK, len(names))]
+
+
+def shard_of(instance):
+    """Database a row of a sharded model lives in, or belongs in if unsaved."""
+    if not instance._state.adding:
+        return instance._state.db
+    model = type(instance)
+    if getattr(model, 'shard_key', None):
+        return shard_for_user(getattr(instance, model.shard_key))
+    for name in model.shard_parent:
+        field = model._meta.get_field(name)
+        if getattr(instance, field.attname) is None:
+            continue
+        parent = field.get_cached_value(instance, None) or get(field.related_model._base_manager.all(), pk=getattr(instance, field.attname))
+        if parent is not None:
+            return shard_of(parent)
+    return None
+
+
+class ShardRouter:
+    def db_for_read(self, model, **hints):
+        if not enabled():
+            return None
+        if not is_sharded(model):
+            # Not None: Django would fall back to the hinted instance's database,
+            # e.g. a shard for swap.requester.
+            return DEFAULT
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)):
+            return shard_of(instance)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows point at users and skills in 'default' by design.
+        return True
+
+
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # QuerySet.create() saves with using=self.db, which has no row to route
+        # on; leave the choice to the router unless a database was picked.
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+
+@contextmanager
+def atomic(*names):
+    """transaction.atomic() on 'default' and each given database, entered in that order."""
+    with ExitStack() as stack:
+        for name in dict.fromkeys((DEFAULT,) + names):
+            stack.enter_context(transaction.atomic(using=name))
+        yield
+
+
+def _probe_order(prefer):
+    names = list(aliases())
+    if prefer in names:
+        names.remove(prefer)
+        names.insert(0, prefer)
+    return names
+
+
+def _value(row, name):
+    if isinstance(row, dict):
+        return row[name] if name in row else row[name + '_id']
+    return row.serializable_value(name)
+
+
+def _sort(rows, ordering):
+    for name in reversed(ordering):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        rows.sort(key=lambda row: (_value(row, name) is not None, _value(row, name)), reverse=descending)
+    return rows
+
+
+def fan_out(queryset, fetch=list):
+    """fetch(queryset) on every shard, concatenated and sorted by the queryset's ordering.
+
+    fetch must return a list of model instances or dicts; a sliced queryset
+    is cut back to its limit after merging.
+    """
+    if not enabled():
+        return fetch(queryset)
+    query = queryset.query
+    if query.low_mark:
+        raise ValueError('fan_out() does not support offsets.')
+    rows = list(chain.from_iterable(fetch(queryset.using(name)) for name in aliases()))
+    ordering = [name for name in (query.order_by or queryset.model._meta.ordering) if isinstance(name, str)]
+    if ordering:
+        _sort(rows, ordering)
+    if query.high_mark is not None:
+        rows = rows[:query.high_mark]
+    return rows
+
+
+def iterate(queryset, chunk_size=2000):
+    """Stream rows from every shard in turn; the ordering holds within each shard only."""
+    return chain.from_iterable(queryset.using(name).iterator(chunk_size=chunk_size) for name in aliases())
+
+
+def get(queryset, prefer=None, **lookup):
+    """The row matching lookup on whichever shard has it (trying prefer first), or None."""
+    for name in _probe_order(prefer) if enabled() else [None]:
+        obj = (queryset.using(name) if name else queryset).filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def find(model, pk, prefer=None):
+    """Shard holding the model row pk, or None. Without sharding, 'default' without a query."""
+    if not enabled():
+        return DEFAULT
+    for name in _probe_order(prefer):
+        if model._base_manager.using(name).filter(pk=pk).exists():
+            return name
+    return None
+
+
+def _children(model):
+    return [(child, name) for child in apps.get_models() for name in getattr(child, 'shard_parent', ())
+            if child._meta.get_field(name).related_model is model]
+
+
+def _copy(model, rows, source, target):
+    # Rows placed through these ones first, so deletes on source run child-first.
+    # The deletes are raw: a collector would cascade into rows on 'default'
+    # (SwapBooking) that still point at the moved rows by id.
+    model._base_manager.using(target).bulk_create(rows)
+    pks = [row.pk for row in rows]
+    for child, name in _children(model):
+        kids = list(child._base_manager.using(source).filter(**{f'{name}__in': pks}))
+        if kids:
+            _copy(child, kids, source, target)
+    moved = model._base_manager.using(source).filter(pk__in=pks)
+    moved._raw_delete(moved.db)
+
+
+def move(model, pks, source, target):
+    """Move rows of a sharded model, with the rows placed through them, from source to target."""
+    with atomic(source, target):
+        rows = list(model._base_manager.using(source).filter(pk__in=pks))
+        if rows:
+            _copy(model, rows, source, target)
+    return len(rows)
+
+
+def _leaf_paths(tree, prefix=''):
+    paths = []
+    for name, nested in tree.items():
+        paths.extend(_leaf_paths(nested, f'{prefix}{name}__') if nested else [prefix + name])
+    return paths
+
+
+class FanOutMixin:
+    # For generic views over a sharded model: list() reads every shard and
+    # get_object() finds the row's shard. Goes before ValuesListMixin, whose
+    # plan it reuses, and ExpandableQuerysetMixin; the views must not be paginated.
+    def list(self, request, *args, **kwargs):
+        if not enabled():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = self.get_values_plan(request) if hasattr(self, 'get_values_plan') else None
+        if plan is not None:
+            return Response(fan_out(queryset, lambda shard: build_rows(shard, plan)))
+        return Response(self.get_serializer(fan_out(queryset), many=True).data)
+
+    def optimize_queryset(self, queryset):
+        # A join from a shard would find no users or skills there, so expanded
+        # relations are prefetched instead, each query routed to its own database.
+        queryset = super().optimize_queryset(queryset)
+        if not enabled() or not queryset.query.select_related:
+            return queryset
+        return queryset.select_related(None).prefetch_related(*_leaf_paths(queryset.query.select_related))
+
+    def get_object(self):
+        if not enabled():
+            return super().get_object()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get(self.filter_queryset(self.get_queryset()), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -1,6 +1,6 @@
 from django.contrib import admin
 # Register your models here.
-from .models import Skill, Swap, Rating, AdminAction
+from .models import Skill, Swap, Rating, AdminAction, Event, EventCursor, SkillCategory, CanonicalSkill, SkillAlias, CategoryAlias
 
 @admin.register(Skill)
 class SkillAdmin(admin.ModelAdmin):
@@ -8,7 +8,28 @@ class SkillAdmin(admin.ModelAdmin):
     search_fields = ('name', 'category', 'level', 'type', 'status')
     list_filter = ('category', 'level', 'type', 'status')
     ordering = ('-id',)
-    readonly_fields = ('id',)
+    readonly_fields = ('id', 'canonical_skill', 'canonical_category')
+
+class SkillAliasInline(admin.TabularInline):
+    model = SkillAlias
+    extra = 0
+
+class CategoryAliasInline(admin.TabularInline):
+    model = CategoryAlias
+    extra = 0
+
+@admin.register(CanonicalSkill)
+class CanonicalSkillAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'key', 'category')
+    search_fields = ('name', 'key')
+    list_filter = ('category',)
+    inlines = [SkillAliasInline]
+
+@admin.register(SkillCategory)
+class SkillCategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'key')
+    search_fields = ('name', 'key')
+    inlines = [CategoryAliasInline]
 
 @admin.register(Swap)
 class SwapAdmin(admin.ModelAdmin):
@@ -26,6 +47,17 @@ class RatingAdmin(admin.ModelAdmin):
     ordering = ('-id',)
     readonly_fields = ('id',)
 
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'topic', 'object_id', 'actor', 'created_at')
+    list_filter = ('topic',)
+    ordering = ('-seq',)
+    readonly_fields = ('seq', 'topic', 'object_id', 'actor', 'payload', 'created_at')
+
+@admin.register(EventCursor)
+class EventCursorAdmin(admin.ModelAdmin):
+    list_display = ('name', 'position', 'updated_at')
+
 @admin.register(AdminAction)
 class AdminActionAdmin(admin.ModelAdmin):
     list_display = ('id', 'admin', 'action_type', 'target_id', 'reason')
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class SwapConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'swap'
+
+    def ready(self):
+        from skill_swap_api import cache
+
+        from . import signals  # noqa: F401
+        checks.register(cache.check_shared_backend, checks.Tags.caches)
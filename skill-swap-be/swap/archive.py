@@ -0,0 +1,55 @@
+# Hot/cold split for swaps.
+#
+# Finished swaps older than SWAP_ARCHIVE_AFTER_DAYS are moved from Swap to
+# ArchivedSwap in small batches, so the Swap table and its indexes only carry
+# pending/accepted rows plus recent history. Ratings follow their swap through
+# Rating.archived_swap. user_history() reads both tables in one UNION query.
+# With sharding each shard is archived on its own; ratings and archived rows
+# stay on their swap's shard.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, F, Q, Value
+from django.utils import timezone
+
+from .models import ArchivedSwap, Rating, Swap
+
+HISTORY_FIELDS = [
+    'id', 'requester_id', 'receiver_id', 'requester_skill_id', 'receiver_skill_id',
+    'status', 'proposed_time_slots', 'actual_time', 'created_at', 'finished_at',
+]
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.SWAP_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size=500, using='default'):
+    """Move up to batch_size finished swaps older than cutoff in one database. Returns the number moved."""
+    with transaction.atomic(using=using):
+        swaps = list(
+            Swap.objects.using(using).select_for_update(skip_locked=True)
+            .filter(status__in=Swap.FINISHED_STATUSES, finished_at__lt=cutoff)
+            .order_by('finished_at')[:batch_size]
+        )
+        if not swaps:
+            return 0
+        ids = [swap.id for swap in swaps]
+        ArchivedSwap.objects.using(using).bulk_create([
+            ArchivedSwap(**{field: getattr(swap, field) for field in HISTORY_FIELDS}) for swap in swaps
+        ], ignore_conflicts=True)
+        Rating.objects.using(using).filter(swap_id__in=ids).update(archived_swap_id=F('swap_id'), swap=None)
+        Swap.objects.using(using).filter(id__in=ids).delete()
+    return len(ids)
+
+
+def user_history(user):
+    """All swaps of a user, active and archived, newest first. One shard's worth; see sharding.fan_out()."""
+    hot = (Swap.objects.filter(Q(requester=user) | Q(receiver=user))
+           .values(*HISTORY_FIELDS, archived=Value(False, output_field=BooleanField())))
+    cold = (ArchivedSwap.objects.filter(Q(requester=user) | Q(receiver=user))
+            .values(*HISTORY_FIELDS, archived=Value(True, output_field=BooleanField())))
+    return hot.union(cold, all=True).order_by('-created_at')
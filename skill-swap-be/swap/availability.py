@@ -0,0 +1,112 @@
+# Weekly availability helpers.
+# Slots are stored as [{"day": "Monday", "start": "18:00", "end": "20:00"}, ...]
+# and handled here as (start, end) minute-of-week intervals, Monday 00:00 = 0.
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _minute_of_day(value):
+    hours, minutes = str(value).split(':')[:2]
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        raise ValueError(value)
+    return hours * 60 + minutes
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_slots(slots):
+    """Turn stored slot dicts into sorted, merged minute-of-week intervals.
+
+    Malformed entries (free text, unknown days, bad times) are skipped so legacy
+    availability values never break callers. Slots that cross midnight continue
+    into the next day, and Sunday night wraps around to Monday.
+    """
+    intervals = []
+    for slot in slots or []:
+        if not isinstance(slot, dict):
+            continue
+        try:
+            day = DAYS.index(str(slot.get('day', '')).strip().lower())
+            start = _minute_of_day(slot['start'])
+            end = _minute_of_day(slot['end'])
+        except (KeyError, ValueError):
+            continue
+        if end <= start:
+            end += MINUTES_PER_DAY
+        start += day * MINUTES_PER_DAY
+        end += day * MINUTES_PER_DAY
+        if end > MINUTES_PER_WEEK:
+            intervals.append((start, MINUTES_PER_WEEK))
+            intervals.append((0, end - MINUTES_PER_WEEK))
+        else:
+            intervals.append((start, end))
+    return merge_intervals(intervals)
+
+
+def intersect(a, b):
+    """Intersection of two sorted, merged interval lists."""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def total_minutes(intervals):
+    return sum(end - start for start, end in intervals)
+
+
+def overlap_minutes(a, b):
+    return total_minutes(intersect(a, b))
+
+
+def subtract(a, b):
+    """Parts of sorted, merged intervals a not covered by b."""
+    result = []
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] < end:
+            if b[k][0] > start:
+                result.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def format_slot(start, end):
+    """Inverse of parse_slots for a single interval within one week."""
+    day, start_minute = divmod(start % MINUTES_PER_WEEK, MINUTES_PER_DAY)
+    end_minute = start_minute + (end - start)
+    if end_minute > MINUTES_PER_DAY:
+        end_minute -= MINUTES_PER_DAY
+    return {
+        'day': DAYS[day].capitalize(),
+        'start': f'{start_minute // 60:02d}:{start_minute % 60:02d}',
+        'end': f'{end_minute // 60 % 24:02d}:{end_minute % 60:02d}',
+    }
+
+
+def minute_of_week(value):
+    return value.weekday() * MINUTES_PER_DAY + value.hour * 60 + value.minute
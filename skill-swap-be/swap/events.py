@@ -0,0 +1,143 @@
+# Append-only event log.
+#
+# record() is called inside the same transaction as the change it describes,
+# so an event exists if and only if the change committed. Consumers read in seq
+# order from a saved cursor instead of rescanning tables:
+#
+#     consumer = Consumer('notifications', topics=['swap.status_changed'])
+#     consumer.run(handle_batch)              # drain what is there
+#     consumer.run(handle_batch, follow=True)  # keep tailing
+#
+# seq comes from an auto-increment column. Under concurrency a lower seq can
+# commit after a higher one, so readers only see events older than
+# EVENT_LOG_SETTLE_SECONDS; a transaction that stays open longer than that may
+# be skipped by a consumer that has already moved past it.
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from . import taxonomy
+from .models import Event, EventCursor
+
+SWAP_CREATED = 'swap.created'
+SWAP_STATUS_CHANGED = 'swap.status_changed'
+RATING_CREATED = 'rating.created'
+SKILL_MODERATED = 'skill.moderated'
+
+
+def record(topic, object_id, payload=None, actor=None):
+    return Event.objects.create(topic=topic, object_id=object_id, payload=payload or {}, actor=actor)
+
+
+def swap_payload(swap, **extra):
+    payload = {
+        'requester': str(swap.requester_id),
+        'receiver': str(swap.receiver_id),
+        'requester_skill': str(swap.requester_skill_id),
+        'receiver_skill': str(swap.receiver_skill_id),
+        'status': swap.status,
+        'category': taxonomy.category_name(swap.receiver_skill.canonical_category_id) or swap.receiver_skill.category,
+    }
+    payload.update(extra)
+    return payload
+
+
+def read(after=0, limit=1000, topics=None):
+    """Events with seq > after, oldest first, excluding ones still settling."""
+    settled = timezone.now() - timedelta(seconds=settings.EVENT_LOG_SETTLE_SECONDS)
+    queryset = Event.objects.filter(seq__gt=after, created_at__lte=settled)
+    if topics:
+        queryset = queryset.filter(topic__in=topics)
+    return list(queryset.order_by('seq')[:limit])
+
+
+class Consumer:
+    """Reads the event log in batches from a cursor persisted in EventCursor.
+
+    The cursor only advances after the handler returns, so a crash replays the
+    last batch (at-least-once delivery); handlers should be idempotent.
+    """
+
+    def __init__(self, name, batch_size=1000, topics=None):
+        self.name = name
+        self.batch_size = batch_size
+        self.topics = topics
+
+    @property
+    def position(self):
+        cursor, _ = EventCursor.objects.get_or_create(name=self.name)
+        return cursor.position
+
+    def seek(self, position):
+        EventCursor.objects.update_or_create(name=self.name, defaults={'position': position})
+
+    def poll(self, handler):
+        """Hand one batch to handler and advance the cursor. Returns the batch size."""
+        batch = read(self.position, self.batch_size, self.topics)
+        if batch:
+            handler(batch)
+            self.seek(batch[-1].seq)
+        return len(batch)
+
+    def run(self, handler, follow=False, poll_interval=1.0):
+        while True:
+            if self.poll(handler) < self.batch_size:
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+
+
+def stale_cursors(retention_days=None):
+    """Cursors that have not moved within the retention window.
+
+    prune() and compact() stop waiting for them, so an abandoned or renamed
+    consumer cannot hold the log back forever; prune_events lists them.
+    """
+    if retention_days is None:
+        retention_days = settings.EVENT_LOG_RETENTION_DAYS
+    return EventCursor.objects.filter(updated_at__lt=timezone.now() - timedelta(days=retention_days))
+
+
+def _slowest(retention_days=None):
+    live = EventCursor.objects.exclude(pk__in=stale_cursors(retention_days).values('pk'))
+    return live.aggregate(position=Min('position'))['position']
+
+
+def prune(retention_days=None, batch_size=10000):
+    """Delete events past retention that every live consumer has already read."""
+    if retention_days is None:
+        retention_days = settings.EVENT_LOG_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    queryset = Event.objects.filter(created_at__lt=cutoff)
+    slowest = _slowest(retention_days)
+    if slowest is not None:
+        queryset = queryset.filter(seq__lte=slowest)
+    return _delete_in_batches(queryset, batch_size)
+
+
+def compact(compact_after_days=None, batch_size=10000):
+    """Keep only the latest event per (topic, object) among events older than the compaction age."""
+    if compact_after_days is None:
+        compact_after_days = settings.EVENT_LOG_COMPACT_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=compact_after_days)
+    newer = Event.objects.filter(topic=OuterRef('topic'), object_id=OuterRef('object_id'), seq__gt=OuterRef('seq'))
+    queryset = Event.objects.filter(created_at__lt=cutoff).filter(Exists(newer))
+    # A consumer that fell behind still sees every transition it has not read.
+    slowest = _slowest()
+    if slowest is not None:
+        queryset = queryset.filter(seq__lte=slowest)
+    return _delete_in_batches(queryset, batch_size)
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            seqs = list(queryset.order_by('seq').values_list('seq', flat=True)[:batch_size])
+            if not seqs:
+                return deleted
+            deleted += Event.objects.filter(seq__in=seqs).delete()[0]
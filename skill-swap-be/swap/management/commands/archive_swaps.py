@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from skill_swap_api import sharding
+from swap import archive
+
+
+class Command(BaseCommand):
+    help = 'Move finished swaps older than the archive age into cold storage, in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.SWAP_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.5, help='Pause between batches, in seconds.')
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking again every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=3600)
+
+    def handle(self, *args, **options):
+        while True:
+            moved = self.run_once(options)
+            self.stdout.write(f'Archived {moved} swaps.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def run_once(self, options):
+        cutoff = archive.archive_cutoff(options['older_than_days'])
+        moved = 0
+        for shard in sharding.aliases():
+            batches = 0
+            while options['max_batches'] is None or batches < options['max_batches']:
+                count = archive.archive_batch(cutoff, options['batch_size'], using=shard)
+                if not count:
+                    break
+                moved += count
+                batches += 1
+                time.sleep(options['sleep'])
+        return moved
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from skill_swap_api import cache
+from swap import taxonomy
+
+
+class Command(BaseCommand):
+    help = 'Reload the skill taxonomy from swap/data/taxonomy.csv and map unmapped (pending) skills onto it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Remap every skill, not only unmapped ones (after editing aliases).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--no-seed', action='store_true', help='Skip loading the CSV.')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            counts = taxonomy.seed()
+            self.stdout.write('Loaded {categories} categories, {skills} skills and {aliases} aliases.'.format(**counts))
+        updated = taxonomy.backfill(batch_size=options['batch_size'], remap=options['all'])
+        # Queryset updates bypass the Skill signals.
+        cache.invalidate(cache.SKILLS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Mapped {updated} skills. Run compute_suggestions to rebuild suggestions on canonical skills.'))
@@ -0,0 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from skill_swap_api.parallel import chunked, init_worker
+from swap import recommendations
+from swap.models import SuggestedSwap
+
+
+def _rebuild_chunk(user_ids):
+    return len(user_ids), recommendations.rebuild_users(user_ids)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the suggested swap feed for every eligible user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users scored per task.')
+
+    def handle(self, *args, **options):
+        user_ids = recommendations.eligible_users().order_by('id').values_list('id', flat=True).iterator(chunk_size=5000)
+        chunks = list(chunked(user_ids, options['chunk_size']))
+
+        users = rows = 0
+        if options['workers'] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+                for future in as_completed([pool.submit(_rebuild_chunk, chunk) for chunk in chunks]):
+                    done, written = future.result()
+                    users += done
+                    rows += written
+        else:
+            for chunk in chunks:
+                done, written = _rebuild_chunk(chunk)
+                users += done
+                rows += written
+        # Users who are no longer eligible keep no suggestions and appear in none.
+        SuggestedSwap.objects.exclude(user__in=recommendations.eligible_users()).delete()
+        SuggestedSwap.objects.exclude(candidate__in=recommendations.eligible_users()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Scored {users} users, stored {rows} suggestions.'))
@@ -0,0 +1,200 @@
+import random
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from skill_swap_api import sharding
+from skill_swap_api.parallel import init_worker
+from swap import scheduling, taxonomy
+from swap.availability import DAYS
+from swap.models import Rating, Skill, Swap, SwapBooking
+from user import geo
+from user.models import User
+
+CATALOG = {
+    'Programming': ['Python', 'JavaScript', 'Go', 'Rust', 'SQL', 'Django', 'React', 'Data Science'],
+    'Language': ['Spanish', 'French', 'German', 'Japanese', 'Mandarin', 'Hindi', 'English'],
+    'Music': ['Guitar', 'Piano', 'Singing', 'Drums', 'Music Production'],
+    'Design': ['Photoshop', 'Figma', 'Illustration', 'Photography', 'Video Editing'],
+    'Lifestyle': ['Cooking', 'Yoga', 'Gardening', 'Baking', 'Fitness Coaching'],
+    'Business': ['Marketing', 'Public Speaking', 'Accounting', 'Negotiation'],
+}
+LEVELS = ['Beginner', 'Intermediate', 'Expert']
+RATING_WEIGHTS = [0.03, 0.05, 0.12, 0.35, 0.45]
+
+
+def parse_weights(value, allowed):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in allowed:
+            raise CommandError(f'Unknown key {name.strip()!r}; expected one of {", ".join(allowed)}.')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _availability(rng, max_slots):
+    slots = []
+    for _ in range(rng.randint(1, max_slots)):
+        start = rng.randint(6, 21)
+        slots.append({'day': rng.choice(DAYS).capitalize(), 'start': f'{start:02d}:00', 'end': f'{min(start + rng.randint(1, 3), 24):02d}:00'})
+    return slots
+
+
+def _generate_block(start, count, config):
+    """Create users [start, start + count) and their skills, swaps, ratings and bookings.
+
+    Seeded per block, so the same options produce the same rows whatever the
+    number of workers. Swap partners are drawn from the same block.
+    """
+    rng = random.Random(f'{config["seed"]}:{start}')
+    now = timezone.now()
+    places = config['places']
+    place_weights = [1 / (rank + 1) ** config['location_skew'] for rank in range(len(places))]
+
+    users = []
+    for index in range(start, start + count):
+        latitude, longitude, name = rng.choices(places, place_weights)[0]
+        latitude += rng.uniform(-0.1, 0.1)
+        longitude += rng.uniform(-0.1, 0.1)
+        users.append(User(
+            id=_uuid(rng), email=f'user{index}@{config["email_domain"]}', name=f'Synthetic User {index}',
+            password=config['password'], location=name, latitude=latitude, longitude=longitude,
+            geohash=geo.encode(latitude, longitude), bio='', availability=_availability(rng, config['max_slots']),
+            is_public=rng.random() < config['public_ratio'], email_verified=True,
+        ))
+
+    skills = []
+    offers = {}
+    taxonomy_memo = {}
+    categories = list(CATALOG)
+    for user in users:
+        for _ in range(max(1, round(rng.expovariate(1 / config['skills_per_user'])))):
+            category = rng.choice(categories)
+            skill = Skill(
+                id=_uuid(rng), user=user, name=rng.choice(CATALOG[category]), description='', category=category,
+                level=rng.choice(LEVELS), type='offer' if rng.random() < config['offer_ratio'] else 'request',
+                status=rng.choices(['approved', 'pending', 'rejected'], [0.9, 0.08, 0.02])[0],
+            )
+            # bulk_create skips the pre_save signal that maps skills onto the taxonomy.
+            taxonomy.assign(skill, taxonomy_memo)
+            skills.append(skill)
+            if skill.type == 'offer':
+                offers.setdefault(user.id, []).append(skill)
+
+    swaps = []
+    ratings = []
+    bookings = []
+    statuses, status_weights = zip(*config['status_weights'].items())
+    offering = [user for user in users if user.id in offers]
+    swap_count = round(len(users) * config['swaps_per_user']) if len(offering) > 1 else 0
+    for _ in range(swap_count):
+        requester, receiver = rng.sample(offering, 2)
+        status = rng.choices(statuses, status_weights)[0]
+        created_at = now - timedelta(seconds=rng.randint(0, config['days'] * 86400))
+        swap = Swap(
+            id=_uuid(rng), requester=requester, receiver=receiver, status=status, created_at=created_at,
+            requester_skill=rng.choice(offers[requester.id]), receiver_skill=rng.choice(offers[receiver.id]),
+            proposed_time_slots=rng.sample(requester.availability, 1),
+        )
+        if status in ('accepted', 'completed'):
+            swap.actual_time = created_at + timedelta(days=rng.randint(1, 14), hours=rng.randint(0, 23))
+        if status in Swap.FINISHED_STATUSES:
+            swap.finished_at = min(created_at + timedelta(days=rng.randint(1, 30)), now)
+        swaps.append(swap)
+        if status == 'accepted':
+            bookings.extend(
+                SwapBooking(swap=swap, user_id=user_id, kind=kind, start=interval_start, end=interval_end)
+                for kind, interval_start, interval_end in scheduling.swap_intervals(swap)
+                for user_id in (requester.id, receiver.id)
+            )
+        if status == 'completed' and rng.random() < config['rating_ratio']:
+            ratings.append(Rating(
+                id=_uuid(rng), swap=swap, rater=requester, rated=receiver,
+                rating=rng.choices(range(1, 6), RATING_WEIGHTS)[0], comment='',
+            ))
+
+    # bulk_create gives the router no instance to place, so sharded rows are
+    # grouped by shard here: swaps by requester, ratings with their swap.
+    placed = defaultdict(lambda: ([], []))
+    for swap in swaps:
+        placed[sharding.shard_for_user(swap.requester_id)][0].append(swap)
+    for rating in ratings:
+        placed[sharding.shard_for_user(rating.swap.requester_id)][1].append(rating)
+
+    batch_size = config['batch_size']
+    with sharding.atomic(*placed):
+        for model, rows in ((User, users), (Skill, skills)):
+            model.objects.bulk_create(rows, batch_size=batch_size)
+        for alias, (shard_swaps, shard_ratings) in placed.items():
+            Swap.objects.using(alias).bulk_create(shard_swaps, batch_size=batch_size)
+            Rating.objects.using(alias).bulk_create(shard_ratings, batch_size=batch_size)
+        SwapBooking.objects.bulk_create(bookings, batch_size=batch_size)
+    return {'users': len(users), 'skills': len(skills), 'swaps': len(swaps), 'ratings': len(ratings)}
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (users, skills, swaps, ratings) for scale testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--start', type=int, default=0, help='First user index; use to append to an existing dataset.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--block-size', type=int, default=5000, help='Users generated (and seeded) per task.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert.')
+        parser.add_argument('--skills-per-user', type=float, default=4.0, help='Mean skills per user (exponential).')
+        parser.add_argument('--offer-ratio', type=float, default=0.6, help='Share of skills that are offers.')
+        parser.add_argument('--swaps-per-user', type=float, default=1.5)
+        parser.add_argument('--status-weights', default='pending=0.2,accepted=0.2,completed=0.45,rejected=0.15')
+        parser.add_argument('--rating-ratio', type=float, default=0.8, help='Share of completed swaps that get a rating.')
+        parser.add_argument('--public-ratio', type=float, default=0.9)
+        parser.add_argument('--max-slots', type=int, default=3, help='Maximum availability slots per user.')
+        parser.add_argument('--location-skew', type=float, default=1.0, help='Zipf exponent over gazetteer places.')
+        parser.add_argument('--days', type=int, default=365, help='Spread swap creation over this many past days.')
+        parser.add_argument('--email-domain', default='synthetic.skillswap.test')
+        parser.add_argument('--password', default='Password123', help='Shared password for every generated user.')
+
+    def handle(self, *args, **options):
+        if options['workers'] > 1 and connections['default'].vendor == 'sqlite':
+            raise CommandError('SQLite allows a single writer; use --workers 1.')
+        config = {key: options[key] for key in (
+            'seed', 'batch_size', 'skills_per_user', 'offer_ratio', 'swaps_per_user', 'rating_ratio',
+            'public_ratio', 'max_slots', 'location_skew', 'days', 'email_domain',
+        )}
+        config['status_weights'] = parse_weights(options['status_weights'], ['pending', 'accepted', 'completed', 'rejected'])
+        # One hash for everyone: hashing per user is what makes create_user too slow at this scale.
+        config['password'] = make_password(options['password'])
+        config['places'] = sorted(set(geo.gazetteer().values()), key=lambda place: place[2])
+
+        first, last = options['start'], options['start'] + options['users']
+        blocks = [(start, min(options['block_size'], last - start)) for start in range(first, last, options['block_size'])]
+        totals = dict.fromkeys(['users', 'skills', 'swaps', 'ratings'], 0)
+        if options['workers'] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+                futures = [pool.submit(_generate_block, start, count, config) for start, count in blocks]
+                for future in as_completed(futures):
+                    self._add(totals, future.result())
+        else:
+            for start, count in blocks:
+                self._add(totals, _generate_block(start, count, config))
+        self.stdout.write(self.style.SUCCESS(
+            'Created {users} users, {skills} skills, {swaps} swaps and {ratings} ratings. '
+            'Run compute_suggestions to build the suggestion feed.'.format(**totals)
+        ))
+
+    def _add(self, totals, counts):
+        for key, value in counts.items():
+            totals[key] += value
+        self.stdout.write(f'  {totals["users"]} users written')
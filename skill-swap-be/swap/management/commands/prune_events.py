@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from adminpanel import rollups
+from swap import events
+
+
+class Command(BaseCommand):
+    help = 'Apply event log retention and compaction, and drop rollup bookkeeping past the compaction horizon.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.EVENT_LOG_RETENTION_DAYS)
+        parser.add_argument('--compact-after-days', type=int, default=settings.EVENT_LOG_COMPACT_AFTER_DAYS)
+        parser.add_argument('--no-compact', action='store_true', help='Only apply retention.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        compacted = 0
+        if not options['no_compact']:
+            compacted = events.compact(options['compact_after_days'], options['batch_size'])
+        pruned = events.prune(options['retention_days'], options['batch_size'])
+        horizon = timezone.now() - timedelta(days=options['compact_after_days'])
+        buckets = rollups.prune_active_users(horizon, options['batch_size'])
+        for cursor in events.stale_cursors(options['retention_days']).order_by('name'):
+            self.stdout.write(self.style.WARNING(
+                f'Consumer {cursor.name!r} has not moved since {cursor.updated_at:%Y-%m-%d} (seq {cursor.position}); '
+                'not waiting for it. Delete its EventCursor if the consumer is gone.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {compacted} events, pruned {pruned} past retention and {buckets} active-user buckets.'))
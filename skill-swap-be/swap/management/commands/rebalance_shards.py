@@ -0,0 +1,38 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from skill_swap_api import sharding
+from skill_swap_api.parallel import chunked
+from swap.models import ArchivedSwap, Swap
+
+
+class Command(BaseCommand):
+    help = 'Move swaps (with their ratings) whose owner now hashes to another shard, e.g. after adding one to SWAP_SHARDS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.1, help='Pause between batches, in seconds.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Swap, ArchivedSwap):
+            for source in sharding.aliases():
+                misplaced = defaultdict(list)
+                rows = model._base_manager.using(source).values_list('id', model.shard_key)
+                for pk, owner_id in rows.iterator(chunk_size=options['batch_size']):
+                    target = sharding.shard_for_user(owner_id)
+                    if target != source:
+                        misplaced[target].append(pk)
+                for target, pks in misplaced.items():
+                    self.stdout.write(f'{model.__name__}: {len(pks)} rows {source} -> {target}')
+                    total += len(pks)
+                    if options['dry_run']:
+                        continue
+                    for batch in chunked(pks, options['batch_size']):
+                        sharding.move(model, batch, source, target)
+                        time.sleep(options['sleep'])
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} swaps.'))
@@ -0,0 +1,98 @@
+# Per-swap message threads.
+#
+# Messages are append-only and numbered 1, 2, 3... per thread, allocated from
+# SwapThread.last_seq under its row lock, so "messages after seq N" is a range
+# scan on the (thread, seq) unique index and clients keep N as their cursor.
+# Each participant has a SwapThreadMember row whose unread count is bumped by
+# every post and reset by a read, so the inbox never counts messages.
+#
+# wait() lets a client long-poll for new messages. It watches the thread's
+# cache version (bumped when a post commits) and only queries the table when
+# it moves; with several processes this needs a shared CACHE_URL, otherwise
+# waiters only notice messages posted through their own process until the
+# poll times out.
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from skill_swap_api import cache, sharding
+from .models import ArchivedSwap, Swap, SwapMessage, SwapThread, SwapThreadMember
+
+# Participants can message each other from acceptance on.
+OPEN_STATUSES = ('accepted', 'completed')
+MAX_BODY_LENGTH = 4000
+
+
+def participants(swap_id):
+    """(requester id, receiver id) of an active or archived swap, or None."""
+    for model in (Swap, ArchivedSwap):
+        row = next(iter(sharding.fan_out(model.objects.filter(id=swap_id).values_list('requester_id', 'receiver_id'))), None)
+        if row is not None:
+            return row
+    return None
+
+
+def post(swap, sender, body):
+    with transaction.atomic():
+        thread, created = SwapThread.objects.get_or_create(swap_id=swap.id)
+        if created:
+            SwapThreadMember.objects.bulk_create([
+                SwapThreadMember(thread=thread, user_id=user_id) for user_id in (swap.requester_id, swap.receiver_id)
+            ], ignore_conflicts=True)
+        # The UPDATE takes the thread's row lock, so concurrent posts get consecutive seqs.
+        SwapThread.objects.filter(pk=thread.pk).update(last_seq=F('last_seq') + 1, updated_at=timezone.now())
+        seq = SwapThread.objects.filter(pk=thread.pk).values_list('last_seq', flat=True).get()
+        message = SwapMessage.objects.create(thread=thread, seq=seq, sender=sender, body=body)
+        SwapThreadMember.objects.filter(thread=thread).exclude(user=sender).update(unread=F('unread') + 1)
+        SwapThreadMember.objects.filter(thread=thread, user=sender).update(last_read_seq=seq, unread=0)
+        transaction.on_commit(lambda: cache.bump(cache.thread_namespace(swap.id)))
+    return message
+
+
+def since(swap_id, after=0, limit=100):
+    return list(SwapMessage.objects.filter(thread_id=swap_id, seq__gt=after).order_by('seq')[:limit])
+
+
+def mark_read(swap_id, user, seq):
+    """Move user's read position forward to seq. Returns the remaining unread count."""
+    seq = min(seq, SwapThread.objects.filter(pk=swap_id).values_list('last_seq', flat=True).first() or 0)
+    # unread is derived from last_seq in the same statement, so a post landing
+    # in between is not lost.
+    last_seq = SwapThread.objects.filter(pk=OuterRef('thread_id')).values('last_seq')
+    SwapThreadMember.objects.filter(thread_id=swap_id, user=user, last_read_seq__lt=seq).update(
+        last_read_seq=seq, unread=Subquery(last_seq) - seq,
+    )
+    return (SwapThreadMember.objects.filter(thread_id=swap_id, user=user)
+            .values_list('unread', flat=True).first() or 0)
+
+
+def unread(user):
+    """[(swap id, unread count, last seq)] for threads with unread messages, newest first."""
+    return list(SwapThreadMember.objects.filter(user=user, unread__gt=0)
+                .order_by('-thread__updated_at')
+                .values_list('thread_id', 'unread', 'thread__last_seq'))
+
+
+async def wait(swap_id, after=0, limit=100, timeout=None):
+    """Messages after seq `after`, waiting up to timeout seconds for the first one."""
+    if timeout is None:
+        timeout = settings.MESSAGE_LONG_POLL_SECONDS
+    namespace = cache.thread_namespace(swap_id)
+    deadline = time.monotonic() + timeout
+    seen = None
+    while True:
+        current = await sync_to_async(cache.version)(namespace)
+        if current != seen:
+            seen = current
+            messages = await sync_to_async(since)(swap_id, after, limit)
+            if messages:
+                return messages
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        await asyncio.sleep(min(settings.MESSAGE_POLL_INTERVAL, remaining))
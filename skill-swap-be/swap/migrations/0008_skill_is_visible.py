@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:54
+
+from django.db import migrations, models
+
+
+def hide_banned_skills(apps, schema_editor):
+    Skill = apps.get_model('swap', 'Skill')
+    Skill.objects.filter(user__is_banned=True).update(is_visible=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swap', '0007_eventcursor_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='is_visible',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(hide_banned_skills, migrations.RunPython.noop),
+    ]
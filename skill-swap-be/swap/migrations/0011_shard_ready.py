@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swap', '0010_swap_messages'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedswap',
+            name='receiver',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_received_swaps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='archivedswap',
+            name='requester',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_requested_swaps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='rated',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_ratings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='rater',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='given_ratings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='swap',
+            name='receiver',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_swaps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='swap',
+            name='receiver_skill',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='receiver_swaps', to='swap.skill'),
+        ),
+        migrations.AlterField(
+            model_name='swap',
+            name='requester',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='requested_swaps', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='swap',
+            name='requester_skill',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='requester_swaps', to='swap.skill'),
+        ),
+        migrations.AlterField(
+            model_name='swapbooking',
+            name='swap',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='swap.swap'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.db.models.functions import Coalesce
+
+
+def backfill_finished_at(apps, schema_editor):
+    # Swaps finished before 0006 have no finished_at and would never be archived.
+    Swap = apps.get_model('swap', 'Swap')
+    Swap.objects.using(schema_editor.connection.alias).filter(
+        status__in=('completed', 'rejected'), finished_at__isnull=True,
+    ).update(finished_at=Coalesce('actual_time', 'created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swap', '0011_shard_ready'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_finished_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import F
+
+# swap.scheduling.MAX_BOOKING_MINUTES at the time of writing.
+MAX_BOOKING_MINUTES = 2 * 24 * 60
+
+
+def split_long_bookings(apps, schema_editor):
+    # Conflict checks only look MAX_BOOKING_MINUTES back for a booking's start.
+    SwapBooking = apps.get_model('swap', 'SwapBooking')
+    bookings = SwapBooking.objects.using(schema_editor.connection.alias)
+    for booking in bookings.filter(end__gt=F('start') + MAX_BOOKING_MINUTES).iterator():
+        bookings.bulk_create([
+            SwapBooking(swap_id=booking.swap_id, user_id=booking.user_id, kind=booking.kind,
+                        start=start, end=min(start + MAX_BOOKING_MINUTES, booking.end))
+            for start in range(booking.start + MAX_BOOKING_MINUTES, booking.end, MAX_BOOKING_MINUTES)
+        ])
+        booking.end = booking.start + MAX_BOOKING_MINUTES
+        booking.save(update_fields=['end'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swap', '0012_backfill_finished_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_long_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from swap import taxonomy
+
+
+def seed_taxonomy(apps, schema_editor):
+    # The taxonomy lives in 'default' only; shards carry the tables but not the rows.
+    if schema_editor.connection.alias != 'default':
+        return
+    taxonomy.seed(apps=apps, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swap', '0013_split_long_bookings'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_taxonomy, migrations.RunPython.noop),
+    ]
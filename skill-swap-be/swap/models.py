@@ -2,6 +2,29 @@ from django.db import models
 import uuid
 from django.conf import settings
 from django.utils import timezone
+from skill_swap_api.sharding import ShardedQuerySet
+
+class SkillCategory(models.Model):
+    # Canonical taxonomy (see swap.taxonomy). Skills keep the text the user
+    # typed and point at these rows by small integer id for matching and stats.
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+class CanonicalSkill(models.Model):
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+    category = models.ForeignKey(SkillCategory, on_delete=models.PROTECT, null=True, blank=True, related_name='skills')
+
+class CategoryAlias(models.Model):
+    # Normalized spelling -> category; every category also has its own key here.
+    key = models.CharField(max_length=100, primary_key=True)
+    category = models.ForeignKey(SkillCategory, on_delete=models.CASCADE, related_name='aliases')
+
+class SkillAlias(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)
+    skill = models.ForeignKey(CanonicalSkill, on_delete=models.CASCADE, related_name='aliases')
 
 class Skill(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -12,26 +35,77 @@ class Skill(models.Model):
     level = models.CharField(max_length=50)
     type = models.CharField(max_length=20) # offer or request
     status = models.CharField(max_length=20, default='pending')
+    # False while the owner is banned; kept in sync in bulk by adminpanel's set_user_banned
+    is_visible = models.BooleanField(default=True)
+    # Filled from name/category on save (swap.signals) or by backfill_taxonomy
+    canonical_skill = models.ForeignKey(CanonicalSkill, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    canonical_category = models.ForeignKey(SkillCategory, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['canonical_skill', 'type'], name='skill_canonical_type_idx'),
+        ]
 
 class Swap(models.Model):
+    # Sharded by requester when SWAP_SHARDS is set (skill_swap_api.sharding);
+    # users and skills may live in another database, hence db_constraint=False.
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    requester = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='requested_swaps')
-    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='received_swaps')
-    requester_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='requester_swaps')
-    receiver_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='receiver_swaps')
+    requester = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='requested_swaps', db_constraint=False)
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='received_swaps', db_constraint=False)
+    requester_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='requester_swaps', db_constraint=False)
+    receiver_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='receiver_swaps', db_constraint=False)
     status = models.CharField(max_length=20, default='pending')
     # Structured proposed time slots: list of time slots [{"day": "Saturday", "start": "10:00", "end": "12:00"}, ...]
     proposed_time_slots = models.JSONField(default=list, blank=True)
     actual_time = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set when the swap reaches a final status; drives archival (see swap.archive)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    FINISHED_STATUSES = ('completed', 'rejected')
+
+    shard_key = 'requester_id'
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'finished_at'], name='swap_finished_idx'),
+        ]
+
+class ArchivedSwap(models.Model):
+    # Cold storage for finished swaps, moved out of Swap by archive_swaps.
+    # Keeps the original id; skills are referenced by id only so deleting a
+    # skill does not reach into history.
+    id = models.UUIDField(primary_key=True, editable=False)
+    requester = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_requested_swaps', db_constraint=False)
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_received_swaps', db_constraint=False)
+    requester_skill_id = models.UUIDField()
+    receiver_skill_id = models.UUIDField()
+    status = models.CharField(max_length=20)
+    proposed_time_slots = models.JSONField(default=list, blank=True)
+    actual_time = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Stays on the swap's shard.
+    shard_key = 'requester_id'
+    objects = ShardedQuerySet.as_manager()
 
 class Rating(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    swap = models.ForeignKey(Swap, on_delete=models.CASCADE, related_name='ratings')
-    rater = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='given_ratings')
-    rated = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='received_ratings')
+    # Points at swap while it is active and at archived_swap once archived.
+    swap = models.ForeignKey(Swap, on_delete=models.CASCADE, related_name='ratings', null=True)
+    archived_swap = models.ForeignKey(ArchivedSwap, on_delete=models.CASCADE, related_name='ratings', null=True, blank=True)
+    rater = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='given_ratings', db_constraint=False)
+    rated = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='received_ratings', db_constraint=False)
     rating = models.IntegerField()
     comment = models.TextField()
 
+    # Placed on its swap's shard.
+    shard_parent = ('swap', 'archived_swap')
+    objects = ShardedQuerySet.as_manager()
+
 class AdminAction(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     admin = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='admin_actions')
@@ -40,3 +114,97 @@ class AdminAction(models.Model):
     reason = models.TextField()
 
 # Create your models here.
+
+class SuggestedSwap(models.Model):
+    # Precomputed partner suggestions, rebuilt by swap.recommendations.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='suggested_swaps')
+    candidate = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    skill_score = models.FloatField()
+    availability_score = models.FloatField()
+    reputation_score = models.FloatField()
+    location_score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='unique_suggested_swap'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='suggested_swap_feed_idx'),
+        ]
+
+class SwapBooking(models.Model):
+    # Time committed by an accepted swap, one row per participant and interval.
+    # Weekly slots store minute-of-week bounds; one-off sessions (actual_time)
+    # store minutes since the epoch. Rows are kept sorted by (user, kind, start).
+    WEEKLY = 'weekly'
+    ONCE = 'once'
+
+    # Kept in 'default' for per-user conflict checks; the swap may be on a shard.
+    swap = models.ForeignKey(Swap, on_delete=models.CASCADE, related_name='bookings', db_constraint=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10)
+    start = models.BigIntegerField()
+    end = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'kind', 'start'], name='swap_booking_user_start_idx'),
+        ]
+
+class Event(models.Model):
+    # Append-only change log, written in the same transaction as the change.
+    # seq is the consumer cursor; see swap.events.
+    seq = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=50)
+    object_id = models.UUIDField()
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'object_id', 'seq'], name='event_object_idx'),
+        ]
+
+class EventCursor(models.Model):
+    # Last seq processed by a named consumer.
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class SwapThread(models.Model):
+    # Message thread of a swap (see swap.messaging). Keyed by swap id only, like
+    # ArchivedSwap's skill references, so the thread survives archiving.
+    swap_id = models.UUIDField(primary_key=True)
+    last_seq = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+class SwapMessage(models.Model):
+    # Append-only; seq is dense per thread and is the read cursor.
+    thread = models.ForeignKey(SwapThread, on_delete=models.CASCADE, related_name='messages')
+    seq = models.PositiveIntegerField()
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    body = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'seq'], name='unique_swap_message_seq'),
+        ]
+
+class SwapThreadMember(models.Model):
+    # Per-participant read position; unread is kept up to date by each post and read.
+    thread = models.ForeignKey(SwapThread, on_delete=models.CASCADE, related_name='members')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    last_read_seq = models.PositiveIntegerField(default=0)
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'user'], name='unique_swap_thread_member'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'unread'], name='swap_thread_unread_idx'),
+        ]
@@ -0,0 +1,170 @@
+# Suggested swap partners.
+#
+# A pair (user, candidate) is scored from four components, each in [0, 1]:
+#   skill         - reciprocal match of offered/requested canonical skills
+#   availability  - share of weekly availability the two have in common
+#   reputation    - candidate's smoothed average received rating
+#   location      - same place (geocoded cell, else same free-text location)
+# Only pairs with some skill match are stored. Scores live in SuggestedSwap so
+# the feed is a single indexed read; compute_suggestions rebuilds everything and
+# refresh_user() keeps rows current when one user's inputs change.
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from skill_swap_api import sharding
+from user.models import User
+from .availability import overlap_minutes, parse_slots, total_minutes
+from .models import Rating, Skill, SuggestedSwap
+
+WEIGHTS = {
+    'skill': 0.5,
+    'availability': 0.2,
+    'reputation': 0.2,
+    'location': 0.1,
+}
+# Bayesian prior for reputation: behave as if every user had a few average ratings.
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 2
+
+Profile = namedtuple('Profile', ['offers', 'requests', 'slots', 'location', 'reputation'])
+
+
+def eligible_users():
+    return User.objects.filter(is_active=True, is_public=True, is_banned=False)
+
+
+def active_skills():
+    return Skill.objects.exclude(status='rejected').filter(user__in=eligible_users())
+
+
+def reputation(rating_sum, rating_count):
+    smoothed = (rating_sum + RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT) / (rating_count + RATING_PRIOR_WEIGHT)
+    return max(0.0, min(1.0, smoothed / 5))
+
+
+def load_profiles(user_ids):
+    profiles = {}
+    users = eligible_users().filter(id__in=user_ids).values_list('id', 'availability', 'location', 'geohash')
+    for user_id, availability, location, geohash in users:
+        place = geohash or (location or '').strip().lower()
+        profiles[user_id] = Profile(set(), set(), parse_slots(availability), place, reputation(0, 0))
+    if not profiles:
+        return profiles
+    # Skills are compared by canonical id (see swap.taxonomy), so spelling
+    # variants match and the join below is on an integer index.
+    skills = active_skills().filter(user_id__in=profiles, canonical_skill__isnull=False)
+    for user_id, skill_id, type in skills.values_list('user_id', 'canonical_skill_id', 'type'):
+        target = profiles[user_id].offers if type == 'offer' else profiles[user_id].requests
+        target.add(skill_id)
+    # Ratings sit on their swap's shard (skill_swap_api.sharding); sums and
+    # counts from each are added up before smoothing.
+    totals = defaultdict(lambda: [0, 0])
+    ratings = (Rating.objects.filter(rated_id__in=profiles).values('rated_id')
+               .annotate(total=Sum('rating'), count=Count('id')).order_by())
+    for row in sharding.fan_out(ratings):
+        totals[row['rated_id']][0] += row['total']
+        totals[row['rated_id']][1] += row['count']
+    for user_id, (rating_sum, rating_count) in totals.items():
+        profiles[user_id] = profiles[user_id]._replace(reputation=reputation(rating_sum, rating_count))
+    return profiles
+
+
+def candidate_ids(profiles):
+    """Map each profile to the users whose skills complement it."""
+    wanted = defaultdict(set)
+    for user_id, profile in profiles.items():
+        for key in profile.offers:
+            wanted[('request', key)].add(user_id)
+        for key in profile.requests:
+            wanted[('offer', key)].add(user_id)
+    candidates = defaultdict(set)
+    if not wanted:
+        return candidates
+    keys = {key for _, key in wanted}
+    rows = active_skills().filter(canonical_skill_id__in=keys).values_list('user_id', 'type', 'canonical_skill_id')
+    for user_id, type, key in rows:
+        for subject in wanted.get((type, key), ()):
+            if subject != user_id:
+                candidates[subject].add(user_id)
+    return candidates
+
+
+def score_pair(user, candidate):
+    teaches = bool(user.offers & candidate.requests)
+    learns = bool(user.requests & candidate.offers)
+    skill = (teaches + learns) / 2
+    if not skill:
+        return None
+    shortest = min(total_minutes(user.slots), total_minutes(candidate.slots))
+    availability = overlap_minutes(user.slots, candidate.slots) / shortest if shortest else 0.0
+    location = 1.0 if user.location and user.location == candidate.location else 0.0
+    components = {
+        'skill': skill,
+        'availability': availability,
+        'reputation': candidate.reputation,
+        'location': location,
+    }
+    return components, sum(WEIGHTS[name] * value for name, value in components.items())
+
+
+def compute_rows(user_ids, only_candidates=None):
+    """Build SuggestedSwap rows (unsaved) for the given users."""
+    subjects = load_profiles(user_ids)
+    candidates = candidate_ids(subjects)
+    if only_candidates is not None:
+        candidates = {user_id: ids & set(only_candidates) for user_id, ids in candidates.items()}
+    profiles = load_profiles(set().union(*candidates.values()) - subjects.keys()) if candidates else {}
+    profiles.update(subjects)
+    rows = []
+    for user_id, ids in candidates.items():
+        for candidate_id in ids:
+            if candidate_id not in profiles:
+                continue
+            scored = score_pair(profiles[user_id], profiles[candidate_id])
+            if scored is None:
+                continue
+            components, score = scored
+            rows.append(SuggestedSwap(
+                user_id=user_id,
+                candidate_id=candidate_id,
+                score=score,
+                skill_score=components['skill'],
+                availability_score=components['availability'],
+                reputation_score=components['reputation'],
+                location_score=components['location'],
+            ))
+    return rows
+
+
+def rebuild_users(user_ids, batch_size=1000):
+    """Replace all suggestions owned by user_ids. Used by the batch job."""
+    rows = compute_rows(user_ids)
+    with transaction.atomic():
+        SuggestedSwap.objects.filter(user_id__in=user_ids).delete()
+        SuggestedSwap.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def refresh_user(user_id):
+    """Recompute one user's feed and their entry in everyone else's feed."""
+    forward = compute_rows([user_id])
+    partners = {row.candidate_id for row in forward}
+    reverse = compute_rows(partners, only_candidates=[user_id]) if partners else []
+    with transaction.atomic():
+        SuggestedSwap.objects.filter(user_id=user_id).delete()
+        SuggestedSwap.objects.filter(candidate_id=user_id).delete()
+        SuggestedSwap.objects.bulk_create(forward + reverse)
+
+
+def refresh_reputation(user_id):
+    """A new rating only moves the reputation component of rows pointing at user_id."""
+    rows = sharding.fan_out(Rating.objects.filter(rated_id=user_id),
+                            lambda shard: [shard.aggregate(total=Sum('rating'), count=Count('id'))])
+    value = reputation(sum(row['total'] or 0 for row in rows), sum(row['count'] for row in rows))
+    weight = WEIGHTS['reputation']
+    SuggestedSwap.objects.filter(candidate_id=user_id).update(
+        score=F('score') - weight * F('reputation_score') + weight * value,
+        reputation_score=value,
+    )
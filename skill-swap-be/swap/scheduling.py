@@ -0,0 +1,134 @@
+# Double-booking detection and slot suggestions for accepted swaps.
+#
+# Committed time lives in SwapBooking, an interval table sorted by
+# (user, kind, start). Checking a new interval [s, e) is a bounded range scan:
+# any overlapping booking must start in [s - MAX_BOOKING_MINUTES, e) and end
+# after s, so the cost depends on a user's bookings near that time, not on how
+# many swaps they have ever made. book() splits longer intervals (merged
+# full-day slots can run for days) into pieces so the bound holds.
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import (
+    MINUTES_PER_DAY, MINUTES_PER_WEEK, format_slot, intersect, merge_intervals, minute_of_week, parse_slots, subtract,
+)
+from .models import SwapBooking
+
+# Upper bound on the length of a single booking row, used to bound range scans.
+MAX_BOOKING_MINUTES = 2 * MINUTES_PER_DAY
+
+
+def pieces(start, end):
+    """[start, end) cut into consecutive intervals of at most MAX_BOOKING_MINUTES."""
+    return [(piece, min(piece + MAX_BOOKING_MINUTES, end)) for piece in range(start, end, MAX_BOOKING_MINUTES)]
+
+
+def session_minutes():
+    return settings.SWAP_SESSION_MINUTES
+
+
+def epoch_minutes(value):
+    return int(value.timestamp() // 60)
+
+
+def swap_intervals(swap):
+    """[(kind, start, end)] of time the swap would commit both users to."""
+    intervals = [(SwapBooking.WEEKLY, start, end) for start, end in parse_slots(swap.proposed_time_slots)]
+    if swap.actual_time:
+        start = epoch_minutes(swap.actual_time)
+        intervals.append((SwapBooking.ONCE, start, start + session_minutes()))
+    return intervals
+
+
+def once_as_weekly(start, end):
+    """Project a one-off epoch-minute interval onto minute-of-week intervals."""
+    week_start = minute_of_week(datetime.fromtimestamp(start * 60, tz=timezone.get_current_timezone()))
+    week_end = week_start + (end - start)
+    if week_end > MINUTES_PER_WEEK:
+        return [(week_start, MINUTES_PER_WEEK), (0, week_end - MINUTES_PER_WEEK)]
+    return [(week_start, week_end)]
+
+
+def _overlap(kind, start, end):
+    return Q(kind=kind, start__gte=start - MAX_BOOKING_MINUTES, start__lt=end, end__gt=start)
+
+
+def find_conflicts(swap):
+    """Bookings of either participant that overlap the time this swap needs."""
+    intervals = swap_intervals(swap)
+    if not intervals:
+        return []
+    users = [swap.requester_id, swap.receiver_id]
+    overlaps = Q()
+    for kind, start, end in intervals:
+        overlaps |= _overlap(kind, start, end)
+        if kind == SwapBooking.ONCE:
+            for week_start, week_end in once_as_weekly(start, end):
+                overlaps |= _overlap(SwapBooking.WEEKLY, week_start, week_end)
+    conflicts = list(SwapBooking.objects.filter(overlaps, user_id__in=users).exclude(swap=swap))
+
+    # A recurring slot also collides with any upcoming one-off session that
+    # falls inside it on some week.
+    weekly = [(start, end) for kind, start, end in intervals if kind == SwapBooking.WEEKLY]
+    if weekly:
+        upcoming = SwapBooking.objects.filter(
+            user_id__in=users, kind=SwapBooking.ONCE, end__gt=epoch_minutes(timezone.now()),
+        ).exclude(swap=swap)
+        for booking in upcoming:
+            if intersect(weekly, merge_intervals(once_as_weekly(booking.start, booking.end))):
+                conflicts.append(booking)
+    # One per swap and user, however many pieces of it overlap.
+    unique = {}
+    for booking in conflicts:
+        unique.setdefault((booking.swap_id, booking.user_id), booking)
+    return list(unique.values())
+
+
+def book(swap):
+    SwapBooking.objects.filter(swap=swap).delete()
+    SwapBooking.objects.bulk_create([
+        SwapBooking(swap=swap, user_id=user_id, kind=kind, start=piece_start, end=piece_end)
+        for kind, start, end in swap_intervals(swap)
+        for piece_start, piece_end in pieces(start, end)
+        for user_id in {swap.requester_id, swap.receiver_id}
+    ])
+
+
+def release(swap):
+    SwapBooking.objects.filter(swap=swap).delete()
+
+
+def busy_intervals(user_id):
+    """Weekly view of a user's commitments: recurring slots plus one-off sessions in the coming week."""
+    now = epoch_minutes(timezone.now())
+    busy = []
+    bookings = SwapBooking.objects.filter(
+        Q(kind=SwapBooking.WEEKLY) | Q(kind=SwapBooking.ONCE, end__gt=now, start__lt=now + MINUTES_PER_WEEK),
+        user_id=user_id,
+    ).values_list('kind', 'start', 'end')
+    for kind, start, end in bookings:
+        busy.extend(once_as_weekly(start, end) if kind == SwapBooking.ONCE else [(start, end)])
+    return merge_intervals(busy)
+
+
+def suggest_slots(first, second, duration=60, limit=5):
+    """Earliest weekly slots of `duration` minutes when both users are available and free."""
+    if duration <= 0 or limit < 0:
+        raise ValueError('duration must be positive and limit non-negative.')
+    free = intersect(
+        subtract(parse_slots(first.availability), busy_intervals(first.id)),
+        subtract(parse_slots(second.availability), busy_intervals(second.id)),
+    )
+    now = minute_of_week(timezone.localtime())
+    candidates = []
+    for start, end in free:
+        slot = start
+        while slot + duration <= end:
+            candidates.append(slot)
+            slot += duration
+    # Earliest from now, wrapping into next week.
+    candidates.sort(key=lambda start: (start - now) % MINUTES_PER_WEEK)
+    return [format_slot(start, start + duration) for start in candidates[:limit]]
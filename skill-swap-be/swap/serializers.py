@@ -1,9 +1,90 @@
+from django.core.exceptions import ValidationError
 from rest_framework import serializers
-from .models import Swap
+from skill_swap_api import sharding
+from skill_swap_api.expansion import Expand, ExpandableFieldsMixin
+from user.serializers import UserSummarySerializer
+from .models import Skill, Swap, Rating, SuggestedSwap, Event, SwapMessage
 
-class SwapSerializer(serializers.ModelSerializer):
+# Swap, skill and rating reads accept ?fields= and ?expand= (skill_swap_api.expansion).
+
+class SkillSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable = {'user': Expand(UserSummarySerializer)}
+
+    class Meta:
+        model = Skill
+        fields = '__all__'
+        read_only_fields = ['is_visible', 'canonical_skill', 'canonical_category']
+
+class SwapSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     proposed_time_slots = serializers.ListField(child=serializers.DictField(), required=False)
+    expandable = {
+        'requester': Expand(UserSummarySerializer),
+        'receiver': Expand(UserSummarySerializer),
+        'requester_skill': Expand(SkillSerializer),
+        'receiver_skill': Expand(SkillSerializer),
+    }
 
     class Meta:
         model = Swap
-        fields = ['id', 'requester', 'receiver', 'requester_skill', 'receiver_skill', 'status', 'proposed_time_slots', 'actual_time']
+        fields = ['id', 'requester', 'receiver', 'requester_skill', 'receiver_skill', 'status', 'proposed_time_slots', 'actual_time', 'created_at', 'finished_at']
+        read_only_fields = ['requester', 'created_at', 'finished_at']
+
+class ShardedSwapField(serializers.PrimaryKeyRelatedField):
+    # Looks the swap up on every shard (skill_swap_api.sharding).
+    def to_internal_value(self, data):
+        try:
+            swap = sharding.get(self.get_queryset(), pk=data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if swap is None:
+            self.fail('does_not_exist', pk_value=data)
+        return swap
+
+class RatingSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    # Required on writes; the column is only NULL once the swap is archived.
+    swap = ShardedSwapField(queryset=Swap.objects.all(), required=True, allow_null=False)
+    expandable = {
+        'swap': Expand(SwapSerializer),
+        'rater': Expand(UserSummarySerializer),
+        'rated': Expand(UserSummarySerializer),
+    }
+
+    class Meta:
+        model = Rating
+        fields = '__all__'
+        read_only_fields = ['archived_swap']
+
+class SwapHistorySerializer(serializers.Serializer):
+    # Rows from swap.archive.user_history(), spanning active and archived swaps.
+    id = serializers.UUIDField()
+    requester = serializers.UUIDField(source='requester_id')
+    receiver = serializers.UUIDField(source='receiver_id')
+    requester_skill = serializers.UUIDField(source='requester_skill_id')
+    receiver_skill = serializers.UUIDField(source='receiver_skill_id')
+    status = serializers.CharField()
+    proposed_time_slots = serializers.JSONField()
+    actual_time = serializers.DateTimeField()
+    created_at = serializers.DateTimeField()
+    finished_at = serializers.DateTimeField()
+    archived = serializers.BooleanField()
+
+class SuggestedSwapSerializer(serializers.ModelSerializer):
+    candidate_name = serializers.CharField(source='candidate.name', read_only=True)
+    candidate_location = serializers.CharField(source='candidate.location', read_only=True)
+
+    class Meta:
+        model = SuggestedSwap
+        fields = ['candidate', 'candidate_name', 'candidate_location', 'score', 'skill_score',
+                  'availability_score', 'reputation_score', 'location_score', 'computed_at']
+
+class EventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ['seq', 'topic', 'object_id', 'actor', 'payload', 'created_at']
+
+class SwapMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SwapMessage
+        fields = ['seq', 'sender', 'body', 'created_at']
+        read_only_fields = ['seq', 'sender', 'created_at']
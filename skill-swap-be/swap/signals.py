@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from skill_swap_api import cache
+from . import recommendations, taxonomy
+from .models import Rating, Skill
+
+# User fields that feed into suggestion scores.
+SUGGESTION_FIELDS = ('availability', 'location', 'is_public', 'is_banned', 'is_active')
+
+
+def _suggestion_inputs(user):
+    return tuple(user.__dict__.get(name) for name in SUGGESTION_FIELDS)
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_suggestion_inputs(sender, instance, **kwargs):
+    instance._suggestion_inputs = _suggestion_inputs(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_suggestions_for_user(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(SUGGESTION_FIELDS):
+        return
+    current = _suggestion_inputs(instance)
+    if current == getattr(instance, '_suggestion_inputs', None):
+        return
+    instance._suggestion_inputs = current
+    transaction.on_commit(lambda: recommendations.refresh_user(instance.pk))
+
+
+@receiver(pre_save, sender=Skill)
+def map_skill_to_taxonomy(sender, instance, raw=False, **kwargs):
+    if not raw:
+        taxonomy.assign(instance)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def refresh_suggestions_for_skill(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: recommendations.refresh_user(user_id))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def refresh_suggestions_for_rating(sender, instance, **kwargs):
+    user_id = instance.rated_id
+    transaction.on_commit(lambda: recommendations.refresh_reputation(user_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    cache.invalidate(cache.profile_namespace(instance.pk))
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_skill_cache(sender, instance, **kwargs):
+    cache.invalidate(cache.SKILLS, cache.profile_namespace(instance.user_id))
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rating_cache(sender, instance, **kwargs):
+    cache.invalidate(cache.profile_namespace(instance.rated_id))
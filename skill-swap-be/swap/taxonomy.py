@@ -0,0 +1,155 @@
+# Canonical skill taxonomy.
+#
+# Skill.name and Skill.category are free text, so "Python", "python " and
+# "Python3" never matched. Text is normalized (NFKC, casefolded, punctuation
+# and whitespace collapsed) and looked up in CategoryAlias / SkillAlias, which
+# are seeded from swap/data/taxonomy.csv by migration 0014 (and reloaded by
+# backfill_taxonomy). A Skill points at small integer ids from the moment it is
+# saved; matching, filtering and analytics compare those ids instead of strings.
+#
+# Saving a skill never writes to the taxonomy. A spelling that is not known
+# leaves canonical_skill (or canonical_category) NULL: pending until an alias
+# for it is added to the CSV and backfill_taxonomy maps it.
+#
+# Each lookup is one primary-key read on an alias table. Batch callers
+# (backfill, the synthetic data generator) pass a dict as memo so repeated
+# spellings cost nothing; canonical rows are never deleted, so ids stay valid.
+import csv
+import os
+import re
+import unicodedata
+
+from django.apps import apps as django_apps
+from django.db import transaction
+
+from .models import CategoryAlias, Skill, SkillAlias, SkillCategory
+
+TAXONOMY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'taxonomy.csv')
+
+def normalize(value):
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    # Keep the characters that carry meaning in skill names: c++, c#, .net, ui/ux.
+    value = re.sub(r'[^\w\s+#./-]', ' ', value)
+    return ' '.join(value.split()).rstrip('./-')
+
+
+def find_category(name):
+    """Category id for name, or None if the spelling is unknown. Never writes."""
+    key = normalize(name)
+    if not key:
+        return None
+    return CategoryAlias.objects.filter(key=key).values_list('category_id', flat=True).first()
+
+
+def find_skill(name):
+    """Canonical skill id for name, or None if the spelling is unknown. Never writes."""
+    key = normalize(name)
+    if not key:
+        return None
+    return SkillAlias.objects.filter(key=key).values_list('skill_id', flat=True).first()
+
+
+def category_id(name, memo=None):
+    """Category id for name, or None (uncategorized) if the spelling is unknown."""
+    key = normalize(name)
+    if not key:
+        return None
+    if memo is not None and ('category', key) in memo:
+        return memo['category', key]
+    found = CategoryAlias.objects.filter(key=key).values_list('category_id', flat=True).first()
+    if memo is not None:
+        memo['category', key] = found
+    return found
+
+
+def skill_ids(name, category='', memo=None):
+    """(canonical skill id, category id) for a skill's free-text name and category.
+
+    The category comes from the skill's own category text, falling back to the
+    canonical skill's category when that is unknown. Unknown spellings give None.
+    """
+    category = category_id(category, memo)
+    key = normalize(name)
+    if not key:
+        return None, category
+    if memo is not None and ('skill', key) in memo:
+        row = memo['skill', key]
+    else:
+        row = SkillAlias.objects.filter(key=key).values_list('skill_id', 'skill__category_id').first() or (None, None)
+        if memo is not None:
+            memo['skill', key] = row
+    return row[0], category if category is not None else row[1]
+
+
+def assign(skill, memo=None):
+    """Point an unsaved or edited Skill at its canonical ids."""
+    skill.canonical_skill_id, skill.canonical_category_id = skill_ids(skill.name, skill.category, memo)
+
+
+def category_name(category_id):
+    if category_id is None:
+        return None
+    return SkillCategory.objects.filter(id=category_id).values_list('name', flat=True).first()
+
+
+def seed(path=TAXONOMY_PATH, apps=None, using='default'):
+    """Load categories, skills and aliases from the CSV. The file wins over existing aliases.
+
+    Migrations pass their app registry as apps.
+    """
+    get_model = (apps or django_apps).get_model
+    category_rows, category_aliases, skill_rows, skill_aliases = (
+        get_model('swap', name).objects.using(using)
+        for name in ('SkillCategory', 'CategoryAlias', 'CanonicalSkill', 'SkillAlias'))
+    counts = {'categories': 0, 'skills': 0, 'aliases': 0}
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    with transaction.atomic(using=using):
+        categories = {}
+        for row in rows:
+            if row['kind'] != 'category':
+                continue
+            category, _ = category_rows.update_or_create(key=normalize(row['name']), defaults={'name': row['name']})
+            categories[normalize(row['name'])] = category
+            counts['categories'] += 1
+            for alias in [row['name']] + row['aliases'].split('|'):
+                if normalize(alias):
+                    category_aliases.update_or_create(key=normalize(alias), defaults={'category': category})
+                    counts['aliases'] += 1
+        for row in rows:
+            if row['kind'] != 'skill':
+                continue
+            category = categories.get(normalize(row['category']))
+            skill, _ = skill_rows.update_or_create(
+                key=normalize(row['name']), defaults={'name': row['name'], 'category': category})
+            counts['skills'] += 1
+            for alias in [row['name']] + row['aliases'].split('|'):
+                if normalize(alias):
+                    skill_aliases.update_or_create(key=normalize(alias), defaults={'skill': skill})
+                    counts['aliases'] += 1
+    return counts
+
+
+def backfill(batch_size=1000, remap=False):
+    """Assign canonical ids to skills that lack them (all skills with remap). Returns rows updated."""
+    queryset = Skill.objects.all() if remap else Skill.objects.filter(canonical_skill__isnull=True)
+    updated = 0
+    memo = {}
+    last = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        rows = list(batch.values_list('pk', 'name', 'category')[:batch_size])
+        if not rows:
+            return updated
+        # Distinct spellings per batch are few, so group rows by their ids and
+        # write each group with one UPDATE.
+        groups = {}
+        for pk, name, category in rows:
+            groups.setdefault(skill_ids(name, category, memo), []).append(pk)
+        with transaction.atomic():
+            for (skill_id, category), pks in groups.items():
+                updated += Skill.objects.filter(pk__in=pks).update(canonical_skill_id=skill_id, canonical_category_id=category)
+        last = rows[-1][0]
+
@@ -1,3 +1,626 @@
-from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from user.models import User
+from datetime import timedelta
+from django.utils import timezone
+from django.conf import settings
+from django.test import override_settings
+from django.core.management import call_command
+from io import StringIO
+from unittest import skipUnless
+from .models import Skill, Swap, SwapBooking, SuggestedSwap, Rating, Event, EventCursor, CanonicalSkill
+from .availability import parse_slots, overlap_minutes
+from . import archive, events, recommendations, taxonomy
+from skill_swap_api import cache, sharding
+from skill_swap_api.renderers import FastJSONRenderer
+from django.core.cache import cache as django_cache
+from rest_framework_simplejwt.tokens import RefreshToken
+import json
+import threading
+import time
+import uuid
 
-# Create your tests here.
+
+def make_user(email, **extra):
+    extra.setdefault('name', email.split('@')[0])
+    return User.objects.create_user(email=email, password='Password123', **extra)
+
+
+class AvailabilityTests(APITestCase):
+    def test_parse_and_overlap(self):
+        a = parse_slots([{'day': 'Monday', 'start': '18:00', 'end': '20:00'}, 'weekends'])
+        b = parse_slots([{'day': 'monday', 'start': '19:00', 'end': '21:00'}])
+        self.assertEqual(a, [(18 * 60, 20 * 60)])
+        self.assertEqual(overlap_minutes(a, b), 60)
+
+    def test_sunday_night_wraps_to_monday(self):
+        slots = parse_slots([{'day': 'Sunday', 'start': '23:00', 'end': '01:00'}])
+        self.assertEqual(slots, [(0, 60), (6 * 1440 + 23 * 60, 7 * 1440)])
+
+
+class SuggestedSwapTests(APITestCase):
+    def setUp(self):
+        slots = [{'day': 'Saturday', 'start': '10:00', 'end': '12:00'}]
+        self.alice = make_user('alice@example.com', location='NYC', availability=slots)
+        self.bob = make_user('bob@example.com', location='nyc', availability=slots)
+        self.carol = make_user('carol@example.com', location='Paris')
+
+    def add_skill(self, user, name, type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Skill.objects.create(user=user, name=name, description='', category='General', level='Expert', type=type)
+
+    def test_feed_is_maintained_incrementally(self):
+        self.add_skill(self.alice, 'Python', 'offer')
+        self.add_skill(self.alice, 'Spanish', 'request')
+        self.add_skill(self.bob, 'spanish ', 'offer')
+        self.add_skill(self.bob, 'python', 'request')
+        self.add_skill(self.carol, 'Python', 'request')
+
+        suggestion = SuggestedSwap.objects.get(user=self.alice, candidate=self.bob)
+        self.assertEqual(suggestion.skill_score, 1.0)
+        self.assertEqual(suggestion.availability_score, 1.0)
+        self.assertEqual(suggestion.location_score, 1.0)
+        self.assertTrue(SuggestedSwap.objects.filter(user=self.bob, candidate=self.alice).exists())
+        self.assertEqual(SuggestedSwap.objects.get(user=self.alice, candidate=self.carol).skill_score, 0.5)
+
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.get(reverse('suggestion-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        candidates = [row['candidate'] for row in response.data['results']]
+        self.assertEqual(candidates, [self.bob.id, self.carol.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.is_public = False
+            self.bob.save()
+        self.assertFalse(SuggestedSwap.objects.filter(user=self.alice, candidate=self.bob).exists())
+
+    def test_rebuild_matches_incremental(self):
+        self.add_skill(self.alice, 'Python', 'offer')
+        self.add_skill(self.carol, 'Python', 'request')
+        incremental = set(SuggestedSwap.objects.values_list('user', 'candidate', 'score'))
+        SuggestedSwap.objects.all().delete()
+        recommendations.rebuild_users([self.alice.id, self.bob.id, self.carol.id])
+        self.assertEqual(set(SuggestedSwap.objects.values_list('user', 'candidate', 'score')), incremental)
+
+
+class NearbySkillsTests(APITestCase):
+    def test_radius_and_category_filter(self):
+        mumbai = make_user('mumbai@example.com', location='Bombay')
+        pune = make_user('pune@example.com', location='Pune')
+        delhi = make_user('delhi@example.com', location='New Delhi')
+        for user in (mumbai, pune, delhi):
+            Skill.objects.create(user=user, name='Guitar', description='', category='Music', level='Beginner', type='offer')
+        Skill.objects.create(user=pune, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+        response = self.client.get(reverse('skill-nearby'), {'lat': 19.0760, 'lon': 72.8777, 'radius_km': 200, 'category': 'music'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['location'] for row in response.data], ['Bombay', 'Pune'])
+        self.assertEqual(response.data[0]['distance_km'], 0)
+
+        self.client.force_authenticate(user=delhi)
+        response = self.client.get(reverse('skill-nearby'), {'radius_km': 50})
+        self.assertEqual(response.data, [])
+
+    def test_rejects_partial_origin_and_bad_limit(self):
+        for params in ({'lat': 1}, {'lon': 1}, {'lat': 1, 'lon': 1, 'limit': -1}, {'lat': 1, 'lon': 1, 'limit': 0}):
+            self.assertEqual(self.client.get(reverse('skill-nearby'), params).status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class SwapBookingTests(APITestCase):
+    def setUp(self):
+        week = [{'day': day, 'start': '09:00', 'end': '12:00'} for day in ('Monday', 'Saturday')]
+        self.alice = make_user('alice@example.com', availability=week)
+        self.bob = make_user('bob@example.com', availability=week)
+        self.carol = make_user('carol@example.com', availability=week)
+        self.skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+    def propose(self, receiver, slots):
+        return Swap.objects.create(requester=self.alice, receiver=receiver, requester_skill=self.skill,
+                                   receiver_skill=self.skill, proposed_time_slots=slots)
+
+    def test_overlapping_accept_is_rejected(self):
+        first = self.propose(self.bob, [{'day': 'Saturday', 'start': '10:00', 'end': '11:00'}])
+        second = self.propose(self.carol, [{'day': 'Saturday', 'start': '10:30', 'end': '11:30'}])
+        third = self.propose(self.carol, [{'day': 'Saturday', 'start': '11:00', 'end': '12:00'}])
+        self.client.force_authenticate(user=self.bob)
+
+        self.assertEqual(self.client.put(reverse('swap-accept', args=[first.id])).status_code, status.HTTP_200_OK)
+        response = self.client.put(reverse('swap-accept', args=[second.id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'swap': first.id, 'user': self.alice.id}])
+        self.assertEqual(self.client.put(reverse('swap-accept', args=[third.id])).status_code, status.HTTP_200_OK)
+
+        response = self.client.put(reverse('swap-accept', args=[second.id]), {'allow_conflicts': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['conflicts']), 3)
+
+        self.client.put(reverse('swap-reject', args=[first.id]))
+        self.assertFalse(SwapBooking.objects.filter(swap=first).exists())
+
+    def test_slot_suggestions_skip_booked_time(self):
+        swap = self.propose(self.bob, [{'day': 'Monday', 'start': '09:00', 'end': '11:00'}])
+        self.client.force_authenticate(user=self.alice)
+        self.client.put(reverse('swap-accept', args=[swap.id]))
+
+        response = self.client.get(reverse('swap-slots'), {'user_id': self.carol.id, 'duration': 60, 'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slots = {(slot['day'], slot['start']) for slot in response.data['slots']}
+        self.assertEqual(slots, {('Monday', '11:00'), ('Saturday', '09:00'), ('Saturday', '10:00'), ('Saturday', '11:00')})
+
+
+    def test_long_bookings_still_conflict(self):
+        # Overnight slots merge into one interval from Monday 12:00 to Thursday 09:00.
+        long = self.propose(self.bob, [{'day': 'Monday', 'start': '12:00', 'end': '11:00'},
+                                       {'day': 'Tuesday', 'start': '11:00', 'end': '10:00'},
+                                       {'day': 'Wednesday', 'start': '10:00', 'end': '09:00'}])
+        late = self.propose(self.carol, [{'day': 'Wednesday', 'start': '20:00', 'end': '21:00'}])
+        self.client.force_authenticate(user=self.alice)
+        self.assertEqual(self.client.put(reverse('swap-accept', args=[long.id])).status_code, status.HTTP_200_OK)
+        self.assertTrue(SwapBooking.objects.filter(swap=long).count() > 1)
+
+        response = self.client.put(reverse('swap-accept', args=[late.id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [{'swap': long.id, 'user': self.alice.id}])
+
+    def test_slot_suggestions_reject_negative_limit(self):
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.get(reverse('swap-slots'), {'user_id': self.carol.id, 'duration': 60, 'limit': -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SwapArchiveTests(APITestCase):
+    def setUp(self):
+        self.alice = make_user('alice@example.com')
+        self.bob = make_user('bob@example.com')
+        self.skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+    def make_swap(self, status, finished_days_ago=None):
+        finished_at = timezone.now() - timedelta(days=finished_days_ago) if finished_days_ago is not None else None
+        return Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=self.skill,
+                                   receiver_skill=self.skill, status=status, finished_at=finished_at)
+
+    def test_archive_moves_old_finished_swaps_with_ratings(self):
+        old = self.make_swap('completed', finished_days_ago=400)
+        recent = self.make_swap('rejected', finished_days_ago=1)
+        active = self.make_swap('accepted')
+        rating = Rating.objects.create(swap=old, rater=self.alice, rated=self.bob, rating=5, comment='Great')
+
+        self.assertEqual(archive.archive_batch(archive.archive_cutoff(180), batch_size=10), 1)
+        self.assertEqual(set(Swap.objects.values_list('id', flat=True)), {recent.id, active.id})
+        rating.refresh_from_db()
+        self.assertIsNone(rating.swap_id)
+        self.assertEqual(rating.archived_swap.status, 'completed')
+        self.assertEqual(archive.archive_batch(archive.archive_cutoff(180)), 0)
+
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(reverse('swap-list'))
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get(reverse('swap-list'), {'history': 'all'})
+        self.assertEqual({(row['id'], row['archived']) for row in response.data},
+                         {(str(old.id), True), (str(recent.id), False), (str(active.id), False)})
+
+
+    def test_rating_requires_a_swap(self):
+        # swap is only NULL on ratings of archived swaps.
+        self.client.force_authenticate(user=self.alice)
+        for extra in ({}, {'swap': None}):
+            response = self.client.post(reverse('rating-list'), {
+                'rater': self.alice.id, 'rated': self.bob.id, 'rating': 5, 'comment': 'Great', **extra,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, extra)
+            self.assertIn('swap', response.data)
+        self.assertFalse(Rating.objects.exists())
+
+@override_settings(EVENT_LOG_SETTLE_SECONDS=0)
+class EventLogTests(APITestCase):
+    def setUp(self):
+        self.alice = make_user('alice@example.com')
+        self.bob = make_user('bob@example.com')
+        self.skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+    def test_swap_lifecycle_is_logged_and_consumed_from_cursor(self):
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.post(reverse('swap-list'), {
+            'receiver': self.bob.id, 'requester_skill': self.skill.id, 'receiver_skill': self.skill.id,
+        }, format='json')
+        swap_id = response.data['id']
+        self.client.put(reverse('swap-accept', args=[swap_id]))
+        self.client.put(reverse('swap-complete', args=[swap_id]))
+        self.client.post(reverse('rating-list'), {
+            'swap': swap_id, 'rater': self.alice.id, 'rated': self.bob.id, 'rating': 5, 'comment': 'Great',
+        }, format='json')
+
+        seen = []
+        consumer = events.Consumer('test', batch_size=2)
+        consumer.run(lambda batch: seen.extend((event.topic, event.payload.get('status')) for event in batch))
+        self.assertEqual(seen, [
+            ('swap.created', 'pending'),
+            ('swap.status_changed', 'accepted'),
+            ('swap.status_changed', 'completed'),
+            ('rating.created', None),
+        ])
+        self.assertEqual(consumer.position, Event.objects.order_by('seq').last().seq)
+        consumer.run(lambda batch: self.fail('cursor did not advance'))
+
+    def test_compaction_keeps_latest_event_per_object(self):
+        swap = Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=self.skill, receiver_skill=self.skill)
+        for status_name in ('pending', 'accepted', 'completed'):
+            events.record(events.SWAP_STATUS_CHANGED, swap.id, {'status': status_name})
+        Event.objects.update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(events.compact(30), 2)
+        self.assertEqual(list(Event.objects.values_list('payload__status', flat=True)), ['completed'])
+        self.assertEqual(events.prune(30), 1)
+
+    def test_compaction_stops_at_the_slowest_consumer(self):
+        swap = Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=self.skill, receiver_skill=self.skill)
+        recorded = [events.record(events.SWAP_STATUS_CHANGED, swap.id, {'status': status_name})
+                    for status_name in ('pending', 'accepted', 'completed')]
+        Event.objects.update(created_at=timezone.now() - timedelta(days=60))
+        events.Consumer('laggard').seek(recorded[0].seq)
+        self.assertEqual(events.compact(30), 1)
+        self.assertEqual(list(Event.objects.order_by('seq').values_list('payload__status', flat=True)), ['accepted', 'completed'])
+
+    def test_abandoned_consumer_does_not_pin_the_log(self):
+        swap = Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=self.skill, receiver_skill=self.skill)
+        events.record(events.SWAP_STATUS_CHANGED, swap.id, {'status': 'pending'})
+        Event.objects.update(created_at=timezone.now() - timedelta(days=200))
+        events.Consumer('renamed').seek(0)
+        EventCursor.objects.filter(name='renamed').update(updated_at=timezone.now() - timedelta(days=120))
+        events.Consumer('live').seek(0)
+        self.assertEqual(events.prune(90), 0)
+
+        EventCursor.objects.filter(name='live').delete()
+        out = StringIO()
+        call_command('prune_events', stdout=out)
+        self.assertIn("Consumer 'renamed' has not moved since", out.getvalue())
+        self.assertFalse(Event.objects.exists())
+
+
+class CacheTests(APITestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.alice = make_user('alice@example.com')
+
+    def test_anonymous_skill_reads_are_cached_until_a_write(self):
+        skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+        self.client.get(reverse('skill-list'))
+        self.client.get(reverse('skill-detail', args=[skill.id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(reverse('skill-list')).data), 1)
+            self.assertEqual(self.client.get(reverse('skill-detail', args=[skill.id])).data['name'], 'Python')
+
+        skill.name = 'Go'
+        skill.save()
+        Skill.objects.create(user=self.alice, name='Rust', description='', category='Programming', level='Expert', type='offer')
+        self.assertEqual(len(self.client.get(reverse('skill-list')).data), 2)
+        self.assertEqual(self.client.get(reverse('skill-detail', args=[skill.id])).data['name'], 'Go')
+
+    def test_per_process_backend_warns_outside_debug(self):
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}}
+        with override_settings(DEBUG=False):
+            self.assertEqual([w.id for w in cache.check_shared_backend(None)], ['skill_swap_api.W001'])
+        with override_settings(DEBUG=True):
+            self.assertEqual(cache.check_shared_backend(None), [])
+        with override_settings(DEBUG=False, CACHES=redis):
+            self.assertEqual(cache.check_shared_backend(None), [])
+
+    def test_cold_key_is_computed_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.fetch('test', 'cold', compute))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 20)
+        self.assertEqual(len(calls), 1)
+
+        cache.bump('test')
+        self.assertEqual(cache.fetch('test', 'cold', compute), 'value')
+        self.assertEqual(len(calls), 2)
+
+
+class SyntheticDataTests(APITestCase):
+    def generate(self):
+        call_command('generate_synthetic_data', users=40, block_size=15, swaps_per_user=2, stdout=StringIO())
+        return set(Swap.objects.values_list('id', 'status'))
+
+    def test_seeded_generation_is_reproducible(self):
+        swaps = self.generate()
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(len(swaps), 80)
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        user = User.objects.get(email='user7@synthetic.skillswap.test')
+        self.assertTrue(user.check_password('Password123'))
+        self.assertIsNotNone(user.geohash)
+        self.assertFalse(Rating.objects.exclude(swap__status='completed').exists())
+
+        User.objects.all().delete()
+        self.assertEqual(self.generate(), swaps)
+
+
+class TaxonomyTests(APITestCase):
+    # The taxonomy is seeded by migration 0014, so the test database has it.
+    def setUp(self):
+        self.alice = make_user('alice@example.com')
+        self.bob = make_user('bob@example.com')
+
+    def add_skill(self, user, name, type, category='Programming'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Skill.objects.create(user=user, name=name, description='', category=category, level='Expert', type=type)
+
+    def test_spelling_variants_share_canonical_ids(self):
+        skills = [self.add_skill(self.alice, name, 'offer', category)
+                  for name, category in [('Python', 'Programming'), ('python ', 'coding'), ('Python3', 'Tech')]]
+        self.assertEqual({skill.canonical_skill_id for skill in skills}, {taxonomy.find_skill('PYTHON')})
+        self.assertEqual({skill.canonical_category_id for skill in skills}, {taxonomy.find_category('programming')})
+
+        # Unknown spellings stay unmapped (pending) instead of adding to the taxonomy.
+        canonical = CanonicalSkill.objects.count()
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.post(reverse('skill-list'), {
+            'name': 'Underwater Basket Weaving', 'description': 'Weekends', 'category': 'Crafts', 'level': 'Expert', 'type': 'offer',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual((response.data['canonical_skill'], response.data['canonical_category']), (None, None))
+        crafts_python = self.add_skill(self.bob, 'Python', 'request', 'Crafts')
+        self.assertEqual((crafts_python.canonical_skill_id, crafts_python.canonical_category_id),
+                         (taxonomy.find_skill('python'), taxonomy.find_category('programming')))
+        self.assertEqual(CanonicalSkill.objects.count(), canonical)
+        self.client.force_authenticate(user=None)
+
+        # Including the one filed under 'Crafts', which takes Python's category.
+        response = self.client.get(reverse('skill-list'), {'skill': 'py', 'category': 'software'})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(self.client.get(reverse('skill-list'), {'category': 'nonexistent'}).data, [])
+
+    def test_suggestions_match_on_canonical_skill(self):
+        self.add_skill(self.alice, 'Python3', 'offer')
+        self.add_skill(self.bob, 'python programming', 'request')
+        self.assertEqual(SuggestedSwap.objects.get(user=self.alice, candidate=self.bob).skill_score, 0.5)
+
+    def test_backfill_maps_existing_rows(self):
+        skill = self.add_skill(self.alice, 'JS', 'offer')
+        Skill.objects.filter(id=skill.id).update(canonical_skill=None, canonical_category=None)
+        out = StringIO()
+        call_command('backfill_taxonomy', batch_size=1, stdout=out)
+        skill.refresh_from_db()
+        self.assertEqual(skill.canonical_skill_id, taxonomy.find_skill('JavaScript'))
+        self.assertIn('Mapped 1 skills', out.getvalue())
+
+
+class SwapMessageTests(APITestCase):
+    def setUp(self):
+        self.alice = make_user('alice@example.com')
+        self.bob = make_user('bob@example.com')
+        self.carol = make_user('carol@example.com')
+        skill = Skill.objects.create(user=self.alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+        self.swap = Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=skill, receiver_skill=skill)
+
+    def send(self, user, body):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('swap-messages', args=[self.swap.id]), {'body': body}, format='json')
+
+    def test_thread_cursor_and_unread_counts(self):
+        self.assertEqual(self.send(self.alice, 'Hi').status_code, status.HTTP_409_CONFLICT)
+        self.swap.status = 'accepted'
+        self.swap.save()
+        self.assertEqual(self.send(self.carol, 'Hi').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual([self.send(self.alice, body).data['seq'] for body in ('Hi', 'Saturday?', 'Bring a laptop')], [1, 2, 3])
+        self.send(self.bob, 'Sounds good')
+
+        self.client.force_authenticate(user=self.bob)
+        self.assertEqual(self.client.get(reverse('messages-unread')).data, {'total': 0, 'threads': []})
+        self.client.force_authenticate(user=self.alice)
+        self.assertEqual(self.client.get(reverse('messages-unread')).data['total'], 1)
+
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(reverse('swap-messages', args=[self.swap.id]), {'after': 1, 'limit': 2})
+        self.assertEqual([message['body'] for message in response.data['messages']], ['Saturday?', 'Bring a laptop'])
+        self.assertEqual(response.data['last_seq'], 3)
+        self.client.force_authenticate(user=self.carol)
+        self.assertEqual(self.client.get(reverse('swap-messages', args=[self.swap.id])).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.post(reverse('swap-messages-read', args=[self.swap.id]), {'seq': 99}, format='json')
+        self.assertEqual(response.data['unread'], 0)
+
+    def test_long_poll_returns_new_messages_or_times_out(self):
+        self.swap.status = 'accepted'
+        self.swap.save()
+        self.send(self.alice, 'Hi')
+        self.client.force_authenticate(user=None)
+        url = reverse('swap-messages-wait', args=[self.swap.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.bob).access_token}')
+        response = self.client.get(url, {'after': 0})
+        self.assertEqual(response.json()['messages'][0]['body'], 'Hi')
+        started = time.monotonic()
+        response = self.client.get(url, {'after': 1, 'timeout': 0.3})
+        self.assertEqual(response.json(), {'messages': [], 'last_seq': 1})
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        for timeout in ('nan', 'inf', 'soon'):
+            self.assertEqual(self.client.get(url, {'after': 1, 'timeout': timeout}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExpansionTests(APITestCase):
+    def setUp(self):
+        self.alice = make_user('alice@example.com', location='NYC')
+        self.bob = make_user('bob@example.com', location='Paris', is_public=False)
+        for i in range(3):
+            offer = Skill.objects.create(user=self.alice, name=f'Skill {i}', description='', category='Music', level='Expert', type='offer')
+            wanted = Skill.objects.create(user=self.bob, name=f'Other {i}', description='', category='Music', level='Expert', type='offer')
+            swap = Swap.objects.create(requester=self.alice, receiver=self.bob, requester_skill=offer, receiver_skill=wanted, status='completed')
+            Rating.objects.create(swap=swap, rater=self.alice, rated=self.bob, rating=5, comment='')
+        self.client.force_authenticate(user=self.alice)
+
+    def test_fields_and_expand_on_swaps(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('swap-list'), {
+                'fields': 'id,requester,receiver_skill.name,receiver_skill.user',
+                'expand': 'requester,receiver_skill.user',
+            })
+        self.assertEqual(len(response.data), 3)
+        row = response.data[0]
+        self.assertEqual(set(row), {'id', 'requester', 'receiver_skill'})
+        self.assertEqual(row['requester']['name'], 'alice')
+        self.assertEqual(set(row['receiver_skill']), {'name', 'user'})
+        # Private users are expanded to their id only.
+        self.assertEqual(row['receiver_skill']['user'], {'id': str(self.bob.id)})
+
+        plain = self.client.get(reverse('swap-list')).data[0]
+        self.assertEqual(plain['requester'], self.alice.id)
+
+    def test_expand_on_ratings_and_skills(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('rating-list'), {'expand': 'swap.requester_skill,rated', 'fields': 'rating,rated,swap'})
+        self.assertEqual(response.data[0]['swap']['requester_skill']['user'], self.alice.id)
+        self.assertEqual(response.data[0]['rated'], {'id': str(self.bob.id)})
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('skill-list'), {'expand': 'user', 'fields': 'name,user.name'})
+        self.assertEqual({frozenset(row) for row in response.data}, {frozenset({'name', 'user'})})
+        self.assertEqual(response.data[0]['user'], {'name': 'alice'})
+        # Anonymous callers learn nothing about private users' skills' owners.
+        private = self.client.get(reverse('skill-list'), {'expand': 'user'}).data
+        self.assertEqual([row['user'] for row in private if row['user']['id'] == str(self.bob.id)][0], {'id': str(self.bob.id)})
+
+        # Writes ignore the shape parameters.
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.post(reverse('skill-list') + '?fields=id', {
+            'name': 'Piano', 'description': 'Lessons', 'category': 'Music', 'level': 'Expert', 'type': 'offer',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('name', response.data)
+
+
+class FastListTests(APITestCase):
+    setUp = ExpansionTests.setUp
+
+    def render(self, name, **params):
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(reverse(name), params)
+        fast = self.client.get(reverse(name), params)
+        return slow.content, fast.content
+
+    def test_values_path_renders_like_the_serializer(self):
+        Swap.objects.update(actual_time=timezone.now(), proposed_time_slots=[{'day': 'Monday', 'start': '10:00', 'end': '11:00'}])
+        for name in ('swap-list', 'rating-list', 'skill-list'):
+            slow, fast = self.render(name)
+            self.assertEqual(json.loads(fast), json.loads(slow), name)
+        slow, fast = self.render('swap-list', fields='id,status,actual_time')
+        self.assertEqual(json.loads(fast), json.loads(slow))
+        self.assertEqual(set(json.loads(fast)[0]), {'id', 'status', 'actual_time'})
+
+    def test_renderer_escapes_line_separators(self):
+        rendered = FastJSONRenderer().render({'text': 'a\u2028b', 'id': self.alice.id})
+        self.assertEqual(json.loads(rendered), {'text': 'a\u2028b', 'id': str(self.alice.id)})
+        self.assertIn(b'\\u2028', rendered)
+
+
+class JumpHashTests(APITestCase):
+    def test_growing_moves_keys_only_onto_the_new_bucket(self):
+        keys = [uuid.uuid4().int & ((1 << 64) - 1) for _ in range(2000)]
+        before = [sharding.jump_hash(key, 3) for key in keys]
+        after = [sharding.jump_hash(key, 4) for key in keys]
+        self.assertEqual(before, [sharding.jump_hash(key, 3) for key in keys])
+        moved = [new for old, new in zip(before, after) if old != new]
+        self.assertTrue(all(bucket == 3 for bucket in moved))
+        self.assertLess(abs(len(moved) / len(keys) - 0.25), 0.05)
+
+
+# Run with extra databases, e.g.
+#   SWAP_SHARDS=sqlite:////tmp/shard1.sqlite3,sqlite:////tmp/shard2.sqlite3 python manage.py test swap.tests.ShardingTests
+@skipUnless(len(settings.SHARD_DATABASES) > 1, 'SWAP_SHARDS is not set')
+class ShardingTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        # Requesters on two different shards, both proposing to bob.
+        self.bob = make_user('bob@example.com')
+        users = [make_user(f'user{n}@example.com') for n in range(20)]
+        shards = {}
+        for user in users:
+            shards.setdefault(sharding.shard_for_user(user.id), user)
+        self.alice, self.carol = list(shards.values())[:2]
+        self.skill = Skill.objects.create(user=self.bob, name='Python', description='', category='Programming', level='Expert', type='offer')
+
+    def propose(self, requester):
+        self.client.force_authenticate(user=requester)
+        response = self.client.post(reverse('swap-list'), {
+            'receiver': str(self.bob.id), 'requester_skill': str(self.skill.id), 'receiver_skill': str(self.skill.id),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data['id']
+
+    def holders(self, model, pk):
+        return [name for name in sharding.aliases() if model.objects.using(name).filter(pk=pk).exists()]
+
+    def test_swaps_live_on_the_requester_shard_and_are_read_from_all(self):
+        first, second = self.propose(self.alice), self.propose(self.carol)
+        self.assertEqual(self.holders(Swap, first), [sharding.shard_for_user(self.alice.id)])
+        self.assertEqual(self.holders(Swap, second), [sharding.shard_for_user(self.carol.id)])
+
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(reverse('swap-list'))
+        self.assertEqual({row['id'] for row in response.json()}, {first, second})
+        response = self.client.get(reverse('swap-list'), {'expand': 'requester'})
+        self.assertEqual({row['requester']['id'] for row in response.json()}, {str(self.alice.id), str(self.carol.id)})
+
+        self.assertEqual(self.client.put(reverse('swap-accept', args=[second])).status_code, status.HTTP_200_OK)
+        self.assertEqual(Swap.objects.using(sharding.shard_for_user(self.carol.id)).get(pk=second).status, 'accepted')
+
+        response = self.client.post(reverse('rating-list'), {
+            'swap': second, 'rater': str(self.bob.id), 'rated': str(self.carol.id), 'rating': 4, 'comment': 'Great',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(self.holders(Rating, response.data['id']), [sharding.shard_for_user(self.carol.id)])
+        self.assertEqual(len(self.client.get(reverse('rating-list')).json()), 1)
+
+    def test_rebalance_moves_misplaced_swaps_with_their_ratings(self):
+        # Misplaced on 'default', where the swap's bookings are too.
+        owner = next(user for user in (self.alice, self.carol) if sharding.shard_for_user(user.id) != sharding.DEFAULT)
+        home, wrong = sharding.shard_for_user(owner.id), sharding.DEFAULT
+        swap = Swap.objects.using(wrong).create(requester=owner, receiver=self.bob, requester_skill=self.skill,
+                                                receiver_skill=self.skill, status='completed')
+        rating = Rating.objects.create(swap=swap, rater=self.bob, rated=owner, rating=5, comment='')
+        SwapBooking.objects.create(swap=swap, user=self.bob, kind=SwapBooking.WEEKLY, start=600, end=660)
+        self.assertEqual(self.holders(Rating, rating.pk), [wrong])
+
+        out = StringIO()
+        call_command('rebalance_shards', '--dry-run', stdout=out)
+        self.assertIn('Would move 1 swaps', out.getvalue())
+        self.assertEqual(self.holders(Swap, swap.pk), [wrong])
+
+        call_command('rebalance_shards', '--sleep', '0', stdout=StringIO())
+        self.assertEqual(self.holders(Swap, swap.pk), [home])
+        self.assertEqual(self.holders(Rating, rating.pk), [home])
+        # Bookings stay on 'default' and keep pointing at the moved swap.
+        self.assertEqual(SwapBooking.objects.filter(swap_id=swap.pk).count(), 1)
+
+    def test_rating_without_a_swap_is_rejected(self):
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.post(reverse('rating-list'), {
+            'rater': str(self.bob.id), 'rated': str(self.carol.id), 'rating': 4, 'comment': 'Great',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([name for name in sharding.aliases() if Rating.objects.using(name).exists()], [])
+
+    def test_synthetic_data_is_placed_on_owner_shards(self):
+        call_command('generate_synthetic_data', users=40, block_size=15, swaps_per_user=2, stdout=StringIO())
+        swaps = 0
+        for name in sharding.aliases():
+            for requester_id in Swap.objects.using(name).values_list('requester_id', flat=True):
+                self.assertEqual(sharding.shard_for_user(requester_id), name)
+                swaps += 1
+            for owner_id in Rating.objects.using(name).values_list('swap__requester_id', flat=True):
+                self.assertEqual(sharding.shard_for_user(owner_id), name)
+        self.assertEqual(swaps, 80)
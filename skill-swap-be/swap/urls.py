@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    SwapListCreateView, SwapAcceptView, SwapRejectView, SwapCompleteView, SkillViewSet, RatingViewSet
+    SwapListCreateView, SwapAcceptView, SwapRejectView, SwapCompleteView, SkillViewSet, RatingViewSet,
+    SuggestedSwapListView, NearbySkillsView, SwapSlotSuggestionView, SwapMessageListView, SwapMessageReadView,
+    SwapMessageWaitView, UnreadMessagesView
 )
 
 
@@ -12,8 +14,15 @@ router.register(r'ratings', RatingViewSet, basename='rating')
 
 urlpatterns = [
     path('swaps/', SwapListCreateView.as_view(), name='swap-list'),
+    path('swaps/slots/', SwapSlotSuggestionView.as_view(), name='swap-slots'),
     path('swaps/<uuid:pk>/accept/', SwapAcceptView.as_view(), name='swap-accept'),
     path('swaps/<uuid:pk>/reject/', SwapRejectView.as_view(), name='swap-reject'),
     path('swaps/<uuid:pk>/complete/', SwapCompleteView.as_view(), name='swap-complete'),
+    path('swaps/<uuid:pk>/messages/', SwapMessageListView.as_view(), name='swap-messages'),
+    path('swaps/<uuid:pk>/messages/wait/', SwapMessageWaitView.as_view(), name='swap-messages-wait'),
+    path('swaps/<uuid:pk>/messages/read/', SwapMessageReadView.as_view(), name='swap-messages-read'),
+    path('messages/unread/', UnreadMessagesView.as_view(), name='messages-unread'),
+    path('suggestions/', SuggestedSwapListView.as_view(), name='suggestion-list'),
+    path('skills/nearby/', NearbySkillsView.as_view(), name='skill-nearby'),
 ]
 urlpatterns += router.urls
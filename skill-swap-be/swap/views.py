@@ -1,29 +1,78 @@
 from rest_framework import generics, status, permissions, viewsets
 from rest_framework.response import Response
-from .models import Skill, Swap, Rating
-from .serializers import SwapSerializer
+from rest_framework.pagination import CursorPagination
+from .models import Skill, Swap, Rating, SuggestedSwap
+from django.http import Http404, JsonResponse
+from django.views import View
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from user.authentication import RevocationAwareJWTAuthentication
+from .serializers import (
+    SwapSerializer, SwapHistorySerializer, SuggestedSwapSerializer, SwapMessageSerializer, SkillSerializer, RatingSerializer,
+)
+from skill_swap_api.expansion import ExpandableQuerysetMixin
+from skill_swap_api.fastpath import ValuesListMixin
 from django.shortcuts import get_object_or_404
-from rest_framework import serializers
+from django.db.models import F, Q
+from rest_framework.views import APIView
+from user import geo
+from user.models import User
+from django.utils import timezone
+from django.conf import settings
+from skill_swap_api import cache, sharding
+from . import archive, events, messaging, scheduling, taxonomy
+from functools import partial
+import math
+import uuid
 
-class SwapListCreateView(generics.ListCreateAPIView):
+class SwapListCreateView(sharding.FanOutMixin, ValuesListMixin, ExpandableQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = SwapSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        return Swap.objects.filter(requester=user) | Swap.objects.filter(receiver=user)
+        return self.optimize_queryset(Swap.objects.filter(requester=user) | Swap.objects.filter(receiver=user))
+
+    def list(self, request, *args, **kwargs):
+        # ?history=all also returns swaps that were moved to the archive.
+        if request.query_params.get('history') == 'all':
+            return Response(SwapHistorySerializer(sharding.fan_out(archive.user_history(request.user)), many=True).data)
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(requester=self.request.user)
+        with sharding.atomic(sharding.shard_for_user(self.request.user.id)):
+            swap = serializer.save(requester=self.request.user)
+            events.record(events.SWAP_CREATED, swap.id, events.swap_payload(swap), actor=self.request.user)
+
+def locate_swap(request, pk):
+    # Shard of the swap, trying the caller's own first (it holds swaps they requested).
+    shard = sharding.find(Swap, pk, prefer=sharding.shard_for_user(request.user.id))
+    if shard is None:
+        raise Http404
+    return shard
 
 class SwapAcceptView(generics.UpdateAPIView):
     serializer_class = SwapSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def put(self, request, pk):
-        swap = get_object_or_404(Swap, pk=pk)
-        swap.status = 'accepted'
-        swap.save()
+        shard = locate_swap(request, pk)
+        with sharding.atomic(shard):
+            swap = get_object_or_404(Swap.objects.using(shard).select_for_update(), pk=pk)
+            # Lock both participants so concurrent accepts for either of them
+            # see each other's bookings.
+            list(User.objects.select_for_update().filter(id__in=[swap.requester_id, swap.receiver_id]).order_by('id'))
+            conflicts = [{'swap': booking.swap_id, 'user': booking.user_id} for booking in scheduling.find_conflicts(swap)]
+            if conflicts and not request.data.get('allow_conflicts'):
+                return Response({'error': 'Swap overlaps with an accepted swap.', 'conflicts': conflicts},
+                                status=status.HTTP_409_CONFLICT)
+            previous = swap.status
+            swap.status = 'accepted'
+            swap.save()
+            scheduling.book(swap)
+            events.record(events.SWAP_STATUS_CHANGED, swap.id, events.swap_payload(swap, previous=previous), actor=request.user)
+        if conflicts:
+            return Response({'message': 'Swap accepted.', 'conflicts': conflicts})
         return Response({'message': 'Swap accepted.'})
 
 class SwapRejectView(generics.UpdateAPIView):
@@ -31,9 +80,15 @@ class SwapRejectView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def put(self, request, pk):
-        swap = get_object_or_404(Swap, pk=pk)
-        swap.status = 'rejected'
-        swap.save()
+        shard = locate_swap(request, pk)
+        swap = get_object_or_404(Swap.objects.using(shard), pk=pk)
+        with sharding.atomic(shard):
+            previous = swap.status
+            swap.status = 'rejected'
+            swap.finished_at = timezone.now()
+            swap.save()
+            scheduling.release(swap)
+            events.record(events.SWAP_STATUS_CHANGED, swap.id, events.swap_payload(swap, previous=previous), actor=request.user)
         return Response({'message': 'Swap rejected.'})
 
 class SwapCompleteView(generics.UpdateAPIView):
@@ -41,34 +96,156 @@ class SwapCompleteView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def put(self, request, pk):
-        swap = get_object_or_404(Swap, pk=pk)
-        swap.status = 'completed'
-        swap.save()
+        shard = locate_swap(request, pk)
+        swap = get_object_or_404(Swap.objects.using(shard), pk=pk)
+        with sharding.atomic(shard):
+            previous = swap.status
+            swap.status = 'completed'
+            swap.finished_at = timezone.now()
+            swap.save()
+            scheduling.release(swap)
+            events.record(events.SWAP_STATUS_CHANGED, swap.id, events.swap_payload(swap, previous=previous), actor=request.user)
         return Response({'message': 'Swap marked as completed.'})
 
+class SwapSlotSuggestionView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-# Rating APIs
-class RatingSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Rating
-        fields = '__all__'
+    def get(self, request):
+        try:
+            duration = int(request.query_params.get('duration', scheduling.session_minutes()))
+            limit = min(int(request.query_params.get('limit', 5)), 50)
+        except ValueError:
+            return Response({'error': 'Invalid duration or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        if duration <= 0 or limit <= 0:
+            return Response({'error': 'Invalid duration or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            other = User.objects.get(pk=uuid.UUID(str(request.query_params.get('user_id'))))
+        except (ValueError, User.DoesNotExist):
+            return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'slots': scheduling.suggest_slots(request.user, other, duration=duration, limit=limit)})
+
+
+# Swap messages
+def message_page(messages, after):
+    return {
+        'messages': SwapMessageSerializer(messages, many=True).data,
+        'last_seq': messages[-1].seq if messages else after,
+    }
+
+def message_cursor(params):
+    after = int(params.get('after', 0))
+    limit = min(int(params.get('limit', 100)), 500)
+    if after < 0 or limit <= 0:
+        raise ValueError
+    return after, limit
+
+class SwapMessageListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        if request.user.id not in (messaging.participants(pk) or ()):
+            return Response({'error': 'Swap not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            after, limit = message_cursor(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid after or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(message_page(messaging.since(pk, after, limit), after))
 
-class RatingViewSet(viewsets.ModelViewSet):
+    def post(self, request, pk):
+        swap = sharding.get(Swap.objects.filter(Q(requester=request.user) | Q(receiver=request.user)), pk=pk)
+        if swap is None:
+            raise Http404
+        if swap.status not in messaging.OPEN_STATUSES:
+            return Response({'error': 'Messages can be sent once the swap is accepted.'}, status=status.HTTP_409_CONFLICT)
+        body = str(request.data.get('body', '')).strip()
+        if not body or len(body) > messaging.MAX_BODY_LENGTH:
+            return Response({'error': f'Message must be 1-{messaging.MAX_BODY_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
+        message = messaging.post(swap, request.user, body)
+        return Response(SwapMessageSerializer(message).data, status=status.HTTP_201_CREATED)
+
+class SwapMessageReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            seq = int(request.data.get('seq'))
+        except (TypeError, ValueError):
+            return Response({'error': 'seq is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'unread': messaging.mark_read(pk, request.user, seq)})
+
+class UnreadMessagesView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        threads = [{'swap': swap_id, 'unread': count, 'last_seq': last_seq}
+                   for swap_id, count, last_seq in messaging.unread(request.user)]
+        return Response({'total': sum(thread['unread'] for thread in threads), 'threads': threads})
+
+class SwapMessageWaitView(View):
+    # Long-poll: answers as soon as there are messages after ?after=, or with an
+    # empty page after ?timeout= seconds. Async so a waiting client holds no
+    # worker thread under ASGI; DRF views are sync-only, hence a plain view.
+    async def get(self, request, pk):
+        try:
+            user, _ = await sync_to_async(RevocationAwareJWTAuthentication().authenticate)(request) or (None, None)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+        if user.id not in (await sync_to_async(messaging.participants)(pk) or ()):
+            return JsonResponse({'error': 'Swap not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            after, limit = message_cursor(request.GET)
+            timeout = float(request.GET.get('timeout', settings.MESSAGE_LONG_POLL_SECONDS))
+            if not math.isfinite(timeout):
+                raise ValueError(timeout)
+            timeout = min(timeout, settings.MESSAGE_LONG_POLL_SECONDS)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid after, limit or timeout.'}, status=status.HTTP_400_BAD_REQUEST)
+        messages = await messaging.wait(pk, after, limit, max(timeout, 0))
+        return JsonResponse(message_page(messages, after))
+
+# Rating APIs
+class RatingViewSet(sharding.FanOutMixin, ValuesListMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = RatingSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Rating.objects.all()
 
-# Skill APIs
-class SkillSerializer(serializers.ModelSerializer):
-    user = serializers.PrimaryKeyRelatedField(read_only=True)
-    class Meta:
-        model = Skill
-        fields = '__all__'
+    def perform_create(self, serializer):
+        with sharding.atomic(serializer.validated_data['swap']._state.db):
+            rating = serializer.save()
+            events.record(events.RATING_CREATED, rating.id, {
+                'swap': str(rating.swap_id),
+                'rater': str(rating.rater_id),
+                'rated': str(rating.rated_id),
+                'rating': rating.rating,
+            }, actor=self.request.user)
 
-class SkillViewSet(viewsets.ModelViewSet):
+# Skill APIs
+class SkillViewSet(ValuesListMixin, ExpandableQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = SkillSerializer
     queryset = Skill.objects.all()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return queryset.filter(is_visible=True)
+        if self.action == 'list':
+            # ?category= and ?skill= accept any known spelling and filter on canonical ids.
+            queryset = queryset.filter(is_visible=True)
+            params = self.request.query_params
+            if params.get('category'):
+                queryset = self.filter_canonical(queryset, 'canonical_category_id', taxonomy.find_category(params['category']))
+            if params.get('skill'):
+                queryset = self.filter_canonical(queryset, 'canonical_skill_id', taxonomy.find_skill(params['skill']))
+            return queryset
+        return queryset
+
+    @staticmethod
+    def filter_canonical(queryset, field, value):
+        # An unknown spelling matches nothing (filtering on None would mean IS NULL).
+        return queryset.filter(**{field: value}) if value is not None else queryset.none()
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [permissions.AllowAny()]
@@ -76,3 +253,89 @@ class SkillViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    # Anonymous reads are identical for everyone, so they are served from the
+    # versioned cache; any Skill write bumps the namespace.
+    def list(self, request, *args, **kwargs):
+        return self.cached(request.get_full_path(), partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(f'detail:{kwargs["pk"]}', partial(super().retrieve, request, *args, **kwargs))
+
+    def cached(self, key, view):
+        # Expanded users are not covered by the skills namespace, so those reads skip the cache.
+        if self.request.user.is_authenticated or 'expand' in self.request.query_params:
+            return view()
+        return Response(cache.fetch(cache.SKILLS, key, lambda: view().data))
+
+# Suggested swap partners
+class SuggestedSwapPagination(CursorPagination):
+    ordering = ('-score', 'id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+class SuggestedSwapListView(generics.ListAPIView):
+    serializer_class = SuggestedSwapSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SuggestedSwapPagination
+
+    def get_queryset(self):
+        return SuggestedSwap.objects.filter(user=self.request.user).select_related('candidate')
+
+# Proximity search
+class NearbySkillsView(generics.GenericAPIView):
+    permission_classes = [permissions.AllowAny]
+    max_radius_km = 500
+    max_results = 100
+
+    def get(self, request):
+        try:
+            latitude, longitude = self.get_origin(request)
+            radius_km = min(float(request.query_params.get('radius_km', 25)), self.max_radius_km)
+            limit = min(int(request.query_params.get('limit', 20)), self.max_results)
+            if limit <= 0:
+                raise ValueError(limit)
+        except (KeyError, TypeError, ValueError):
+            return Response({'error': 'Invalid lat, lon, radius_km or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        if latitude is None:
+            return Response({'error': 'Provide lat and lon or set a recognised profile location.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Skill.objects.exclude(status='rejected').filter(is_visible=True, user__is_public=True)
+        if request.query_params.get('category'):
+            queryset = SkillViewSet.filter_canonical(queryset, 'canonical_category_id', taxonomy.find_category(request.query_params['category']))
+        if request.query_params.get('type'):
+            queryset = queryset.filter(type=request.query_params['type'])
+        if request.user.is_authenticated:
+            queryset = queryset.exclude(user=request.user)
+
+        # Index range scans over the covering geohash cells, then an
+        # equirectangular distance for ordering (exact enough at these radii).
+        cells = Q()
+        for prefix in geo.covering_cells(latitude, longitude, radius_km):
+            cells |= Q(user__geohash__startswith=prefix)
+        cos_lat = math.cos(math.radians(latitude))
+        radius_deg = radius_km / geo.KM_PER_DEGREE
+        queryset = (queryset.filter(cells)
+                    .annotate(distance_sq=(F('user__latitude') - latitude) * (F('user__latitude') - latitude)
+                              + (F('user__longitude') - longitude) * (F('user__longitude') - longitude) * cos_lat * cos_lat)
+                    .filter(distance_sq__lte=radius_deg * radius_deg)
+                    .select_related('user')
+                    .order_by('distance_sq', 'id')[:limit])
+
+        results = []
+        for skill in queryset:
+            data = SkillSerializer(skill).data
+            data['user_name'] = skill.user.name
+            data['location'] = skill.user.location
+            data['distance_km'] = round(geo.haversine_km(latitude, longitude, skill.user.latitude, skill.user.longitude), 1)
+            results.append(data)
+        return Response(results)
+
+    def get_origin(self, request):
+        if 'lat' in request.query_params or 'lon' in request.query_params:
+            # Both or neither; a missing one raises KeyError.
+            return float(request.query_params['lat']), float(request.query_params['lon'])
+        if request.user.is_authenticated and request.user.latitude is not None:
+            return request.user.latitude, request.user.longitude
+        return None, None
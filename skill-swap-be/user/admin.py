@@ -8,7 +8,8 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('email', 'name')
     list_filter = ('is_active', 'is_banned', 'role', 'email_verified')
     ordering = ('-id',)
-    readonly_fields = ('id',)
+    # Ban through PUT /api/admin/users/<id>/ban/ so tokens and skill visibility follow.
+    readonly_fields = ('id', 'is_banned')
 from django.contrib import admin
 
 # Register your models here.
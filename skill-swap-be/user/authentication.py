@@ -0,0 +1,31 @@
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from . import revocation
+
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    # Rejects revoked tokens and banned users from memory, before the user lookup.
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocation.is_revoked(token):
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        return token
+
+
+class BanCheckMixin:
+    # For the non-JWT classes, which resolve the user from the database anyway.
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None and result[0].is_banned:
+            raise AuthenticationFailed('Account is banned.', code='user_banned')
+        return result
+
+
+class BanAwareSessionAuthentication(BanCheckMixin, SessionAuthentication):
+    pass
+
+
+class BanAwareBasicAuthentication(BanCheckMixin, BasicAuthentication):
+    pass
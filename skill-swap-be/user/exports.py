@@ -0,0 +1,125 @@
+# Per-user data export bundles.
+#
+# A bundle is a zip with one NDJSON file per dataset (profile, skills, swaps
+# in both directions including archived ones, ratings given and received).
+# Each queryset is read with .iterator() and written row by row into a zip
+# entry that streams to disk, so memory stays flat however large the account.
+# With DATA_EXPORT_STORAGE=s3 the finished file is uploaded (multipart, from
+# disk) and the local copy removed.
+import json
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from skill_swap_api import sharding
+from swap import archive
+from swap.models import Rating, Skill
+from .models import DataExport, User
+from .utils import get_s3_client
+
+PROFILE_FIELDS = [
+    'id', 'email', 'name', 'location', 'latitude', 'longitude', 'bio', 'availability',
+    'is_public', 'is_banned', 'email_verified', 'profile_photo',
+]
+CHUNK_SIZE = 2000
+
+
+def datasets(user):
+    """[(file name, iterable of dict rows)] making up a user's bundle."""
+    return [
+        ('profile.ndjson', User.objects.filter(id=user.id).values(*PROFILE_FIELDS).iterator()),
+        ('skills.ndjson', Skill.objects.filter(user=user).order_by('id').values().iterator(chunk_size=CHUNK_SIZE)),
+        # Swaps and ratings are read shard by shard (skill_swap_api.sharding).
+        ('swaps.ndjson', sharding.iterate(archive.user_history(user), CHUNK_SIZE)),
+        ('ratings_given.ndjson', sharding.iterate(Rating.objects.filter(rater=user).order_by('id').values(), CHUNK_SIZE)),
+        ('ratings_received.ndjson', sharding.iterate(Rating.objects.filter(rated=user).order_by('id').values(), CHUNK_SIZE)),
+    ]
+
+
+def write_bundle(user, fileobj):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    counts = {}
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, rows in datasets(user):
+            counts[name] = 0
+            with bundle.open(name, 'w', force_zip64=True) as entry:
+                for row in rows:
+                    entry.write(encoder.encode(row).encode())
+                    entry.write(b'\n')
+                    counts[name] += 1
+        bundle.writestr('manifest.json', json.dumps({
+            'user': str(user.id),
+            'generated_at': timezone.now().isoformat(),
+            'rows': counts,
+        }))
+
+
+def local_path(export):
+    return os.path.join(settings.DATA_EXPORT_DIR, f'{export.id}.zip')
+
+
+def claim_next():
+    """Mark the oldest pending (or abandoned running) export as running and return it, or None."""
+    stale = timezone.now() - timedelta(minutes=settings.DATA_EXPORT_RECLAIM_MINUTES)
+    with transaction.atomic():
+        export = (DataExport.objects.select_for_update(skip_locked=True)
+                  .filter(Q(status=DataExport.PENDING) | Q(status=DataExport.RUNNING, started_at__lt=stale))
+                  .order_by('created_at').first())
+        if export is not None:
+            export.status = DataExport.RUNNING
+            export.started_at = timezone.now()
+            export.save(update_fields=['status', 'started_at'])
+        return export
+
+
+def build(export):
+    try:
+        os.makedirs(settings.DATA_EXPORT_DIR, exist_ok=True)
+        if settings.DATA_EXPORT_STORAGE == 's3':
+            with tempfile.NamedTemporaryFile(dir=settings.DATA_EXPORT_DIR, suffix='.zip') as tmp:
+                write_bundle(export.user, tmp)
+                tmp.flush()
+                export.size = os.path.getsize(tmp.name)
+                export.location = f'exports/{export.user_id}/{export.id}.zip'
+                get_s3_client().upload_file(tmp.name, settings.AWS_STORAGE_BUCKET_NAME, export.location)
+            export.storage = 's3'
+        else:
+            path = local_path(export)
+            try:
+                with open(path + '.part', 'wb') as f:
+                    write_bundle(export.user, f)
+                os.replace(path + '.part', path)
+            finally:
+                if os.path.exists(path + '.part'):
+                    os.remove(path + '.part')
+            export.size = os.path.getsize(path)
+            export.location = path
+            export.storage = 'local'
+        export.status = DataExport.READY
+    except Exception as exc:
+        export.status = DataExport.FAILED
+        export.error = repr(exc)
+    export.finished_at = timezone.now()
+    export.expires_at = export.finished_at + timedelta(days=settings.DATA_EXPORT_TTL_DAYS)
+    export.save()
+    return export
+
+
+def purge_expired():
+    """Delete bundles past expires_at, with their files. Returns the number removed."""
+    removed = 0
+    for export in DataExport.objects.filter(expires_at__lt=timezone.now()).iterator():
+        if export.storage == 'local' and export.location and os.path.exists(export.location):
+            os.remove(export.location)
+        elif export.storage == 's3' and export.location:
+            get_s3_client().delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=export.location)
+        export.delete()
+        removed += 1
+    return removed
@@ -0,0 +1,121 @@
+# Offline geocoding and geohash helpers for User.location.
+#
+# Locations are free text. They are resolved against the bundled gazetteer
+# (user/data/gazetteer.csv: city, country, coordinates and aliases) without any
+# network access, then indexed by geohash so proximity queries become prefix
+# range scans on a b-tree index.
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.csv')
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def normalize_location(value):
+    value = re.sub(r'[^\w\s,.\'-]', ' ', (value or '').lower())
+    return ' '.join(value.split())
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """{normalized name or alias: (latitude, longitude, canonical name)}"""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            entry = (float(row['latitude']), float(row['longitude']), row['name'])
+            names = [row['name']] + [alias for alias in row['aliases'].split('|') if alias]
+            for name in names:
+                places.setdefault(normalize_location(name), entry)
+    return places
+
+
+def geocode(location):
+    """Resolve free text such as "Bangalore, India" to (lat, lon, name), or None."""
+    text = normalize_location(location)
+    if not text:
+        return None
+    places = gazetteer()
+    candidates = [text] + [part.strip() for part in text.split(',')]
+    for candidate in candidates:
+        candidate = candidate.strip(' .')
+        if candidate in places:
+            return places[candidate]
+    return None
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        target, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            target[0] = mid
+        else:
+            target[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    """(latitude span, longitude span) of one geohash cell."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together cover the circle around a point.
+
+    Picks the finest precision whose cells are at least as large as the radius,
+    then returns the centre cell and its eight neighbours.
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lat_span, lon_span = cell_size_degrees(candidate)
+        if lat_span * KM_PER_DEGREE >= radius_km and lon_span * KM_PER_DEGREE * cos_lat >= radius_km:
+            precision = candidate
+            break
+    lat_span, lon_span = cell_size_degrees(precision)
+    cells = set()
+    for dlat in (-lat_span, 0, lat_span):
+        for dlon in (-lon_span, 0, lon_span):
+            lat = max(-90.0, min(90.0, latitude + dlat))
+            lon = (longitude + dlon + 180) % 360 - 180
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def apply_location(user):
+    """Fill user.latitude/longitude/geohash from user.location."""
+    place = geocode(user.location)
+    if place is None:
+        user.latitude = user.longitude = user.geohash = None
+    else:
+        user.latitude, user.longitude = place[0], place[1]
+        user.geohash = encode(place[0], place[1])
@@ -0,0 +1,154 @@
+# Bulk user import from CSV.
+#
+# Columns: email (required), name, password, location, bio, is_public.
+# Rows are parsed as a stream and handled in chunks: passwords are hashed
+# across a process pool (PBKDF2 is CPU bound, so one core per hash) and users
+# are inserted with bulk_create, together with a QueuedOTPEmail row each.
+# Emails already registered, or repeated in the file, are skipped using one set
+# fetched up front.
+#
+# The admin endpoint only stores the upload as a UserImport; process_imports
+# claims jobs (and reclaims ones left running by a crashed worker, which is
+# safe since existing emails are skipped), runs them and then sends queued
+# OTPs over one SMTP connection per batch. A failed send leaves its batch
+# queued for the next run.
+import csv
+import io
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from skill_swap_api.parallel import chunked, init_worker
+from . import geo
+from .models import QueuedOTPEmail, User, UserImport
+from .utils import generate_otp, send_otp_emails
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+MAX_ERRORS = 100
+
+
+def import_users(fileobj, workers=1, chunk_size=1000, send_emails=True):
+    """Create users from a CSV text stream. Returns a summary dict."""
+    result = {'created': 0, 'existing': 0, 'duplicate': 0, 'invalid': 0, 'queued': 0, 'errors': []}
+    existing = {email.lower() for email in User.objects.values_list('email', flat=True).iterator(chunk_size=10000)}
+    in_file = set()
+    rows = enumerate(csv.DictReader(fileobj), start=2)
+
+    if workers > 1:
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    else:
+        pool = nullcontext()
+    with pool:
+        for chunk in chunked(rows, chunk_size):
+            users = _prepare(chunk, existing, in_file, result)
+            _hash_passwords(users, pool if workers > 1 else None, workers)
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=chunk_size, ignore_conflicts=True)
+                # A concurrent signup can win a race for an email; only count what landed.
+                created = set(User.objects.filter(id__in=[user.id for user in users]).values_list('id', flat=True))
+                if send_emails:
+                    QueuedOTPEmail.objects.bulk_create([QueuedOTPEmail(user_id=user_id) for user_id in created])
+                    result['queued'] += len(created)
+            result['created'] += len(created)
+            result['existing'] += len(users) - len(created)
+    return result
+
+
+def claim_next():
+    """Mark the oldest pending (or abandoned running) import as running and return it, or None."""
+    stale = timezone.now() - timedelta(minutes=settings.USER_IMPORT_RECLAIM_MINUTES)
+    with transaction.atomic():
+        job = (UserImport.objects.select_for_update(skip_locked=True)
+               .filter(Q(status=UserImport.PENDING) | Q(status=UserImport.RUNNING, started_at__lt=stale))
+               .order_by('created_at').first())
+        if job is not None:
+            job.status = UserImport.RUNNING
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'started_at'])
+        return job
+
+
+def run(job, workers=1):
+    try:
+        job.result = import_users(io.StringIO(job.source, newline=''), workers, send_emails=job.send_emails)
+        job.status = UserImport.DONE
+        job.source = ''
+    except Exception as exc:
+        job.status = UserImport.FAILED
+        job.error = repr(exc)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def send_queued_otps(batch_size=100):
+    """Email queued OTPs that are still valid. Returns the number sent."""
+    sent = 0
+    while True:
+        with transaction.atomic():
+            batch = list(QueuedOTPEmail.objects.select_for_update(skip_locked=True)
+                         .select_related('user').order_by('created_at')[:batch_size])
+            if not batch:
+                return sent
+            now = timezone.now()
+            sent += send_otp_emails([
+                (row.user.email, row.user.verification_token) for row in batch
+                if not row.user.email_verified and row.user.verification_token
+                and row.user.verification_token_expires and row.user.verification_token_expires > now
+            ], batch_size)
+            QueuedOTPEmail.objects.filter(pk__in=[row.pk for row in batch]).delete()
+
+
+def _prepare(chunk, existing, in_file, result):
+    users = []
+    expires = timezone.now() + timedelta(hours=settings.USER_IMPORT_OTP_TTL_HOURS)
+    for line, row in chunk:
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        email = User.objects.normalize_email(row.get('email', ''))
+        try:
+            validate_email(email)
+        except ValidationError:
+            result['invalid'] += 1
+            if len(result['errors']) < MAX_ERRORS:
+                result['errors'].append({'line': line, 'error': f'Invalid email {email!r}.'})
+            continue
+        key = email.lower()
+        if key in existing or key in in_file:
+            result['existing' if key in existing else 'duplicate'] += 1
+            continue
+        in_file.add(key)
+        user = User(
+            id=uuid.uuid4(), email=email, name=row.get('name') or email.split('@')[0],
+            location=row.get('location') or None, bio=row.get('bio') or None,
+            is_public=row.get('is_public', 'true').lower() in TRUE_VALUES,
+            verification_token=generate_otp(), verification_token_expires=expires,
+        )
+        user.password = row.get('password') or None
+        geo.apply_location(user)
+        users.append(user)
+    return users
+
+
+def _hash_passwords(users, pool, workers):
+    # Users without a password get an unusable one and must reset it.
+    indexes = [i for i, user in enumerate(users) if user.password]
+    passwords = [users[i].password for i in indexes]
+    if pool is not None and passwords:
+        hashes = pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+    else:
+        hashes = map(make_password, passwords)
+    for i, hashed in zip(indexes, hashes):
+        users[i].password = hashed
+    for user in users:
+        if not user.password:
+            user.password = make_password(None)
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from skill_swap_api.parallel import chunked, init_worker
+from user import geo
+from user.models import User
+
+GEO_FIELDS = ['latitude', 'longitude', 'geohash']
+
+
+def _geocode_batch(user_ids):
+    users = list(User.objects.filter(id__in=user_ids).only('id', 'location', *GEO_FIELDS))
+    resolved = 0
+    for user in users:
+        geo.apply_location(user)
+        resolved += user.geohash is not None
+    User.objects.bulk_update(users, GEO_FIELDS)
+    return len(users), resolved
+
+
+class Command(BaseCommand):
+    help = 'Geocode User.location into coordinates and geohash for existing rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--all', action='store_true', help='Re-geocode rows that already have coordinates.')
+
+    def handle(self, *args, **options):
+        queryset = User.objects.exclude(location__isnull=True).exclude(location='')
+        if not options['all']:
+            queryset = queryset.filter(geohash__isnull=True)
+        user_ids = queryset.order_by('id').values_list('id', flat=True).iterator(chunk_size=options['batch_size'])
+        batches = chunked(user_ids, options['batch_size'])
+
+        total = resolved = 0
+        if options['workers'] > 1:
+            # Materialise the id list before forking so workers never share the cursor.
+            batches = list(batches)
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+                results = pool.map(_geocode_batch, batches)
+                for done, found in results:
+                    total += done
+                    resolved += found
+        else:
+            for batch in batches:
+                done, found = _geocode_batch(batch)
+                total += done
+                resolved += found
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {resolved} of {total} users.'))
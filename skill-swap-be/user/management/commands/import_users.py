@@ -0,0 +1,26 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from user.imports import import_users, send_queued_otps
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create users from a CSV file (email,name,password,location,bio,is_public).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes used for password hashing.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-email', action='store_true', help='Do not send verification OTPs.')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='', encoding='utf-8-sig') as f:
+            result = import_users(f, options['workers'], options['chunk_size'], not options['no_email'])
+        sent = send_queued_otps()
+        for error in result['errors']:
+            self.stderr.write(f'line {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            'Created {created} users; skipped {existing} existing, {duplicate} repeated and {invalid} invalid rows; '
+            'sent {sent} verification emails.'.format(sent=sent, **result)
+        ))
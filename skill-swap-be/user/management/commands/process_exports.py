@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user import exports
+from user.models import DataExport
+
+
+class Command(BaseCommand):
+    help = 'Build pending data export bundles and delete expired ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-jobs', type=int, default=None, help='Stop after this many exports.')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking again every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            built = 0
+            while options['max_jobs'] is None or built < options['max_jobs']:
+                export = exports.claim_next()
+                if export is None:
+                    break
+                export = exports.build(export)
+                built += 1
+                if export.status == DataExport.READY:
+                    self.stdout.write(f'Export {export.id} ready ({export.size} bytes).')
+                else:
+                    self.stderr.write(f'Export {export.id} failed: {export.error}')
+            purged = exports.purge_expired()
+            self.stdout.write(self.style.SUCCESS(f'Built {built} exports, purged {purged} expired.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
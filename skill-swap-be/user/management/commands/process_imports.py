@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from user import imports
+from user.models import UserImport
+
+
+class Command(BaseCommand):
+    help = 'Run queued user imports and send queued verification OTPs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.USER_IMPORT_WORKERS, help='Processes used for password hashing.')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Stop after this many imports.')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking again every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            ran = 0
+            while options['max_jobs'] is None or ran < options['max_jobs']:
+                job = imports.claim_next()
+                if job is None:
+                    break
+                job = imports.run(job, options['workers'])
+                ran += 1
+                if job.status == UserImport.DONE:
+                    self.stdout.write(f'Import {job.id}: created {job.result["created"]} users.')
+                else:
+                    self.stderr.write(f'Import {job.id} failed: {job.error}')
+            try:
+                sent = imports.send_queued_otps()
+            except Exception as exc:
+                # Left queued; retried on the next run.
+                sent = 0
+                self.stderr.write(f'Sending OTPs failed: {exc!r}')
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} imports, sent {sent} verification emails.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from skill_swap_api.parallel import chunked, init_worker
+from user import photos
+from user.models import User
+
+FIELDS = ['id', 'profile_photo', 'profile_photo_variants']
+
+
+class Command(BaseCommand):
+    help = 'Build resized WebP derivatives of profile photos (new uploads, or all with --all).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Photos downloaded and held in memory at once.')
+        parser.add_argument('--workers', type=int, default=1, help='Number of decoding processes.')
+        parser.add_argument('--all', action='store_true', help='Rebuild every photo, e.g. after changing PROFILE_PHOTO_SIZES.')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking for uploads every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        if photos.Image is None:
+            raise CommandError('process_photos needs Pillow (pip install Pillow).')
+        if options['workers'] > 1:
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+        else:
+            pool = nullcontext()
+        with pool:
+            rebuild = options['all']
+            while True:
+                queryset = photos.with_photo() if rebuild else photos.pending()
+                # Ids first, so rows updated by a batch never shift the next one.
+                user_ids = list(queryset.order_by('id').values_list('id', flat=True))
+                done = failed = 0
+                for batch in chunked(user_ids, options['batch_size']):
+                    users = User.objects.filter(id__in=batch).only(*FIELDS)
+                    ok, bad = photos.process(users, pool if options['workers'] > 1 else None)
+                    done += ok
+                    failed += bad
+                if user_ids or not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(f'Processed {done} photos, {failed} failed.'))
+                if not options['loop']:
+                    break
+                rebuild = False
+                time.sleep(options['interval'])
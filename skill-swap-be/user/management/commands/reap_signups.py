@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user import reaper
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned unverified signups and clear expired email verification OTPs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per statement.')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Per pass; stop early and leave the rest for the next run.')
+        parser.add_argument('--loop', action='store_true', help='Keep running, every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=3600)
+
+    def handle(self, *args, **options):
+        while True:
+            deleted, cleared = reaper.reap(options['batch_size'], options['pause'], options['max_batches'])
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unverified users, cleared {cleared} expired OTPs.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:54
+
+from django.db import migrations, models
+
+
+def revoke_banned_users(apps, schema_editor):
+    User = apps.get_model('user', 'User')
+    Revocation = apps.get_model('user', 'Revocation')
+    Revocation.objects.bulk_create([
+        Revocation(kind='user', value=str(user_id))
+        for user_id in User.objects.filter(is_banned=True).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_dataexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('value', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'value'), name='unique_revocation')],
+            },
+        ),
+        migrations.RunPython(revoke_banned_users, migrations.RunPython.noop),
+    ]
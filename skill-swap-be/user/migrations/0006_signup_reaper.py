@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0005_profile_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='date_joined',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('verification_token_expires__isnull', False)), fields=['verification_token_expires'], name='user_otp_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('email_verified', False)), fields=['date_joined'], name='user_unverified_joined_idx'),
+        ),
+    ]
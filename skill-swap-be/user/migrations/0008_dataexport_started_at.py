@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_import_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataexport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0008_dataexport_started_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('email_verified', True), ('is_active', True), ('is_banned', False), ('is_public', True)), fields=['name', 'id'], name='user_directory_idx'),
+        ),
+    ]
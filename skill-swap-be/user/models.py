@@ -3,6 +3,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 import uuid
 from django.utils import timezone
+from . import geo
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -26,7 +27,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     password = models.CharField(max_length=128)
     name = models.CharField(max_length=255)
     location = models.CharField(max_length=255, null=True, blank=True)
+    # Resolved from location at write time (see user.geo)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, db_index=True)
     profile_photo = models.URLField(null=True, blank=True)
+    # Resized WebP copies of profile_photo, built by process_photos (see user.photos)
+    profile_photo_variants = models.JSONField(default=dict, blank=True)
     bio = models.TextField(null=True, blank=True)
     # Structured availability: list of time slots [{"day": "Monday", "start": "18:00", "end": "20:00"}, ...]
     availability = models.JSONField(default=list, blank=True)
@@ -38,12 +45,110 @@ class User(AbstractBaseUser, PermissionsMixin):
     verification_token = models.CharField(max_length=128, null=True, blank=True)
     verification_token_expires = models.DateTimeField(null=True, blank=True)
     is_staff = models.BooleanField(default=False)
+    date_joined = models.DateTimeField(default=timezone.now)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name']
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Partial indexes for user.reaper, covering only the rows it looks for.
+            models.Index(fields=['verification_token_expires'], name='user_otp_expiry_idx',
+                         condition=models.Q(verification_token_expires__isnull=False)),
+            models.Index(fields=['date_joined'], name='user_unverified_joined_idx',
+                         condition=models.Q(email_verified=False)),
+            # Keyset paging for the directory (name, id), over listed users only.
+            models.Index(fields=['name', 'id'], name='user_directory_idx',
+                         condition=models.Q(is_public=True, is_banned=False, is_active=True, email_verified=True)),
+        ]
+
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'location' in update_fields:
+            geo.apply_location(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude', 'geohash'}
+        super().save(*args, **kwargs)
 # Create your models here.
+
+
+class DataExport(models.Model):
+    # A zip of NDJSON files with everything stored about `user`, built by process_exports.
+    PENDING = 'pending'
+    RUNNING = 'running'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_exports')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, default=PENDING)
+    # 'local' (path under DATA_EXPORT_DIR) or 's3' (object key)
+    storage = models.CharField(max_length=10, blank=True)
+    location = models.CharField(max_length=500, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='data_export_queue_idx'),
+        ]
+
+
+class UserImport(models.Model):
+    # A CSV of users to create, queued by the admin import endpoint and run by process_imports.
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, default=PENDING)
+    send_emails = models.BooleanField(default=True)
+    # The decoded upload; cleared once imported
+    source = models.TextField(blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='user_import_queue_idx'),
+        ]
+
+
+class QueuedOTPEmail(models.Model):
+    # A verification OTP still to be emailed, sent by process_imports; the OTP
+    # itself is read from the user when sending.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+
+class Revocation(models.Model):
+    # Banned users and revoked JWTs, mirrored in memory by user.revocation.
+    USER = 'user'
+    TOKEN = 'token'
+
+    kind = models.CharField(max_length=10)
+    # User id for USER, token jti for TOKEN
+    value = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When the revoked token would have expired anyway; null for bans
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'value'], name='unique_revocation'),
+        ]
@@ -0,0 +1,206 @@
+# Profile photos: derivatives and the URLs they are served from.
+#
+# Derivatives. An upload is stored as-is and User.profile_photo_variants is
+# reset to a fresh upload token (queued()); process_photos (run with --loop as a worker, or once as a
+# backfill) picks such users up. Originals are downloaded in the main process
+# and decoded once per photo in a process pool (render_variants), with EXIF
+# orientation applied and all metadata dropped, then cropped square to each of
+# PROFILE_PHOTO_SIZES and encoded as WebP. Results are stored next to the
+# original under keys derived from its key and content hash, so they never
+# change once written:
+#
+#     profile_photos/<user>_me.jpg -> profile_photos/<user>_me.<digest>.96.webp
+#
+# profile_photo_variants then holds {'source': original key, 'sizes': {'96': key, ...}}
+# (or 'error' instead of 'sizes' for images that cannot be decoded). Entries
+# whose source is not the current photo are ignored. A result is only written
+# if the variants still hold what the worker read, so a re-upload under the
+# same key (which gets a new token) is never overwritten by the old photo's. Pillow is optional and
+# only needed by the worker.
+#
+# URLs. With PROFILE_PHOTO_CDN_DOMAIN set (a CDN or bucket policy allowing
+# public reads of profile_photos/), URLs are built from the object key and
+# nothing is signed. Otherwise each key gets a presigned S3 URL from the shared
+# client. Signing is local work, but a page of avatars would still pay for it
+# per user on every view, so photo_urls() handles a whole page at once: one
+# cache get_many() for URLs signed recently, one signing pass over the rest,
+# one set_many(). Cached URLs are reused for half their lifetime, which also
+# keeps them stable long enough for browsers to cache the images.
+import hashlib
+import io
+import posixpath
+import uuid
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+from .utils import get_s3_client, s3_key_from_url
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+WEBP = 'image/webp'
+# Derivative keys include a content hash, so they can be cached forever.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _cache_key(key):
+    # Object keys come from upload filenames; hash them into safe cache keys.
+    return 'photo-url:' + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _urls(keys, expires_in=None):
+    """{object key: URL to serve} for a set of keys."""
+    if not keys:
+        return {}
+    if settings.PROFILE_PHOTO_CDN_DOMAIN:
+        return {key: f'https://{settings.PROFILE_PHOTO_CDN_DOMAIN}/{key}' for key in keys}
+
+    expires_in = expires_in or settings.PROFILE_PHOTO_URL_TTL
+    cached = cache.get_many([_cache_key(key) for key in keys])
+    urls, signed = {}, {}
+    client = None
+    for key in keys:
+        url = cached.get(_cache_key(key))
+        if url is None:
+            client = client or get_s3_client()
+            url = client.generate_presigned_url('get_object',
+                Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': key},
+                ExpiresIn=expires_in)
+            signed[_cache_key(key)] = url
+        urls[key] = url
+    if signed:
+        cache.set_many(signed, expires_in // 2)
+    return urls
+
+
+def variant_keys(user):
+    """{size: key} of the current photo's derivatives, empty while they are pending."""
+    if not user.profile_photo:
+        return {}
+    variants = user.profile_photo_variants or {}
+    if variants.get('source') != s3_key_from_url(user.profile_photo):
+        return {}
+    return {int(size): key for size, key in variants.get('sizes', {}).items()}
+
+
+def photo_key(user, size=None):
+    """Key of the smallest derivative at least `size` px, else the largest one, else the original."""
+    if not user.profile_photo:
+        return None
+    sizes = variant_keys(user)
+    if size is None or not sizes:
+        return s3_key_from_url(user.profile_photo)
+    fitting = [candidate for candidate in sorted(sizes) if candidate >= size]
+    return sizes[fitting[0] if fitting else max(sizes)]
+
+
+def photo_urls(users, size=None):
+    """{user pk: photo URL} for users with a photo, signing the whole batch at once."""
+    keys = {user.pk: photo_key(user, size) for user in users}
+    urls = _urls({key for key in keys.values() if key})
+    return {pk: urls[key] for pk, key in keys.items() if key}
+
+
+def photo_url(user, size=None):
+    return photo_urls([user], size).get(user.pk)
+
+
+def variant_urls(user):
+    """{'48': URL, ...} for the current photo's derivatives."""
+    sizes = variant_keys(user)
+    urls = _urls(set(sizes.values()))
+    return {str(size): urls[key] for size, key in sorted(sizes.items())}
+
+
+def derivative_key(source, digest, size):
+    stem, _ = posixpath.splitext(source)
+    return f'{stem}.{digest}.{size}.webp'
+
+
+def render_variants(data, sizes, quality):
+    """{size: WebP bytes} for an encoded image. Runs in a worker process."""
+    with Image.open(io.BytesIO(data)) as image:
+        largest = max(sizes)
+        # Lets the JPEG decoder downscale by up to 8x while decoding.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        # Crop once at the largest size and shrink from there.
+        base = ImageOps.fit(image, (largest, largest), Image.LANCZOS)
+    rendered = {}
+    for size in sorted(sizes, reverse=True):
+        out = io.BytesIO()
+        # Nothing from the source's info (EXIF, ICC, XMP) is passed on.
+        base.resize((size, size), Image.LANCZOS).save(out, 'WEBP', quality=quality, method=4)
+        rendered[size] = out.getvalue()
+    return rendered
+
+
+def with_photo():
+    return User.objects.exclude(profile_photo__isnull=True).exclude(profile_photo='')
+
+
+def queued():
+    """profile_photo_variants for a new upload."""
+    return {'upload': uuid.uuid4().hex}
+
+
+def pending():
+    """Users whose current photo has no derivatives yet."""
+    return with_photo().exclude(profile_photo_variants__has_key='source')
+
+
+def _submit(pool, *args):
+    if pool is not None:
+        return pool.submit(render_variants, *args)
+    future = Future()
+    try:
+        future.set_result(render_variants(*args))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def process(users, pool=None, sizes=None, quality=None):
+    """Build and store derivatives for users. Returns (done, failed)."""
+    sizes = tuple(sizes or settings.PROFILE_PHOTO_SIZES)
+    quality = quality or settings.PROFILE_PHOTO_QUALITY
+    client = get_s3_client()
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    jobs = []
+    for user in users:
+        source = s3_key_from_url(user.profile_photo)
+        try:
+            data = client.get_object(Bucket=bucket, Key=source)['Body'].read()
+        except Exception as exc:
+            future = Future()
+            future.set_exception(exc)
+            jobs.append((user, source, b'', future))
+            continue
+        jobs.append((user, source, data, _submit(pool, data, sizes, quality)))
+
+    done = failed = 0
+    for user, source, data, job in jobs:
+        try:
+            rendered = job.result()
+        except Exception as exc:
+            variants = {'source': source, 'error': repr(exc)[:500]}
+            failed += 1
+        else:
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            keys = {}
+            for size, body in rendered.items():
+                keys[str(size)] = derivative_key(source, digest, size)
+                client.put_object(Bucket=bucket, Key=keys[str(size)], Body=body, ContentType=WEBP, CacheControl=IMMUTABLE)
+            variants = {'source': source, 'sizes': keys}
+            done += 1
+        # Skipped if the photo was replaced meanwhile; the new upload is pending again.
+        User.objects.filter(pk=user.pk, profile_photo=user.profile_photo,
+                            profile_photo_variants=user.profile_photo_variants).update(profile_photo_variants=variants)
+    return done, failed
+
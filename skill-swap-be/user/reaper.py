@@ -0,0 +1,63 @@
+# Cleanup of expired signup OTPs and abandoned signups.
+#
+# Two passes, each in batches of at most batch_size rows with a pause between
+# them, so every statement touches a bounded set of rows by primary key and
+# no lock on the user table is held for long:
+#
+# - unverified accounts older than UNVERIFIED_USER_TTL_DAYS that never logged
+#   in are deleted (with their rows in other tables, by cascade);
+# - expired OTPs on the remaining users are cleared.
+#
+# Each batch is found through a partial index (user_unverified_joined_idx,
+# user_otp_expiry_idx) and re-checks its conditions when it writes, so a user
+# who verifies or asks for a new OTP meanwhile is left alone. Staff accounts
+# are never deleted.
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import User
+
+
+def stale_signups(now=None):
+    now = now or timezone.now()
+    return User.objects.filter(
+        email_verified=False, date_joined__lt=now - timedelta(days=settings.UNVERIFIED_USER_TTL_DAYS),
+        last_login__isnull=True, is_staff=False, is_superuser=False,
+    )
+
+
+def expired_tokens(now=None):
+    return User.objects.filter(verification_token_expires__lt=now or timezone.now())
+
+
+def _batches(queryset, write, batch_size, pause, max_batches):
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += write(queryset.filter(id__in=ids))
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return total
+
+
+def reap(batch_size=500, pause=0.1, max_batches=None):
+    """Delete stale signups, then clear expired OTPs. Returns (users deleted, tokens cleared)."""
+    now = timezone.now()
+    deleted = _batches(
+        stale_signups(now),
+        lambda batch: batch.delete()[1].get(User._meta.label, 0),
+        batch_size, pause, max_batches,
+    )
+    cleared = _batches(
+        expired_tokens(now),
+        lambda batch: batch.update(verification_token=None, verification_token_expires=None),
+        batch_size, pause, max_batches,
+    )
+    return deleted, cleared
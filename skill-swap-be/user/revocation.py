@@ -0,0 +1,123 @@
+# Banned users and revoked tokens, checked on every authenticated request.
+#
+# The source of truth is the Revocation table (one row per banned user or
+# revoked token jti). Each worker keeps an in-memory snapshot: a Bloom filter
+# that answers "definitely not revoked" for almost every request with a few
+# bit probes, backed by the exact set to rule out false positives. Writers bump
+# a version in the shared cache; workers compare it at most every
+# REVOCATION_CHECK_SECONDS and reload the (small) table when it moved, so a
+# ban reaches every worker within that window without a per-request query.
+#
+# With the default per-process cache backend the version only propagates
+# within a process; use a shared CACHE_URL when running several workers.
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from skill_swap_api import cache
+from .models import Revocation
+
+NAMESPACE = 'revocations'
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: position_i = h1 + i * h2.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class _Snapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.bloom = BloomFilter(0)
+        self.exact = frozenset()
+
+    def load(self, version):
+        keys = frozenset(
+            f'{kind}:{value}' for kind, value in Revocation.objects
+            .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+            .values_list('kind', 'value').iterator()
+        )
+        bloom = BloomFilter(len(keys) * 2)
+        for key in keys:
+            bloom.add(key)
+        self.bloom, self.exact, self.version = bloom, keys, version
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < settings.REVOCATION_CHECK_SECONDS:
+            return
+        with self.lock:
+            if now - self.checked_at < settings.REVOCATION_CHECK_SECONDS:
+                return
+            version = cache.version(NAMESPACE)
+            if version != self.version:
+                self.load(version)
+            self.checked_at = now
+
+    def expire(self):
+        self.checked_at = 0.0
+
+    def __contains__(self, key):
+        self.refresh()
+        return key in self.bloom and key in self.exact
+
+
+_snapshot = _Snapshot()
+
+
+def is_revoked(token):
+    """True if the token's jti was revoked or its user is banned."""
+    return (f'{Revocation.TOKEN}:{token.get(api_settings.JTI_CLAIM)}' in _snapshot
+            or f'{Revocation.USER}:{token.get(api_settings.USER_ID_CLAIM)}' in _snapshot)
+
+
+def _changed():
+    cache.invalidate(NAMESPACE)
+    # This worker picks the change up on its next check rather than after REVOCATION_CHECK_SECONDS.
+    _snapshot.expire()
+    transaction.on_commit(_snapshot.expire)
+
+
+def revoke_token(token):
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    Revocation.objects.get_or_create(kind=Revocation.TOKEN, value=str(token['jti']), defaults={'expires_at': expires_at})
+    # Rows for tokens that have expired anyway can go.
+    Revocation.objects.filter(expires_at__lt=timezone.now()).delete()
+    _changed()
+
+
+def ban(user_id):
+    Revocation.objects.get_or_create(kind=Revocation.USER, value=str(user_id))
+    _changed()
+
+
+def unban(user_id):
+    Revocation.objects.filter(kind=Revocation.USER, value=str(user_id)).delete()
+    _changed()
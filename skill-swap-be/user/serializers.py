@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import User
+from skill_swap_api.expansion import ExpandableFieldsMixin
+from swap.models import Skill
+from .models import User, DataExport
 import uuid
 
 class UserSignupSerializer(serializers.ModelSerializer):
@@ -15,6 +17,40 @@ class UserSignupSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(password=password, **validated_data)
         return user
 
+class UserSummarySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    # What other users may see of someone, e.g. when a swap or skill is expanded.
+    class Meta:
+        model = User
+        fields = ['id', 'name', 'location', 'profile_photo', 'is_public']
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if instance.is_public or (request is not None and request.user.pk == instance.pk):
+            return data
+        # Private users are only identified, as PublicProfileView and the directory hide them.
+        return {'id': data['id']} if 'id' in data else {}
+
+class DirectorySkillSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Skill
+        fields = ['id', 'name', 'category', 'level', 'type']
+        read_only_fields = fields
+
+class DirectoryUserSerializer(serializers.ModelSerializer):
+    # Expects skills prefetched into directory_skills and a photo_urls map in the context.
+    skills = DirectorySkillSerializer(source='directory_skills', many=True, read_only=True)
+    profile_photo_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'name', 'location', 'bio', 'skills', 'profile_photo_url']
+        read_only_fields = fields
+
+    def get_profile_photo_url(self, user):
+        return self.context['photo_urls'].get(user.pk)
+
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
@@ -22,3 +58,12 @@ class UserLoginSerializer(serializers.Serializer):
 class EmailVerificationSerializer(serializers.Serializer):
     email = serializers.EmailField()
     otp = serializers.CharField()
+
+class ResendOTPSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+
+class DataExportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DataExport
+        fields = ['id', 'user', 'status', 'size', 'error', 'created_at', 'finished_at', 'expires_at']
+        read_only_fields = fields
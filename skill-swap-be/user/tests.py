@@ -3,6 +3,22 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.core import mail
+from .models import DataExport, User
+from . import exports, geo, photos, utils
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from django.core.cache import cache
+from swap.models import Skill, Swap, Rating
+from django.core.management import call_command
+from io import StringIO
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from unittest import mock, skipUnless
+from datetime import timedelta
+from django.utils import timezone
 
 class UserAPITests(APITestCase):
     def test_signup_and_email_verification(self):
@@ -54,3 +70,263 @@ class UserAPITests(APITestCase):
 from django.test import TestCase
 
 # Create your tests here.
+
+
+class GeoTests(APITestCase):
+    def test_geocode_aliases_and_suffixes(self):
+        self.assertEqual(geo.geocode('Bangalore, India')[2], 'Bengaluru')
+        self.assertEqual(geo.geocode('  NYC ')[2], 'New York')
+        self.assertIsNone(geo.geocode('Atlantis'))
+
+    def test_location_is_resolved_on_save(self):
+        user = User.objects.create_user(email='geo@example.com', password='GeoPass123', name='Geo', location='Pune')
+        self.assertEqual(user.geohash, geo.encode(18.5204, 73.8567))
+        user.location = 'Atlantis'
+        user.save(update_fields=['location'])
+        user.refresh_from_db()
+        self.assertIsNone(user.geohash)
+
+    def test_covering_cells_contain_nearby_points(self):
+        cells = geo.covering_cells(19.0760, 72.8777, 150)
+        pune = geo.encode(18.5204, 73.8567)
+        self.assertTrue(any(pune.startswith(cell) for cell in cells))
+
+
+class PublicProfileTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_is_cached_and_invalidated(self):
+        user = User.objects.create_user(email='alice@example.com', password='Password123', name='Alice', bio='Hi')
+        url = reverse('user-public-profile', args=[user.id])
+        self.assertEqual(self.client.get(url).data['bio'], 'Hi')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['skills'], [])
+
+        Skill.objects.create(user=user, name='Python', description='', category='Programming', level='Expert', type='offer')
+        self.assertEqual(len(self.client.get(url).data['skills']), 1)
+
+        user.is_public = False
+        user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LazyIntegrationTests(APITestCase):
+    @override_settings(AWS_ACCESS_KEY_ID='', AWS_SECRET_ACCESS_KEY='secret', AWS_S3_REGION_NAME='us-east-1', AWS_STORAGE_BUCKET_NAME='')
+    def test_missing_s3_settings_fail_on_first_use(self):
+        utils.get_s3_client.cache_clear()
+        with self.assertRaisesMessage(ImproperlyConfigured, 'AWS_ACCESS_KEY_ID, AWS_STORAGE_BUCKET_NAME'):
+            utils.get_s3_client()
+
+
+class DataExportTests(APITestCase):
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir)
+
+    def test_export_is_built_and_downloaded(self):
+        alice = User.objects.create_user(email='alice@example.com', password='Password123', name='Alice')
+        bob = User.objects.create_user(email='bob@example.com', password='Password123', name='Bob')
+        skill = Skill.objects.create(user=alice, name='Python', description='', category='Programming', level='Expert', type='offer')
+        swap = Swap.objects.create(requester=bob, receiver=alice, requester_skill=skill, receiver_skill=skill, status='completed')
+        Rating.objects.create(swap=swap, rater=bob, rated=alice, rating=5, comment='Great')
+
+        self.client.force_authenticate(user=alice)
+        response = self.client.post(reverse('data-export-list'))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        export_id = response.data['id']
+        self.assertEqual(self.client.get(reverse('data-export-download', args=[export_id])).status_code, status.HTTP_409_CONFLICT)
+
+        with override_settings(DATA_EXPORT_DIR=self.export_dir, DATA_EXPORT_STORAGE='local'):
+            call_command('process_exports', stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('data-export-detail', args=[export_id])).data['status'], 'ready')
+
+        response = self.client.get(reverse('data-export-download', args=[export_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as bundle:
+            profile = json.loads(bundle.read('profile.ndjson'))
+            self.assertEqual(profile['email'], 'alice@example.com')
+            self.assertNotIn('password', profile)
+            swaps = bundle.read('swaps.ndjson').decode().splitlines()
+            self.assertEqual(json.loads(swaps[0])['id'], str(swap.id))
+            self.assertEqual(len(bundle.read('ratings_received.ndjson').decode().splitlines()), 1)
+            self.assertEqual(bundle.read('ratings_given.ndjson'), b'')
+
+        self.client.force_authenticate(user=bob)
+        self.assertEqual(self.client.get(reverse('data-export-download', args=[export_id])).status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_staff_export_rejects_malformed_user_id(self):
+        admin = User.objects.create_user(email='admin@example.com', password='Password123', name='Admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(reverse('data-export-list'), {'user_id': 'not-a-uuid'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DataExport.objects.exists())
+
+    def test_abandoned_running_export_is_reclaimed(self):
+        alice = User.objects.create_user(email='alice@example.com', password='Password123', name='Alice')
+        crashed = DataExport.objects.create(user=alice, status=DataExport.RUNNING, started_at=timezone.now() - timedelta(hours=2))
+        DataExport.objects.create(user=alice, status=DataExport.RUNNING, started_at=timezone.now())
+        self.assertEqual(exports.claim_next().id, crashed.id)
+        self.assertIsNone(exports.claim_next())
+
+@override_settings(AWS_ACCESS_KEY_ID='key', AWS_SECRET_ACCESS_KEY='secret', AWS_STORAGE_BUCKET_NAME='bucket',
+                   AWS_S3_REGION_NAME='ap-south-1', AWS_S3_ENDPOINT_URL=None, AWS_S3_CUSTOM_DOMAIN='bucket.s3.amazonaws.com')
+class UserDirectoryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        utils.get_s3_client.cache_clear()
+        self.addCleanup(utils.get_s3_client.cache_clear)
+        for index in range(3):
+            user = User.objects.create_user(email=f'user{index}@example.com', password='Password123', name=f'User {index}', email_verified=True,
+                                            profile_photo=f'https://bucket.s3.amazonaws.com/profile_photos/{index}.png')
+            Skill.objects.create(user=user, name='Python', description='', category='Programming', level='Expert', type='offer')
+            Skill.objects.create(user=user, name='Spam', description='', category='Other', level='Beginner', type='offer', status='rejected')
+        User.objects.create_user(email='private@example.com', password='Password123', name='Private', is_public=False)
+        User.objects.create_user(email='banned@example.com', password='Password123', name='Banned', is_banned=True)
+        User.objects.create_user(email='unverified@example.com', password='Password123', name='Unverified')
+
+    @override_settings(PROFILE_PHOTO_CDN_DOMAIN='cdn.example.com')
+    def test_directory_lists_public_users_with_skills(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user-directory'), {'page_size': 2})
+        self.assertEqual([card['name'] for card in response.data['results']], ['User 0', 'User 1'])
+        card = response.data['results'][0]
+        self.assertEqual([skill['name'] for skill in card['skills']], ['Python'])
+        self.assertEqual(card['profile_photo_url'], 'https://cdn.example.com/profile_photos/0.png')
+        rest = self.client.get(response.data['next']).data['results']
+        self.assertEqual([card['name'] for card in rest], ['User 2'])
+
+    @override_settings(PROFILE_PHOTO_CDN_DOMAIN='')
+    def test_photo_urls_are_presigned_once_per_page(self):
+        first = self.client.get(reverse('user-directory')).data['results']
+        self.assertIn('profile_photos/0.png', first[0]['profile_photo_url'])
+        self.assertIn('Signature', first[0]['profile_photo_url'])
+        # Served from the cache until half their lifetime has passed.
+        second = self.client.get(reverse('user-directory')).data['results']
+        self.assertEqual([card['profile_photo_url'] for card in first], [card['profile_photo_url'] for card in second])
+
+
+@override_settings(PROFILE_PHOTO_CDN_DOMAIN='cdn.example.com', AWS_STORAGE_BUCKET_NAME='bucket',
+                   AWS_S3_ENDPOINT_URL=None, AWS_S3_CUSTOM_DOMAIN='bucket.s3.amazonaws.com')
+class ProfilePhotoVariantTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='alice@example.com', password='Password123', name='Alice', email_verified=True,
+                                             profile_photo='https://bucket.s3.amazonaws.com/profile_photos/a_me.jpg')
+
+    def test_pending_until_processed_then_sized_urls(self):
+        self.assertEqual(list(photos.pending()), [self.user])
+        self.user.profile_photo_variants = {'source': 'profile_photos/a_me.jpg', 'sizes': {
+            str(size): photos.derivative_key('profile_photos/a_me.jpg', 'abc', size) for size in (48, 96, 256)}}
+        self.user.save()
+        self.assertEqual(list(photos.pending()), [])
+
+        url = reverse('profile-photo-get', args=[self.user.id])
+        self.assertEqual(self.client.get(url, {'size': 64}).data['profile_photo_url'], 'https://cdn.example.com/profile_photos/a_me.abc.96.webp')
+        self.assertEqual(self.client.get(url, {'size': 1000}).data['profile_photo_url'], 'https://cdn.example.com/profile_photos/a_me.abc.256.webp')
+        self.assertEqual(self.client.get(url).data['profile_photo_url'], 'https://cdn.example.com/profile_photos/a_me.jpg')
+        card = self.client.get(reverse('user-directory')).data['results'][0]
+        self.assertEqual(card['profile_photo_url'], 'https://cdn.example.com/profile_photos/a_me.abc.96.webp')
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(list(self.client.get(reverse('user-profile')).data['profile_photo_sizes']), ['48', '96', '256'])
+
+        # Derivatives of a previous photo are not served for a new one.
+        self.user.profile_photo = 'https://bucket.s3.amazonaws.com/profile_photos/a_new.jpg'
+        self.user.save()
+        self.assertEqual(self.client.get(url, {'size': 64}).data['profile_photo_url'], 'https://cdn.example.com/profile_photos/a_new.jpg')
+
+    def test_reupload_under_the_same_key_stays_pending(self):
+        User.objects.filter(pk=self.user.pk).update(profile_photo_variants=photos.queued())
+        client = mock.Mock()
+        client.get_object.side_effect = lambda **kwargs: {'Body': io.BytesIO(b'not an image')}
+        with mock.patch.object(photos, 'get_s3_client', return_value=client):
+            # Read by the worker, then replaced by an upload with the same filename.
+            batch = list(photos.pending())
+            User.objects.filter(pk=self.user.pk).update(profile_photo_variants=photos.queued())
+            self.assertEqual(photos.process(batch), (0, 1))
+            self.assertEqual(list(photos.pending()), [self.user])
+
+            self.assertEqual(photos.process(photos.pending()), (0, 1))
+        self.assertEqual(list(photos.pending()), [])
+
+    @skipUnless(photos.Image, 'Pillow is not installed')
+    def test_render_variants_strips_metadata(self):
+        from PIL import Image
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        exif[0x010F] = 'Camera'
+        source = io.BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(source, 'JPEG', exif=exif)
+
+        rendered = photos.render_variants(source.getvalue(), (48, 96), 80)
+        self.assertEqual(sorted(rendered), [48, 96])
+        with Image.open(io.BytesIO(rendered[96])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (96, 96)))
+            self.assertNotIn('exif', image.info)
+
+
+class SignupReaperTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create(self, email, **fields):
+        return User.objects.create_user(email=email, password='Password123', name=email.split('@')[0], **fields)
+
+    def test_reaper_deletes_stale_signups_and_clears_expired_otps(self):
+        now = timezone.now()
+        stale = self.create('stale@example.com', date_joined=now - timedelta(days=30))
+        Skill.objects.create(user=stale, name='Python', description='', category='Programming', level='Expert', type='offer')
+        kept = [
+            self.create('verified@example.com', date_joined=now - timedelta(days=30), email_verified=True),
+            self.create('returning@example.com', date_joined=now - timedelta(days=30), last_login=now),
+            self.create('staff@example.com', date_joined=now - timedelta(days=30), is_staff=True),
+        ]
+        expired = self.create('expired@example.com', verification_token='123456', verification_token_expires=now - timedelta(minutes=1))
+        valid = self.create('valid@example.com', verification_token='654321', verification_token_expires=now + timedelta(minutes=5))
+
+        out = StringIO()
+        call_command('reap_signups', batch_size=1, pause=0, stdout=out)
+        self.assertIn('Deleted 1 unverified users, cleared 1 expired OTPs.', out.getvalue())
+        self.assertFalse(User.objects.filter(id=stale.id).exists())
+        self.assertFalse(Skill.objects.filter(user_id=stale.id).exists())
+        self.assertEqual(User.objects.filter(id__in=[user.id for user in kept]).count(), 3)
+        expired.refresh_from_db()
+        self.assertIsNone(expired.verification_token)
+        valid.refresh_from_db()
+        self.assertEqual(valid.verification_token, '654321')
+
+    @override_settings(OTP_RESEND_COOLDOWN_SECONDS=0)
+    def test_resend_reuses_valid_otp(self):
+        self.client.post(reverse('signup'), {'email': 'new@example.com', 'password': 'Password123', 'name': 'New'}, format='json')
+        otp = User.objects.get(email='new@example.com').verification_token
+        response = self.client.post(reverse('resend-otp'), {'email': 'new@example.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(User.objects.get(email='new@example.com').verification_token, otp)
+        self.assertTrue(mail.outbox[-1].body.endswith(otp))
+
+        User.objects.filter(email='new@example.com').update(verification_token_expires=timezone.now() + timedelta(seconds=30))
+        self.client.post(reverse('resend-otp'), {'email': 'new@example.com'}, format='json')
+        fresh = User.objects.get(email='new@example.com').verification_token_expires
+        self.assertGreater(fresh, timezone.now() + timedelta(minutes=5))
+
+    def test_resend_skips_recent_sends_and_is_throttled(self):
+        self.create('new@example.com')
+        resend = lambda email: self.client.post(reverse('resend-otp'), {'email': email}, format='json')
+        self.assertEqual(resend('new@example.com').data['message'], 'OTP sent.')
+        self.assertEqual(resend('new@example.com').data['message'], 'OTP already sent.')
+        self.assertEqual(len(mail.outbox), 1)
+
+        with override_settings(OTP_RESEND_COOLDOWN_SECONDS=0):
+            for _ in range(3):
+                self.assertEqual(resend('new@example.com').status_code, status.HTTP_200_OK)
+            self.assertEqual(resend('new@example.com').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(len(mail.outbox), 4)
+
+        for number in range(14):
+            resend(f'other{number}@example.com')
+        self.assertEqual(resend('last@example.com').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_verify_without_expiry_is_rejected(self):
+        self.create('legacy@example.com', verification_token='111111')
+        response = self.client.post(reverse('verify-email'), {'email': 'legacy@example.com', 'otp': '111111'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
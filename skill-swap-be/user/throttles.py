@@ -0,0 +1,15 @@
+# Rate limits for unauthenticated endpoints that send email.
+#
+# ScopedRateThrottle already limits by client IP; ResendOTPEmailThrottle adds a
+# limit per target address so one inbox cannot be flooded from many IPs.
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class ResendOTPEmailThrottle(SimpleRateThrottle):
+    scope = 'otp_resend_email'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
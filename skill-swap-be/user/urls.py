@@ -1,11 +1,19 @@
 from django.urls import path
-from .views import SignupView, LoginView, EmailVerifyView, ProfilePhotoUploadView, ProfilePhotoGetView, UserProfileView
+from .views import SignupView, LoginView, LogoutView, EmailVerifyView, ResendOTPView, ProfilePhotoUploadView, ProfilePhotoGetView, UserProfileView, PublicProfileView, UserDirectoryView, \
+    DataExportListCreateView, DataExportDetailView, DataExportDownloadView
 
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('verify-email/', EmailVerifyView.as_view(), name='verify-email'),
+    path('resend-otp/', ResendOTPView.as_view(), name='resend-otp'),
     path('profile-photo/', ProfilePhotoUploadView.as_view(), name='profile-photo-upload'),
     path('profile-photo/<uuid:user_id>/', ProfilePhotoGetView.as_view(), name='profile-photo-get'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
+    path('users/', UserDirectoryView.as_view(), name='user-directory'),
+    path('users/<uuid:user_id>/', PublicProfileView.as_view(), name='user-public-profile'),
+    path('exports/', DataExportListCreateView.as_view(), name='data-export-list'),
+    path('exports/<uuid:pk>/', DataExportDetailView.as_view(), name='data-export-detail'),
+    path('exports/<uuid:pk>/download/', DataExportDownloadView.as_view(), name='data-export-download'),
 ]
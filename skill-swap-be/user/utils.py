@@ -1,27 +1,80 @@
-import boto3
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import EmailMessage, get_connection, send_mail
+from functools import lru_cache
 import random
 import string
 
-def upload_to_s3(file, filename):
-    s3 = boto3.client('s3',
+S3_SETTINGS = ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_STORAGE_BUCKET_NAME', 'AWS_S3_REGION_NAME')
+SMTP_SETTINGS = ('EMAIL_HOST_USER', 'EMAIL_HOST_PASSWORD', 'DEFAULT_FROM_EMAIL')
+
+def require_settings(*names):
+    missing = [name for name in names if not getattr(settings, name, None)]
+    if missing:
+        raise ImproperlyConfigured(f'Missing settings: {", ".join(missing)}')
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    # boto3 takes a noticeable share of startup, so it is only imported once S3 is used.
+    # The client is thread-safe and reused for the life of the process.
+    require_settings(*S3_SETTINGS)
+    import boto3
+    return boto3.client('s3',
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME)
-    s3.upload_fileobj(file, settings.AWS_STORAGE_BUCKET_NAME, filename)
-    url = f'https://{settings.AWS_S3_CUSTOM_DOMAIN}/{filename}'
+        region_name=settings.AWS_S3_REGION_NAME,
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        use_ssl=settings.AWS_S3_USE_SSL)
+
+def s3_url(key):
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f'{settings.AWS_S3_ENDPOINT_URL.rstrip("/")}/{settings.AWS_STORAGE_BUCKET_NAME}/{key}'
+    return f'https://{settings.AWS_S3_CUSTOM_DOMAIN}/{key}'
+
+def s3_key_from_url(url):
+    for prefix in (f'/{settings.AWS_STORAGE_BUCKET_NAME}/', f'{settings.AWS_S3_CUSTOM_DOMAIN}/'):
+        if prefix in url:
+            return url.split(prefix, 1)[-1]
     return url
 
+def presigned_url(key, expires_in=3600):
+    return get_s3_client().generate_presigned_url('get_object',
+        Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': key},
+        ExpiresIn=expires_in)
+
+def upload_to_s3(file, filename):
+    get_s3_client().upload_fileobj(file, settings.AWS_STORAGE_BUCKET_NAME, filename)
+    return s3_url(filename)
+
+def _send(subject, message, recipients):
+    if settings.EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend':
+        require_settings(*SMTP_SETTINGS)
+    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipients)
+
+OTP_SUBJECT = 'Skill Swap Platform - Email Verification OTP'
+
 def send_otp_email(email, otp):
-    subject = 'Skill Swap Platform - Email Verification OTP'
     message = f'Your OTP for email verification is: {otp}'
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+    _send(OTP_SUBJECT, message, [email])
+
+def send_otp_emails(recipients, batch_size=100):
+    """Send OTPs for [(email, otp)], reusing one SMTP connection per batch."""
+    if settings.EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend':
+        require_settings(*SMTP_SETTINGS)
+    sent = 0
+    for start in range(0, len(recipients), batch_size):
+        messages = [
+            EmailMessage(OTP_SUBJECT, f'Your OTP for email verification is: {otp}', settings.DEFAULT_FROM_EMAIL, [email])
+            for email, otp in recipients[start:start + batch_size]
+        ]
+        with get_connection() as connection:
+            sent += connection.send_messages(messages) or 0
+    return sent
 
 def send_welcome_email(email, name):
     subject = 'Welcome to Skill Swap Platform!'
     message = f'Hi {name},\n\nWelcome to Skill Swap Platform! Start swapping your skills today.'
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+    _send(subject, message, [email])
 
 def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
@@ -1,16 +1,29 @@
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from django.contrib.auth import authenticate
-from .models import User
-from .serializers import UserSignupSerializer, UserLoginSerializer, EmailVerificationSerializer
-from .utils import send_otp_email, send_welcome_email, generate_otp, upload_to_s3
+from .models import User, DataExport
+from .serializers import UserSignupSerializer, UserLoginSerializer, EmailVerificationSerializer, DataExportSerializer, \
+    DirectoryUserSerializer, ResendOTPSerializer
+from .utils import send_otp_email, send_welcome_email, generate_otp, upload_to_s3, presigned_url
+from .photos import photo_url, photo_urls, queued, variant_urls
+from django.conf import settings
+from django.core.cache import cache as django_cache
 from django.utils import timezone
+from django.db.models import Count, Prefetch, Q, Sum
+from rest_framework.pagination import CursorPagination
+from swap.models import Rating, Skill
+from skill_swap_api import cache, sharding
 import datetime
 import uuid
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from . import revocation
+from .throttles import ResendOTPEmailThrottle
 
 class ProfilePhotoUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
@@ -22,9 +35,10 @@ class ProfilePhotoUploadView(APIView):
         if not file:
             return Response({'error': 'No file provided.'}, status=status.HTTP_400_BAD_REQUEST)
         filename = f'profile_photos/{user.id}_{file.name}'
-        from .utils import upload_to_s3
         url = upload_to_s3(file, filename)
         user.profile_photo = url
+        # Queued for process_photos
+        user.profile_photo_variants = queued()
         user.save()
         return Response({'profile_photo_url': url})
 
@@ -32,25 +46,17 @@ class ProfilePhotoGetView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, user_id):
-        from .models import User
-        import boto3
-        from django.conf import settings
         try:
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
         if not user.profile_photo:
             return Response({'error': 'No profile photo.'}, status=status.HTTP_404_NOT_FOUND)
-        # Extract S3 key from URL
-        s3_key = user.profile_photo.split(f"/{settings.AWS_STORAGE_BUCKET_NAME}/")[-1]
-        s3 = boto3.client('s3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME)
-        presigned_url = s3.generate_presigned_url('get_object',
-            Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': s3_key},
-            ExpiresIn=3600)
-        return Response({'profile_photo_url': presigned_url})
+        try:
+            size = int(request.query_params['size']) if request.query_params.get('size') else None
+        except ValueError:
+            return Response({'error': 'Invalid size.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'profile_photo_url': photo_url(user, size)})
 
 
 class SignupView(generics.CreateAPIView):
@@ -61,7 +67,7 @@ class SignupView(generics.CreateAPIView):
         user = serializer.save()
         otp = generate_otp()
         user.verification_token = otp
-        user.verification_token_expires = timezone.now() + datetime.timedelta(minutes=10)
+        user.verification_token_expires = timezone.now() + datetime.timedelta(minutes=settings.SIGNUP_OTP_TTL_MINUTES)
         user.save()
         print(f"Generated OTP: {otp} for user: {user.email}")
         # print(settings.)
@@ -81,10 +87,27 @@ class LoginView(generics.GenericAPIView):
         if user is not None:
             if not user.email_verified:
                 return Response({'error': 'Email not verified.'}, status=status.HTTP_403_FORBIDDEN)
+            if user.is_banned:
+                return Response({'error': 'Account is banned.'}, status=status.HTTP_403_FORBIDDEN)
             refresh = RefreshToken.for_user(user)
             return Response({'refresh': str(refresh), 'access': str(refresh.access_token)})
         return Response({'error': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
 
+class LogoutView(APIView):
+    # Revokes the access token used for this request and, if given, the refresh token.
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if request.auth is None:
+            return Response({'error': 'Token authentication required.'}, status=status.HTTP_400_BAD_REQUEST)
+        revocation.revoke_token(request.auth)
+        if request.data.get('refresh'):
+            try:
+                revocation.revoke_token(RefreshToken(request.data['refresh']))
+            except TokenError:
+                return Response({'error': 'Invalid refresh token.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Logged out.'})
+
 class EmailVerifyView(generics.GenericAPIView):
     serializer_class = EmailVerificationSerializer
     permission_classes = [permissions.AllowAny]
@@ -96,13 +119,45 @@ class EmailVerifyView(generics.GenericAPIView):
             user = User.objects.get(email=serializer.validated_data['email'])
         except User.DoesNotExist:
             return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
-        if user.verification_token == serializer.validated_data['otp'] and user.verification_token_expires > timezone.now():
+        expires = user.verification_token_expires
+        if user.verification_token == serializer.validated_data['otp'] and expires is not None and expires > timezone.now():
             user.email_verified = True
             user.verification_token = None
             user.verification_token_expires = None
             user.save()
             return Response({'message': 'Email verified successfully.'})
         return Response({'error': 'Invalid or expired OTP.'}, status=status.HTTP_400_BAD_REQUEST)
+
+class ResendOTPView(generics.GenericAPIView):
+    # Sends the current OTP again while at least half its lifetime remains,
+    # so repeated requests do not each write a new token. Throttled per IP and
+    # per email, and at most one email per OTP_RESEND_COOLDOWN_SECONDS.
+    serializer_class = ResendOTPSerializer
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle, ResendOTPEmailThrottle]
+    throttle_scope = 'otp_resend'
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            user = User.objects.get(email=serializer.validated_data['email'])
+        except User.DoesNotExist:
+            return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if user.email_verified:
+            return Response({'error': 'Email already verified.'}, status=status.HTTP_400_BAD_REQUEST)
+        cooldown = settings.OTP_RESEND_COOLDOWN_SECONDS
+        if cooldown and not django_cache.add(f'otp-resend:{user.id}', 1, timeout=cooldown):
+            return Response({'message': 'OTP already sent.', 'expires_at': user.verification_token_expires})
+        ttl = datetime.timedelta(minutes=settings.SIGNUP_OTP_TTL_MINUTES)
+        now = timezone.now()
+        expires = user.verification_token_expires
+        if not user.verification_token or expires is None or expires < now + ttl / 2:
+            user.verification_token = generate_otp()
+            user.verification_token_expires = expires = now + ttl
+            user.save(update_fields=['verification_token', 'verification_token_expires'])
+        send_otp_email(user.email, user.verification_token)
+        return Response({'message': 'OTP sent.', 'expires_at': expires})
 from django.shortcuts import render
 
 class UserProfileView(APIView):
@@ -121,23 +176,10 @@ class UserProfileView(APIView):
             'availability': user.availability,
             'is_public': user.is_public,
             'skills': list(user.skills.values()),
-            'ratings': list(user.received_ratings.values()),
+            'ratings': sharding.fan_out(Rating.objects.filter(rated=user).values()),
         }
-        # Generate presigned URL for profile photo
-        if user.profile_photo:
-            import boto3
-            from django.conf import settings
-            s3_key = user.profile_photo.split(f"/{settings.AWS_STORAGE_BUCKET_NAME}/")[-1]
-            s3 = boto3.client('s3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME)
-            presigned_url = s3.generate_presigned_url('get_object',
-                Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': s3_key},
-                ExpiresIn=3600)
-            profile['profile_photo_url'] = presigned_url
-        else:
-            profile['profile_photo_url'] = None
+        profile['profile_photo_url'] = photo_url(user)
+        profile['profile_photo_sizes'] = variant_urls(user)
         return Response(profile)
     serializer_class = UserSignupSerializer
     permission_classes = [permissions.AllowAny]
@@ -153,4 +195,110 @@ class UserProfileView(APIView):
         send_otp_email(user.email, otp)
         send_welcome_email(user.email, user.name)
 
-        return user
\ No newline at end of file
+        return user
+
+class PublicProfileView(APIView):
+    # Served from the versioned cache; user, skill and rating writes bump profile:<id>.
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, user_id):
+        profile = cache.fetch(cache.profile_namespace(user_id), 'public', lambda: self.build_profile(user_id))
+        if profile is None:
+            return Response({'error': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
+
+    @staticmethod
+    def build_profile(user_id):
+        user = User.objects.filter(id=user_id, is_public=True, is_banned=False, is_active=True).first()
+        if user is None:
+            return None
+        # Summed per shard and combined here, since averages do not add up.
+        totals = sharding.fan_out(Rating.objects.filter(rated=user),
+                                  lambda shard: [shard.aggregate(total=Sum('rating'), count=Count('id'))])
+        count = sum(row['count'] for row in totals)
+        average = sum(row['total'] or 0 for row in totals) / count if count else None
+        return {
+            'id': str(user.id),
+            'name': user.name,
+            'location': user.location,
+            'bio': user.bio,
+            'availability': user.availability,
+            'skills': list(user.skills.exclude(status='rejected').values('id', 'name', 'description', 'category', 'level', 'type')),
+            'rating_average': round(average, 2) if average is not None else None,
+            'rating_count': count,
+        }
+
+
+
+class DirectoryPagination(CursorPagination):
+    ordering = ('name', 'id')
+    page_size = 24
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+class UserDirectoryView(generics.ListAPIView):
+    # Public, unbanned, verified users as profile cards. A page costs two queries
+    # (users, then their visible skills) and one batched pass for photo URLs.
+    serializer_class = DirectoryUserSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = DirectoryPagination
+    # Default avatar size for cards; ?photo_size= picks another.
+    photo_size = 96
+
+    def get_queryset(self):
+        skills = Skill.objects.filter(is_visible=True).exclude(status='rejected') \
+            .only('id', 'user_id', 'name', 'category', 'level', 'type').order_by('name')
+        return User.objects.filter(is_public=True, is_banned=False, is_active=True, email_verified=True) \
+            .only('id', 'name', 'location', 'bio', 'profile_photo', 'profile_photo_variants') \
+            .prefetch_related(Prefetch('skills', queryset=skills, to_attr='directory_skills'))
+
+    def list(self, request, *args, **kwargs):
+        try:
+            size = int(request.query_params.get('photo_size') or self.photo_size)
+        except ValueError:
+            return Response({'error': 'Invalid photo_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(self.get_queryset())
+        context = self.get_serializer_context()
+        context['photo_urls'] = photo_urls(page, size)
+        return self.get_paginated_response(self.get_serializer_class()(page, many=True, context=context).data)
+
+class DataExportListCreateView(generics.ListCreateAPIView):
+    # POST queues an export of the caller's data (staff may pass user_id);
+    # process_exports builds it. Poll the detail view until status is ready.
+    serializer_class = DataExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return DataExport.objects.filter(Q(user=self.request.user) | Q(requested_by=self.request.user)).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        user = request.user
+        if request.data.get('user_id') and request.user.is_staff:
+            try:
+                user_id = uuid.UUID(str(request.data['user_id']))
+            except ValueError:
+                return Response({'error': 'user_id must be a UUID.'}, status=status.HTTP_400_BAD_REQUEST)
+            user = get_object_or_404(User, id=user_id)
+        export = DataExport.objects.create(user=user, requested_by=request.user)
+        return Response(self.get_serializer(export).data, status=status.HTTP_202_ACCEPTED)
+
+
+class DataExportDetailView(generics.RetrieveAPIView):
+    serializer_class = DataExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return DataExport.objects.all()
+        return DataExport.objects.filter(Q(user=self.request.user) | Q(requested_by=self.request.user))
+
+
+class DataExportDownloadView(DataExportDetailView):
+    def get(self, request, *args, **kwargs):
+        export = self.get_object()
+        if export.status != DataExport.READY:
+            return Response({'error': 'Export is not ready.'}, status=status.HTTP_409_CONFLICT)
+        if export.storage == 's3':
+            return HttpResponseRedirect(presigned_url(export.location))
+        return FileResponse(open(export.location, 'rb'), as_attachment=True, content_type='application/zip',
+                            filename=f'skill-swap-export-{export.user_id}.zip')